@@ -0,0 +1,279 @@
+"""
+Caché del catálogo (menú) en memoria
+
+El menú completo (categorías → productos disponibles → modificadores) se arma
+una sola vez por versión del catálogo y se guarda ya serializado y comprimido.
+La versión la mantiene PostgreSQL (tabla catalog_version, incrementada por
+triggers), así que cada request solo hace una consulta barata para saber si
+la copia en memoria sigue vigente. Además, cada cambio se avisa con
+NOTIFY catalog_changed: CatalogListener reconstruye el menú en cuanto llega el
+aviso y reenvía las diferencias a los tills conectados por SSE.
+"""
+import asyncio
+import gzip
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import orjson
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from . import queries
+from .compression import brotli
+from .promotions import PromotionIndex
+from .serialization import PosJSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Cuántas versiones anteriores se guardan para poder responder con diferencias
+MENU_HISTORY_SIZE = 20
+
+# El menú se comprime una vez por versión, así que se usa el nivel máximo
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def _dumps(content) -> bytes:
+    return PosJSONResponse(content).body
+
+
+class MenuSnapshot:
+    """Menú de una versión concreta del catálogo, serializado y comprimido"""
+
+    def __init__(self, version: int, categories: list, products: list, modifiers: list,
+                 promotions: list = ()):
+        self.version = version
+        self.categories = {c['id']: c for c in categories}
+        self.products = {p['id']: p for p in products}
+        self.modifiers = {m['id']: m for m in modifiers}
+        # Promociones activas compiladas para tasar las órdenes (no van en el menú)
+        self.promotions = PromotionIndex(promotions, self.products)
+
+        # Menú anidado: categoría → productos disponibles. Los modificadores no
+        # tienen relación con productos en el esquema (aplican a todos), así que
+        # van una sola vez al nivel superior en lugar de repetirse por producto.
+        by_category = {c['id']: [] for c in categories}
+        for product in products:
+            by_category.setdefault(product['category_id'], []).append(product)
+
+        self.payload = {
+            "version": version,
+            "categories": [
+                dict(category, products=by_category.get(category['id'], []))
+                for category in categories
+            ],
+            "modifiers": modifiers,
+        }
+        self.body = _dumps(self.payload)
+        self.encoded = {
+            "gzip": gzip.compress(self.body, compresslevel=GZIP_LEVEL),
+        }
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+
+        self._diffs = {}
+
+    def is_available(self, product_id: int) -> bool:
+        """True si el producto existe y está disponible en esta versión"""
+        return product_id in self.products
+
+    def product_price(self, product_id: int) -> Optional[float]:
+        """Precio de un producto disponible (None si no existe o está agotado)"""
+        product = self.products.get(product_id)
+        return product['price'] if product else None
+
+    def modifier_price(self, modifier_id: int) -> Optional[float]:
+        """Precio de un modificador (None si no existe)"""
+        modifier = self.modifiers.get(modifier_id)
+        return modifier['price'] if modifier else None
+
+    def diff_since(self, old: "MenuSnapshot") -> bytes:
+        """Diferencias (serializadas) entre una versión anterior y esta"""
+        if old.version not in self._diffs:
+            self._diffs[old.version] = _dumps({
+                "version": self.version,
+                "since": old.version,
+                "categories": _diff(old.categories, self.categories),
+                "products": _diff(old.products, self.products),
+                "modifiers": _diff(old.modifiers, self.modifiers),
+            })
+        return self._diffs[old.version]
+
+
+def _diff(old: dict, new: dict) -> dict:
+    return {
+        "upserted": [row for key, row in new.items() if old.get(key) != row],
+        "removed": [key for key in old if key not in new],
+    }
+
+
+class Catalog:
+    """Catálogo vigente más un historial corto de versiones anteriores"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._history = OrderedDict()
+        self._checked_at = 0.0
+        self.current: Optional[MenuSnapshot] = None
+
+    def get(self, conn, max_age: float = 0) -> MenuSnapshot:
+        """
+        Devolver el menú vigente, reconstruyéndolo si cambió la versión
+
+        Con `max_age` > 0 se confía en la copia en memoria si la versión se
+        revisó hace menos de esos segundos (sin tocar la BD).
+        """
+        current = self.current
+        if current is not None and time.monotonic() - self._checked_at < max_age:
+            return current
+
+        cursor = conn.cursor()
+        queries.execute(cursor, "catalog_version")
+        version = cursor.fetchone()['version']
+        self._checked_at = time.monotonic()
+
+        # La versión solo crece: si una réplica atrasada informa una versión
+        # anterior, se sigue sirviendo la copia más nueva que ya tenemos
+        if current is not None and version <= current.version:
+            return current
+
+        with self._lock:
+            if self.current is None or version > self.current.version:
+                self._install(self._build(conn, version))
+            return self.current
+
+    def refresh(self, conn) -> MenuSnapshot:
+        """Reconstruir ya (tras un cambio del catálogo) en vez de en el próximo GET"""
+        return self.get(conn)
+
+    def snapshot(self, version: int) -> Optional[MenuSnapshot]:
+        """Versión anterior guardada en el historial, si todavía está"""
+        return self._history.get(version)
+
+    def _install(self, snapshot: MenuSnapshot):
+        self.current = snapshot
+        self._history[snapshot.version] = snapshot
+        while len(self._history) > MENU_HISTORY_SIZE:
+            self._history.popitem(last=False)
+
+    @staticmethod
+    def _build(conn, version: int) -> MenuSnapshot:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, description FROM categories ORDER BY name")
+        categories = cursor.fetchall()
+        cursor.execute(
+            """SELECT id, category_id, name, description, price, image_url
+               FROM products
+               WHERE is_available = true
+               ORDER BY category_id, name"""
+        )
+        products = cursor.fetchall()
+        cursor.execute(
+            "SELECT id, name, price, modifier_type FROM modifiers ORDER BY modifier_type, name"
+        )
+        modifiers = cursor.fetchall()
+        cursor.execute("SELECT * FROM promotions WHERE is_active = true")
+        promotions = cursor.fetchall()
+
+        # Normalizar a tipos JSON (Decimal → float) para poder comparar versiones
+        return MenuSnapshot(
+            version,
+            orjson.loads(_dumps(categories)),
+            orjson.loads(_dumps(products)),
+            orjson.loads(_dumps(modifiers)),
+            promotions,
+        )
+
+
+class CatalogListener:
+    """
+    Escucha NOTIFY catalog_changed y reparte los cambios a los suscriptores
+
+    Corre en un hilo con su propia conexión (abierta con `connect`, la del
+    local al que pertenece el catálogo). Al recibir un aviso reconstruye el
+    menú (así create_order ve al instante los productos agotados) y envía a
+    cada suscriptor SSE las diferencias respecto de la versión anterior.
+    """
+
+    CHANNEL = "catalog_changed"
+
+    def __init__(self, catalog: Catalog, connect):
+        self.catalog = catalog
+        self.connect = connect
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._last: Optional[MenuSnapshot] = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Registrar un suscriptor (desde el event loop) y devolver su cola"""
+        queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers = {s for s in self._subscribers if s[1] is not queue}
+
+    def _run(self):
+        delay = 1.0
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = self.connect()
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                conn.cursor().execute(f"LISTEN {self.CHANNEL}")
+                self._last = self.catalog.get(conn)
+                delay = 1.0
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 1.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    if conn.notifies:
+                        conn.notifies.clear()
+                        self._publish(conn)
+            except psycopg2.Error:
+                logger.exception("Conexión LISTEN del catálogo perdida; reintentando")
+                self._stopping.wait(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def _publish(self, conn):
+        previous = self._last
+        snapshot = self.catalog.get(conn)
+        if previous is not None and snapshot.version <= previous.version:
+            return
+        self._last = snapshot
+
+        if previous is not None:
+            message = snapshot.diff_since(previous)
+        else:
+            message = _dumps({"version": snapshot.version})
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
@@ -0,0 +1,74 @@
+"""
+Coalescencia de lecturas idénticas (single-flight)
+
+Cuando varias cajas piden lo mismo a la vez (p. ej. al reconectarse todas tras
+un corte de Wi-Fi), solo la primera llega a la BD; las demás esperan y
+reciben una copia de esa misma respuesta. No es un caché: una vez respondida
+la primera, el siguiente request vuelve a consultar.
+"""
+import asyncio
+
+# Headers que cambian la respuesta y por lo tanto forman parte de la clave
+KEY_HEADERS = (b"if-none-match", b"if-modified-since", b"x-max-staleness", b"x-store-id")
+
+
+class CoalescingMiddleware:
+    """
+    Middleware ASGI que comparte una sola ejecución entre GETs concurrentes
+    iguales (misma ruta, query string y headers relevantes)
+
+    Solo aplica a las rutas listadas: respuestas en streaming (SSE) no deben
+    pasar por aquí porque los que esperan no recibirían nada hasta el final.
+    """
+
+    def __init__(self, app, paths):
+        self.app = app
+        self.paths = frozenset(paths)
+        self._inflight = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        key = (scope["path"], scope["query_string"], *(headers.get(name) for name in KEY_HEADERS))
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            messages = await asyncio.shield(flight)
+            if messages is None:
+                # La primera falló o se canceló: resolver por cuenta propia
+                await self.app(scope, receive, send)
+                return
+            await _replay(messages, send)
+            return
+
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight[key] = flight
+        messages = []
+
+        async def capture(message):
+            messages.append(message)
+
+        try:
+            await self.app(scope, receive, capture)
+            flight.set_result(messages)
+        finally:
+            del self._inflight[key]
+            if not flight.done():
+                flight.set_result(None)
+
+        await _replay(messages, send)
+
+
+async def _replay(messages, send):
+    """
+    Enviar una copia de la respuesta capturada: los middlewares de afuera
+    (CORS, compresión) editan los headers del mensaje y no deben pisarse
+    entre requests
+    """
+    for message in messages:
+        if "headers" in message:
+            message = dict(message, headers=list(message["headers"]))
+        await send(message)
@@ -0,0 +1,163 @@
+"""
+Compresión de respuestas HTTP (brotli/gzip)
+"""
+import gzip
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él se sirve solo gzip
+    brotli = None
+
+from .config import settings
+
+# Solo vale la pena comprimir texto; imágenes, PDF, etc. ya vienen comprimidos
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """
+    Codificaciones aceptadas según Accept-Encoding (sin las marcadas con q=0)
+
+    `*` acepta cualquiera de SUPPORTED_ENCODINGS que no se haya rechazado.
+    """
+    accepted, rejected = set(), set()
+    for token in (accept_encoding or "").split(","):
+        name, *params = [part.strip() for part in token.split(";")]
+        name = name.lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        (accepted if quality > 0 else rejected).add(name)
+    if "*" in accepted:
+        accepted.update(encoding for encoding in SUPPORTED_ENCODINGS if encoding not in rejected)
+    return accepted - rejected
+
+
+def encode(body: bytes, accept_encoding: str, precompressed: Optional[dict] = None):
+    """
+    Elegir codificación según Accept-Encoding (brotli > gzip > identidad)
+
+    Returns:
+        tuple: (cuerpo, codificación o None si va sin comprimir)
+    """
+    accepted = accepted_encodings(accept_encoding)
+    precompressed = precompressed or {}
+
+    if "br" in accepted and brotli is not None:
+        return (
+            precompressed.get("br")
+            or brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY),
+            "br"
+        )
+    if "gzip" in accepted:
+        return (
+            precompressed.get("gzip")
+            or gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL),
+            "gzip"
+        )
+    return body, None
+
+
+class CompressionMiddleware:
+    """
+    Middleware ASGI que comprime respuestas completas a partir de un tamaño mínimo
+
+    Las respuestas en streaming (más de un bloque de cuerpo), las que ya traen
+    Content-Encoding (p. ej. /api/menu, precomprimido) y las que no son texto
+    pasan sin tocarse.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        if not accepted_encodings(accept_encoding) & set(SUPPORTED_ENCODINGS):
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = _Headers(start_message["headers"])
+
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or headers.get(b"content-encoding")
+                or not headers.get(b"content-type", b"").decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed, encoding = encode(body, accept_encoding)
+            if encoding is None:
+                # Solo se acepta brotli y no está instalado: se manda tal cual
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+            headers.set(b"content-encoding", encoding.encode("latin-1"))
+            headers.set(b"content-length", str(len(compressed)).encode("latin-1"))
+            headers.add_vary(b"Accept-Encoding")
+            start_message["headers"] = headers.raw
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class _Headers:
+    """Ayuda mínima para editar la lista de headers crudos de ASGI"""
+
+    def __init__(self, raw):
+        self.raw = list(raw)
+
+    def get(self, name: bytes, default: bytes = None):
+        for key, value in self.raw:
+            if key.lower() == name:
+                return value
+        return default
+
+    def set(self, name: bytes, value: bytes):
+        self.raw = [(k, v) for k, v in self.raw if k.lower() != name]
+        self.raw.append((name, value))
+
+    def add_vary(self, value: bytes):
+        current = self.get(b"vary")
+        self.set(b"vary", value if not current else current + b", " + value)
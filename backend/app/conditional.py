@@ -0,0 +1,77 @@
+"""
+GET condicional (ETag débil) para listados
+
+El validador de un listado es la versión de la base (el xmin del snapshot,
+como en app/sync.py) más los parámetros de la consulta. Todo cambio con txid
+menor que esa versión ya está confirmado, así que el cliente que trae una
+versión anterior recibe un 304 si change_log no tiene cambios de la tabla
+entre su versión y la actual, tras una sola consulta barata. Una marca de
+tiempo (MAX(updated_at)) no sirve: updated_at es la hora de inicio de la
+transacción y una que confirma tarde queda por debajo de lo que el cliente ya
+vio. Por eso tampoco se manda Last-Modified.
+"""
+import zlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+from . import queries
+
+# Tablas con trigger log_change (ver init.sql)
+WATERMARK_TABLES = ("products", "customers", "orders")
+
+
+class Watermark:
+    """Validador HTTP de un listado"""
+
+    def __init__(self, etag: str, unchanged: bool = False):
+        self.etag = etag
+        # True si el cliente ya tiene esta versión del listado (304)
+        self.unchanged = unchanged
+
+    @property
+    def headers(self) -> dict:
+        return {"ETag": self.etag}
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+    def apply(self, response: Response) -> Response:
+        response.headers.update(self.headers)
+        return response
+
+
+def _client_version(request: Request, table: str, query: str) -> Optional[int]:
+    """Versión del ETag que trae el cliente para este listado (misma tabla y parámetros)"""
+    for tag in request.headers.get("if-none-match", "").split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        name, _, rest = tag.partition("-")
+        version, _, tag_query = rest.partition("-")
+        if name == table and tag_query == query:
+            try:
+                return int(version, 16)
+            except ValueError:
+                return None
+    return None
+
+
+def table_watermark(conn, table: str, request: Request) -> Watermark:
+    """Calcular el validador de un listado de `table` para esta URL"""
+    if table not in WATERMARK_TABLES:
+        raise ValueError(f"Tabla sin marca de agua: {table}")
+
+    cursor = conn.cursor()
+    queries.execute(cursor, "watermark_version")
+    row = cursor.fetchone()
+    version = int(row['version'])
+    query = f"{zlib.crc32(str(request.url.query).encode('utf-8')):x}"
+    etag = f'W/"{table}-{version:x}-{query}"'
+
+    unchanged = False
+    since = _client_version(request, table, query)
+    if since is not None and since <= version:
+        pruned_before = int(row['pruned_before']) if row['pruned_before'] else 0
+        if since >= pruned_before:
+            queries.execute(cursor, "changed_between", (table, str(since), str(version)))
+            unchanged = not cursor.fetchone()['changed']
+    return Watermark(etag, unchanged)
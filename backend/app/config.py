@@ -2,6 +2,7 @@
 Configuración de la aplicación
 """
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -13,6 +14,20 @@ class Settings(BaseSettings):
         "postgresql://postgres:postgres@db:5432/burger_pos"
     )
     
+    # Réplica de solo lectura (opcional). Reportes y listados la usan si está
+    # disponible y su retraso no supera REPLICA_MAX_LAG_SECONDS; si no, primaria.
+    DATABASE_REPLICA_URL: Optional[str] = os.getenv("DATABASE_REPLICA_URL")
+    REPLICA_MAX_LAG_SECONDS: float = 5.0
+    REPLICA_CONNECT_TIMEOUT: int = 2  # segundos
+    REPLICA_HEALTH_TTL_SECONDS: float = 2.0  # cada cuánto se vuelve a medir el retraso
+    # Pool de la réplica (por local y por worker; ver gunicorn.conf.py)
+    REPLICA_POOL_MIN: int = 1
+    REPLICA_POOL_MAX: int = 20
+    
+    # Pool de conexiones a la primaria (por proceso); se abre al arrancar
+    DB_POOL_MIN: int = 2
+    DB_POOL_MAX: int = 20
+    
     # API
     API_TITLE: str = "Burger POS API"
     API_VERSION: str = "1.0.0"
@@ -21,9 +36,66 @@ class Settings(BaseSettings):
     # CORS
     ALLOWED_ORIGINS: list = ["*"]
     
-    # Configuración de negocio
+    # Compresión de respuestas (brotli si está instalado, si no gzip)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # bytes; respuestas más chicas van sin comprimir
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    
+    # Límite de requests por cliente (token bucket): ritmo sostenido y ráfaga
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_PER_SECOND: float = 20.0
+    RATE_LIMIT_BURST: int = 60
+    
+    # GETs que se comparten entre requests concurrentes idénticos (single-flight)
+    COALESCE_PATHS: list = [
+        "/api/products", "/api/categories", "/api/modifiers", "/api/tables",
+        "/api/orders", "/api/kitchen/queue", "/api/customers"
+    ]
+    
+    # Ingesta diferida de órdenes (write-behind): POST /api/orders responde sin
+    # esperar a la BD y un hilo guarda las órdenes por lotes. Un solo proceso.
+    ORDER_WRITE_BEHIND: bool = False
+    ORDER_JOURNAL_PATH: str = "data/orders.journal"
+    ORDER_JOURNAL_FSYNC: bool = True
+    ORDER_BATCH_SIZE: int = 50
+    ORDER_BATCH_WINDOW_MS: int = 20
+    
+    # Antigüedad máxima del catálogo en memoria antes de revisar su versión
+    CATALOG_MAX_AGE_SECONDS: float = 2.0
+    
+    # Reparto: ubicación del local y zonas [radio_km, tarifa] de menor a mayor
+    DELIVERY_ORIGIN_LAT: float = 53.7179
+    DELIVERY_ORIGIN_LON: float = -6.3561
+    DELIVERY_ZONES: list = [[3.0, 2.50], [6.0, 4.00], [10.0, 6.00]]
+    DELIVERY_RUN_MAX_STOPS: int = 4
+    DELIVERY_RUN_RADIUS_KM: float = 2.5
+    
+    # Pronóstico de demanda: semanas de historia del ajuste nocturno y cada
+    # cuánto la API revisa si hay un modelo nuevo
+    FORECAST_HISTORY_WEEKS: int = 12
+    FORECAST_CHECK_SECONDS: float = 60.0
+    
+    # Sincronización de tills: días de change_log que conserva la depuración
+    SYNC_LOG_RETENTION_DAYS: int = 14
+    
+    # Impresión: spool del que leen las impresoras (un subdirectorio por tipo
+    # de documento), plantillas propias (None: app/templates) y columnas del papel
+    PRINT_SPOOL_DIR: str = "data/spool"
+    PRINT_TEMPLATE_DIR: Optional[str] = None
+    PRINT_WIDTH: int = 42
+    
+    # Configuración de negocio (del local por defecto; ver STORES)
     TAX_RATE: float = 0.10  # 10% de impuestos
     
+    # Locales: el de por defecto usa DATABASE_URL, TAX_RATE y la ubicación de
+    # DELIVERY_ORIGIN_*. STORES agrega (o ajusta) locales; cada uno va a su
+    # propia base (dsn) o a su schema dentro de DATABASE_URL (schema), p. ej.
+    # {"centro": {"name": "Centro", "schema": "store_centro", "tax_rate": 0.135,
+    #             "order_prefix": "CEN", "latitude": 53.72, "longitude": -6.35}}
+    DEFAULT_STORE_ID: str = "main"
+    STORES: dict = {}
+    
     class Config:
         case_sensitive = True
 
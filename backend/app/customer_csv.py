@@ -0,0 +1,311 @@
+"""
+Importación y exportación de clientes en CSV
+
+La importación no inserta fila por fila: cada línea del CSV se valida y
+normaliza (teléfono, eircode, email, coordenadas) mientras se pasa con COPY a
+una tabla temporal, y después un solo INSERT ... ON CONFLICT (phone) la une con
+customers. Un teléfono ya registrado no aborta la carga: según `on_conflict` se
+actualiza el cliente (las celdas vacías conservan el valor actual) o se deja
+como está. Si el teléfono se repite dentro del archivo gana la última línea.
+El reporte dice qué pasó con cada línea.
+
+La exportación lee con un cursor del lado del servidor y manda el CSV en
+bloques, sin cargar toda la tabla en memoria.
+"""
+import codecs
+import csv
+import io
+import re
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import psycopg2
+from fastapi import HTTPException
+
+from .database import store_read_db
+from .models.customer import CustomerBase, normalize_phone
+
+# Columnas que acepta el CSV y su largo máximo en customers (None: sin límite)
+COLUMNS = {
+    "phone": 20,
+    "name": 200,
+    "email": 200,
+    "address_line1": 300,
+    "address_line2": 300,
+    "city": 100,
+    "county": 100,
+    "eircode": 10,
+    "country": 100,
+    "latitude": None,
+    "longitude": None,
+    "notes": None,
+}
+REQUIRED = ("phone", "name")
+
+CONFLICT_MODES = ("update", "skip")
+
+# Valores por defecto de un cliente nuevo (un NULL explícito no toma el
+# DEFAULT de la columna, así que se aplican en el INSERT)
+DEFAULTS = {
+    name: field.default
+    for name, field in CustomerBase.model_fields.items()
+    if name in COLUMNS and isinstance(field.default, str)
+}
+
+EXPORT_COLUMNS = ("id", *COLUMNS, "is_active", "total_orders", "total_spent", "created_at", "updated_at")
+EXPORT_BATCH_ROWS = 1000
+
+_EIRCODE = re.compile(r"^([AC-FHKNPRTV-Y]\d{2}|D6W)([0-9AC-FHKNPRTV-Y]{4})$")
+_EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def normalize_eircode(raw: Optional[str]) -> Optional[str]:
+    """Eircode en mayúsculas con el espacio en su lugar (A92 X7Y8), o None si no es válido"""
+    code = re.sub(r"\s", "", raw or "").upper()
+    match = _EIRCODE.match(code)
+    return f"{match[1]} {match[2]}" if match else None
+
+
+def _clean_row(row: dict) -> tuple:
+    """
+    Validar y normalizar una línea del CSV
+
+    Returns:
+        tuple: (valores por columna, errores, avisos). Con errores la línea no se
+            importa; un aviso descarta solo ese campo.
+    """
+    values = {}
+    errors: List[str] = []
+    warnings: List[str] = []
+
+    for column, max_length in COLUMNS.items():
+        value = (row.get(column) or "").strip() or None
+        if value is not None and max_length is not None and len(value) > max_length:
+            if column in REQUIRED:
+                errors.append(f"{column} supera {max_length} caracteres")
+            else:
+                warnings.append(f"{column} supera {max_length} caracteres y se descartó")
+            value = None
+        values[column] = value
+
+    for column in REQUIRED:
+        if values[column] is None and not any(error.startswith(column) for error in errors):
+            errors.append(f"Falta {column}")
+
+    if values["phone"] is not None:
+        phone = normalize_phone(values["phone"])
+        if phone is None:
+            errors.append(f"Teléfono inválido: {values['phone']}")
+        values["phone"] = phone
+
+    if values["eircode"] is not None:
+        eircode = normalize_eircode(values["eircode"])
+        if eircode is None:
+            warnings.append(f"Eircode inválido, se descartó: {values['eircode']}")
+        values["eircode"] = eircode
+
+    if values["email"] is not None:
+        if _EMAIL.match(values["email"]):
+            values["email"] = values["email"].lower()
+        else:
+            warnings.append(f"Email inválido, se descartó: {values['email']}")
+            values["email"] = None
+
+    for column, limit in (("latitude", 90), ("longitude", 180)):
+        if values[column] is None:
+            continue
+        try:
+            coordinate = float(values[column])
+        except ValueError:
+            coordinate = None
+        if coordinate is None or not -limit <= coordinate <= limit:
+            warnings.append(f"{column} inválida, se descartó: {values[column]}")
+            values[column] = None
+    if (values["latitude"] is None) != (values["longitude"] is None):
+        warnings.append("Coordenadas incompletas, se descartaron")
+        values["latitude"] = values["longitude"] = None
+
+    return values, errors, warnings
+
+
+class _LineStream(io.TextIOBase):
+    """Archivo de solo lectura sobre un iterador de líneas (entrada de COPY)"""
+
+    def __init__(self, lines: Iterable[str]):
+        self._lines = iter(lines)
+        self._buffer = ""
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        chunks = [self._buffer]
+        length = len(self._buffer)
+        while size < 0 or length < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            chunks.append(line)
+            length += len(line)
+        data = "".join(chunks)
+        if size < 0:
+            size = len(data)
+        self._buffer = data[size:]
+        return data[:size]
+
+
+def import_customers(conn, upload, on_conflict: str = "update", encoding: str = "utf-8-sig") -> dict:
+    """
+    Importar clientes desde un CSV con encabezado (una sola transacción)
+
+    Args:
+        upload: archivo binario con el CSV (columnas de COLUMNS; las demás se ignoran)
+        on_conflict: 'update' actualiza los clientes con el mismo teléfono,
+            'skip' los deja como están
+
+    Returns:
+        dict: resumen por estado, columnas ignoradas y una entrada por línea
+
+    Raises:
+        HTTPException: 400 si el modo, la codificación o el CSV no son válidos
+    """
+    if on_conflict not in CONFLICT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"on_conflict inválido. Debe ser: {', '.join(CONFLICT_MODES)}"
+        )
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        raise HTTPException(status_code=400, detail=f"Codificación desconocida: {encoding}")
+
+    text = io.TextIOWrapper(upload, encoding=encoding, newline="")
+    reader = csv.DictReader(text)
+    try:
+        header = reader.fieldnames
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise HTTPException(status_code=400, detail=f"CSV inválido: {exc}")
+    if not header:
+        raise HTTPException(status_code=400, detail="El CSV está vacío")
+    reader.fieldnames = [name.strip().lower() for name in header]
+    missing = [column for column in REQUIRED if column not in reader.fieldnames]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Faltan columnas: {', '.join(missing)}")
+
+    report: Dict[int, dict] = {}
+    lines_by_phone: Dict[str, List[int]] = {}
+
+    def staged_lines() -> Iterator[str]:
+        out = io.StringIO()
+        writer = csv.writer(out)
+        for row in reader:
+            line = reader.line_num
+            values, errors, warnings = _clean_row(row)
+            entry = {"line": line, "phone": values["phone"], "status": "invalid" if errors else None}
+            if errors:
+                entry["errors"] = errors
+            if warnings:
+                entry["warnings"] = warnings
+            report[line] = entry
+            if errors:
+                continue
+            lines_by_phone.setdefault(values["phone"], []).append(line)
+            writer.writerow([line, *values.values()])
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""CREATE TEMP TABLE customer_import ON COMMIT DROP AS
+            SELECT 0 AS line, {', '.join(COLUMNS)} FROM customers WITH NO DATA"""
+    )
+    try:
+        cursor.copy_expert(
+            f"COPY customer_import (line, {', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            _LineStream(staged_lines())
+        )
+    except (UnicodeDecodeError, csv.Error, psycopg2.DataError) as exc:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail=f"CSV inválido cerca de la línea {reader.line_num}: {exc}")
+
+    # Cliente nuevo: DEFAULTS en las celdas vacías. Existente: NULL en la
+    # celda vacía para que DO UPDATE conserve el valor actual
+    selected = ", ".join(
+        f"COALESCE(i.{column}, CASE WHEN c.id IS NULL THEN %({column})s END)" if column in DEFAULTS
+        else f"i.{column}"
+        for column in COLUMNS
+    )
+    if on_conflict == "update":
+        action = "DO UPDATE SET " + ", ".join(
+            f"{column} = EXCLUDED.{column}" if column in REQUIRED
+            else f"{column} = COALESCE(EXCLUDED.{column}, customers.{column})"
+            for column in COLUMNS if column != "phone"
+        )
+    else:
+        action = "DO NOTHING"
+    cursor.execute(
+        f"""WITH latest AS (
+                SELECT DISTINCT ON (phone) * FROM customer_import ORDER BY phone, line DESC
+            )
+            INSERT INTO customers ({', '.join(COLUMNS)})
+            SELECT {selected}
+            FROM latest i
+            LEFT JOIN customers c ON c.phone = i.phone
+            ON CONFLICT (phone) {action}
+            RETURNING id, phone, (xmax = 0) AS inserted""",
+        DEFAULTS
+    )
+    merged = {row['phone']: row for row in cursor.fetchall()}
+    conn.commit()
+
+    for phone, lines in lines_by_phone.items():
+        *earlier, last = lines
+        for line in earlier:
+            report[line].update(status="duplicate", superseded_by=last)
+        row = merged.get(phone)
+        if row is None:
+            report[last]["status"] = "skipped"
+        else:
+            report[last].update(status="inserted" if row['inserted'] else "updated", customer_id=row['id'])
+
+    rows = [report[line] for line in sorted(report)]
+    summary = {status: 0 for status in ("inserted", "updated", "skipped", "duplicate", "invalid")}
+    for entry in rows:
+        summary[entry["status"]] += 1
+    return {
+        "summary": dict(summary, rows=len(rows)),
+        "ignored_columns": [name for name in reader.fieldnames if name not in COLUMNS],
+        "rows": rows,
+    }
+
+
+def export_customers(store, max_lag: float, include_inactive: bool = False) -> Iterator[bytes]:
+    """CSV de clientes (con encabezado) en bloques de EXPORT_BATCH_ROWS filas"""
+    query = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM customers"
+    if not include_inactive:
+        query += " WHERE is_active = true"
+    query += " ORDER BY id"
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(EXPORT_COLUMNS)
+
+    with contextmanager(store_read_db)(store, max_lag) as conn:
+        cursor = conn.cursor(name="customer_export")
+        cursor.itersize = EXPORT_BATCH_ROWS
+        try:
+            cursor.execute(query)
+            while True:
+                for row in cursor.fetchmany(EXPORT_BATCH_ROWS):
+                    writer.writerow(row[column] for column in EXPORT_COLUMNS)
+                if not out.tell():
+                    break
+                yield out.getvalue().encode()
+                out.seek(0)
+                out.truncate()
+        finally:
+            try:
+                cursor.close()
+            except psycopg2.Error:
+                pass
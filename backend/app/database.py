@@ -1,22 +1,260 @@
 """
 Gestión de conexión a base de datos
+
+Cada local (ver stores.py) tiene su propia base o schema: las conexiones de
+un request salen del pool de su local.
 """
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from fastapi import Depends, Header
+from psycopg2.pool import PoolError, ThreadedConnectionPool
 from .config import settings
+from .queries import PreparingConnection
+from .stores import Store, default_store, get_store, stores
+
+logger = logging.getLogger(__name__)
+
+# Estado de la réplica de cada local compartido entre requests: se mide el
+# retraso (o se detecta la caída) como máximo una vez cada
+# REPLICA_HEALTH_TTL_SECONDS
+_replica_lock = threading.Lock()
+_replica_states: Dict[str, dict] = {}
+
+# Pools de la primaria, uno por local: los abre el lifespan de la app; si no
+# (scripts, tareas programadas) se abren en el primer get_db. Las réplicas
+# tienen los suyos, que se abren con la primera lectura
+_pool_lock = threading.Lock()
+_pools: Dict[str, ThreadedConnectionPool] = {}
+_replica_pools: Dict[str, ThreadedConnectionPool] = {}
+
+def connect(store: Optional[Store] = None):
+    """Abrir una conexión a la primaria de un local (fuera de un request)"""
+    return (store or default_store()).connect()
+
+def open_pool(store: Optional[Store] = None) -> ThreadedConnectionPool:
+    """Abrir el pool de un local (idempotente) con DB_POOL_MIN conexiones listas"""
+    store = store or default_store()
+    with _pool_lock:
+        if store.id not in _pools:
+            _pools[store.id] = ThreadedConnectionPool(
+                settings.DB_POOL_MIN,
+                settings.DB_POOL_MAX,
+                store.dsn,
+                connection_factory=PreparingConnection,
+                **store.connect_kwargs()
+            )
+        return _pools[store.id]
+
+def open_replica_pool(store: Store) -> ThreadedConnectionPool:
+    """
+    Abrir el pool de la réplica de un local (idempotente)
+
+    Se construye fuera de _pool_lock: abrir las REPLICA_POOL_MIN conexiones
+    iniciales puede tardar hasta REPLICA_CONNECT_TIMEOUT si la réplica está
+    caída, y eso no debe frenar a los demás locales.
+
+    Raises:
+        psycopg2.OperationalError: si la réplica no acepta conexiones
+    """
+    pool = _replica_pools.get(store.id)
+    if pool is not None:
+        return pool
+    pool = ThreadedConnectionPool(
+        settings.REPLICA_POOL_MIN,
+        settings.REPLICA_POOL_MAX,
+        store.replica_dsn,
+        connection_factory=PreparingConnection,
+        connect_timeout=settings.REPLICA_CONNECT_TIMEOUT,
+        **store.connect_kwargs()
+    )
+    with _pool_lock:
+        winner = _replica_pools.setdefault(store.id, pool)
+    if winner is not pool:
+        pool.closeall()
+    return winner
+
+def close_pools():
+    """Cerrar todas las conexiones de todos los pools"""
+    with _pool_lock:
+        pools = list(_pools.values()) + list(_replica_pools.values())
+        _pools.clear()
+        _replica_pools.clear()
+    for pool in pools:
+        pool.closeall()
+
+def store_db(store: Store):
+    """
+    Conexión a la primaria de un local
+
+    Sale del pool; si está agotado se abre una conexión suelta en vez de
+    fallar el request.
 
-def get_db():
+    Yields:
+        Connection: Conexión a PostgreSQL con RealDictCursor
     """
-    Obtener conexión a la base de datos
-    
+    pool = _pools.get(store.id) or open_pool(store)
+    try:
+        conn = pool.getconn()
+    except PoolError:
+        pool, conn = None, store.connect()
+    try:
+        yield conn
+    finally:
+        if pool is None:
+            conn.close()
+        else:
+            _release(pool, conn)
+
+def get_db(store: Store = Depends(get_store)):
+    """
+    Obtener conexión a la base de datos del local del request
+
     Yields:
         Connection: Conexión a PostgreSQL con RealDictCursor
     """
-    conn = psycopg2.connect(
-        settings.DATABASE_URL,
-        cursor_factory=RealDictCursor
+    yield from store_db(store)
+
+def _release(pool: ThreadedConnectionPool, conn):
+    """Devolver una conexión al pool limpia, o descartarla si quedó rota"""
+    broken = bool(conn.closed)
+    if not broken:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+    try:
+        pool.putconn(conn, close=broken)
+    except PoolError:
+        # El pool se cerró mientras tanto (apagado)
+        conn.close()
+
+def _replica_lag(conn) -> float:
+    """Retraso de replicación en segundos (0 si está al día o no es réplica)"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT CASE
+               WHEN NOT pg_is_in_recovery() THEN 0
+               WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+               ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+           END AS lag"""
     )
+    return float(cursor.fetchone()['lag'])
+
+def _replica_pool(store: Store, max_lag: float) -> Optional[ThreadedConnectionPool]:
+    """
+    Pool de la réplica si está arriba y con un retraso aceptable, si no None
+
+    La réplica se revisa (abriendo su pool si hace falta y midiendo el retraso
+    con una de sus conexiones) como máximo una vez cada
+    REPLICA_HEALTH_TTL_SECONDS; entre medio se usa la última medición, así
+    una réplica caída no frena cada lectura con un intento de conexión.
+    """
+    now = time.monotonic()
+    with _replica_lock:
+        state = _replica_states.setdefault(store.id, {"checked_at": 0.0, "up": False, "lag": None})
+        fresh = now - state["checked_at"] < settings.REPLICA_HEALTH_TTL_SECONDS
+        if not fresh:
+            # Una sola medición a la vez: los demás usan la anterior
+            state["checked_at"] = now
+        previous = dict(state)
+
+    if not fresh:
+        lag = None
+        try:
+            pool = open_replica_pool(store)
+            conn = pool.getconn()
+        except psycopg2.OperationalError:
+            logger.warning("Réplica del local %s inaccesible; se lee de la primaria", store.id)
+        except PoolError:
+            # Pool agotado: la réplica está arriba pero sin conexiones libres
+            lag = previous["lag"]
+        else:
+            try:
+                lag = _replica_lag(conn)
+            except psycopg2.Error:
+                pass
+            finally:
+                _release(pool, conn)
+        with _replica_lock:
+            state.update(up=lag is not None, lag=lag)
+            previous = dict(state)
+
+    if not previous["up"] or previous["lag"] > max_lag:
+        return None
+    return _replica_pools.get(store.id)
+
+def store_read_db(store: Store, max_lag: float):
+    """
+    Conexión para lecturas de un local: réplica si está disponible, si no primaria
+
+    Las conexiones a la réplica salen de su propio pool, igual que las de la
+    primaria; si está caída, atrasada o su pool agotado, se lee de la primaria.
+
+    Yields:
+        Connection: Conexión a PostgreSQL con RealDictCursor
+    """
+    pool = conn = None
+    if store.replica_dsn and max_lag > 0:
+        pool = _replica_pool(store, max_lag)
+        if pool is not None:
+            try:
+                conn = pool.getconn()
+            except (PoolError, psycopg2.OperationalError):
+                conn = None
+
+    if conn is None:
+        yield from store_db(store)
+        return
     try:
         yield conn
     finally:
-        conn.close()
\ No newline at end of file
+        _release(pool, conn)
+
+def get_read_db(
+    store: Store = Depends(get_store),
+    x_max_staleness: Optional[float] = Header(None)
+):
+    """
+    Obtener conexión para lecturas: réplica si está disponible, si no primaria
+
+    El cliente puede acotar la antigüedad aceptable con el header
+    `X-Max-Staleness` (segundos); `0` fuerza la lectura desde la primaria.
+
+    Yields:
+        Connection: Conexión a PostgreSQL con RealDictCursor
+    """
+    max_lag = settings.REPLICA_MAX_LAG_SECONDS if x_max_staleness is None else x_max_staleness
+    yield from store_read_db(store, max_lag)
+
+def fan_out(fn: Callable, targets: Optional[Iterable[Store]] = None) -> Tuple[dict, list]:
+    """
+    Ejecutar `fn(conn)` en varios locales a la vez (reportes entre locales)
+
+    Cada local usa su réplica si está al día, o su primaria.
+
+    Returns:
+        tuple: ({id de local: resultado}, [ids de locales que fallaron])
+    """
+    targets = list(targets if targets is not None else stores.values())
+
+    failed = object()
+
+    def run(store: Store):
+        try:
+            with contextmanager(store_read_db)(store, settings.REPLICA_MAX_LAG_SECONDS) as conn:
+                return fn(conn)
+        except psycopg2.Error:
+            logger.exception("Local %s no disponible para el reporte", store.id)
+            return failed
+
+    with ThreadPoolExecutor(max_workers=max(1, len(targets))) as executor:
+        outcomes = dict(zip([store.id for store in targets], executor.map(run, targets)))
+
+    results = {key: outcome for key, outcome in outcomes.items() if outcome is not failed}
+    return results, [key for key in outcomes if key not in results]
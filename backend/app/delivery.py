@@ -0,0 +1,237 @@
+"""
+Motor de reparto: distancias, zonas de entrega y agrupación de pedidos
+
+Los clientes activos con coordenadas se guardan en memoria en un índice de
+grilla (celdas de ~550 m), que se actualiza de forma incremental con los
+cambios de change_log (versiones por txid, como en sync.py). Así, calcular distancia y tarifa al crear un pedido de
+delivery no requiere consultas a la BD, y la búsqueda por cercanía solo revisa
+las celdas vecinas.
+"""
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from .config import settings
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Tamaño de celda de la grilla en grados de latitud (~550 m)
+CELL_DEGREES = 0.005
+
+Point = Tuple[float, float]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia en km entre dos puntos (lat/long en grados)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def default_origin() -> Point:
+    """Ubicación del local configurada en settings"""
+    return settings.DELIVERY_ORIGIN_LAT, settings.DELIVERY_ORIGIN_LON
+
+
+def quote(lat: float, lon: float, origin: Optional[Point] = None) -> dict:
+    """
+    Distancia desde el local y tarifa según la zona de reparto
+
+    Raises:
+        HTTPException: 400 si el punto queda fuera de todas las zonas
+    """
+    distance = haversine_km(*(origin or default_origin()), lat, lon)
+    for zone, (max_km, fee) in enumerate(sorted(settings.DELIVERY_ZONES), start=1):
+        if distance <= max_km:
+            return {"distance_km": round(distance, 2), "zone": zone, "fee": fee}
+    raise HTTPException(
+        status_code=400,
+        detail=f"Dirección fuera de la zona de reparto ({distance:.1f} km)"
+    )
+
+
+class GridIndex:
+    """Índice espacial de grilla: id → punto, celda → ids"""
+
+    def __init__(self, cell_degrees: float = CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.points: Dict[int, Point] = {}
+        self._cells: Dict[Tuple[int, int], set] = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self.cell_degrees)), int(math.floor(lon / self.cell_degrees)))
+
+    def upsert(self, key: int, lat: float, lon: float):
+        self.remove(key)
+        self.points[key] = (lat, lon)
+        self._cells.setdefault(self._cell(lat, lon), set()).add(key)
+
+    def remove(self, key: int):
+        point = self.points.pop(key, None)
+        if point is not None:
+            cell_key = self._cell(*point)
+            cell = self._cells[cell_key]
+            cell.discard(key)
+            if not cell:
+                del self._cells[cell_key]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, int]]:
+        """(distancia, id) de los puntos a menos de radius_km, del más cercano al más lejano"""
+        # Celdas a revisar: en longitud las celdas se achican con el coseno de la latitud
+        lat_cells = int(math.ceil(radius_km / (self.cell_degrees * 111.32)))
+        lon_scale = max(math.cos(math.radians(lat)), 0.01)
+        lon_cells = int(math.ceil(radius_km / (self.cell_degrees * 111.32 * lon_scale)))
+        cx, cy = self._cell(lat, lon)
+
+        found = []
+        for dx in range(-lat_cells, lat_cells + 1):
+            for dy in range(-lon_cells, lon_cells + 1):
+                for key in self._cells.get((cx + dx, cy + dy), ()):
+                    plat, plon = self.points[key]
+                    distance = haversine_km(lat, lon, plat, plon)
+                    if distance <= radius_km:
+                        found.append((distance, key))
+        found.sort()
+        return found
+
+
+class CustomerIndex:
+    """
+    Clientes activos con coordenadas, cargados de forma incremental
+
+    La marca de agua es la versión de la base (xmin del snapshot) y no
+    customers.updated_at: updated_at es la hora de inicio de la transacción, y
+    un cliente confirmado tarde con una hora anterior nunca se cargaría.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._version: Optional[int] = None
+        self.grid = GridIndex()
+
+    def get(self, conn, max_age: float = 0) -> GridIndex:
+        """Índice vigente; aplica solo los clientes modificados desde la última carga"""
+        if time.monotonic() - self._checked_at < max_age:
+            return self.grid
+
+        with self._lock:
+            cursor = conn.cursor()
+            cursor.execute(
+                """SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint AS version,
+                          (SELECT pruned_before::text::bigint FROM change_log_horizon) AS pruned_before"""
+            )
+            row = cursor.fetchone()
+            version = row['version']
+
+            if self._version is None or (row['pruned_before'] or 0) > self._version:
+                cursor.execute(
+                    """SELECT id, latitude, longitude, is_active
+                       FROM customers
+                       WHERE is_active = true AND latitude IS NOT NULL AND longitude IS NOT NULL"""
+                )
+                grid = GridIndex()
+                self._apply(grid, cursor.fetchall(), ())
+                self.grid = grid
+            elif version > self._version:
+                cursor.execute(
+                    """SELECT DISTINCT entity_id AS id FROM change_log
+                       WHERE entity = 'customers'
+                         AND txid >= %s::text::xid8 AND txid < %s::text::xid8""",
+                    (self._version, version)
+                )
+                changed = [r['id'] for r in cursor.fetchall()]
+                if changed:
+                    cursor.execute(
+                        """SELECT id, latitude, longitude, is_active
+                           FROM customers WHERE id = ANY(%s)""",
+                        (changed,)
+                    )
+                    self._apply(self.grid, cursor.fetchall(), changed)
+
+            self._version = version
+            self._checked_at = time.monotonic()
+        return self.grid
+
+    @staticmethod
+    def _apply(grid: GridIndex, rows: Iterable[dict], changed: Iterable[int]):
+        """Aplicar las filas leídas; los ids cambiados sin fila se borraron"""
+        found = set()
+        for row in rows:
+            found.add(row['id'])
+            if row['is_active'] and row['latitude'] is not None and row['longitude'] is not None:
+                grid.upsert(row['id'], float(row['latitude']), float(row['longitude']))
+            else:
+                grid.remove(row['id'])
+        for key in changed:
+            if key not in found:
+                grid.remove(key)
+
+
+def order_delivery_fee(order, conn, store) -> float:
+    """
+    Tarifa de reparto para una OrderCreate (0 si no es delivery)
+
+    Se calcula con el índice en memoria del local; si el cliente no tiene
+    coordenadas no se puede ubicar y no se cobra tarifa.
+    """
+    if order.order_type != 'delivery' or not order.customer_id:
+        return 0
+    grid = store.customer_index.get(conn, max_age=settings.CATALOG_MAX_AGE_SECONDS)
+    point = grid.points.get(order.customer_id)
+    if point is None:
+        return 0
+    return quote(*point, origin=store.origin)['fee']
+
+
+def plan_runs(
+    stops: List[dict], max_stops: int, radius_km: float, origin: Optional[Point] = None
+) -> List[List[dict]]:
+    """
+    Agrupar pedidos en viajes de reparto por cercanía
+
+    Se toma como semilla el pedido pendiente más lejano al local, se le suman
+    los pedidos más cercanos dentro de radius_km (hasta max_stops) y se repite.
+    Cada viaje se ordena por vecino más cercano saliendo desde el local.
+    Cada stop debe traer `order_id`, `latitude` y `longitude`.
+    """
+    origin = origin or default_origin()
+    grid = GridIndex()
+    by_id = {}
+    for stop in stops:
+        by_id[stop['order_id']] = stop
+        grid.upsert(stop['order_id'], stop['latitude'], stop['longitude'])
+
+    remaining = sorted(
+        by_id,
+        key=lambda key: haversine_km(*origin, *grid.points[key]),
+        reverse=True
+    )
+    runs = []
+    while grid.points:
+        seed = next(key for key in remaining if key in grid.points)
+        nearby = [key for _, key in grid.within(*grid.points[seed], radius_km)][:max_stops]
+        if seed not in nearby:
+            nearby = [seed] + nearby[:max_stops - 1]
+
+        points = {key: grid.points[key] for key in nearby}
+        for key in nearby:
+            grid.remove(key)
+
+        # Orden de visita: vecino más cercano desde el local
+        route, position = [], origin
+        while points:
+            key = min(points, key=lambda k: haversine_km(*position, *points[k]))
+            position = points.pop(key)
+            route.append(by_id[key])
+        runs.append(route)
+    return runs
+
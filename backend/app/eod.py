@@ -0,0 +1,181 @@
+"""
+Cierre del día (Z-report)
+
+Calcula el reporte de cierre con una sola pasada sobre las órdenes del día
+(GROUPING SETS: totales y por tipo de orden a la vez), otra sobre sus items y
+una lectura por clave de payment_totals (lo cobrado por forma de pago, que
+acumula un trigger con cada pago), y lo congela en la tabla z_reports. Las lecturas
+posteriores salen de ese snapshot, así que no cambian con ediciones tardías
+salvo que se vuelva a cerrar el día con force=True.
+
+Uso como tarea programada (desde backend/):
+    python -m app.eod [--date AAAA-MM-DD] [--force] [--store ID]
+"""
+import argparse
+from datetime import date, datetime, time, timedelta
+
+from psycopg2.extras import Json
+
+from .stores import stores
+
+
+class DayAlreadyClosed(Exception):
+    """El día ya tiene un Z-report congelado"""
+
+
+def _money(value) -> float:
+    return round(float(value or 0), 2)
+
+
+def _totals(row) -> dict:
+    return {
+        "orders": row['orders'],
+        "completed_orders": row['completed_orders'],
+        "cancelled_orders": row['cancelled_orders'],
+        "subtotal": _money(row['subtotal']),
+        "tax": _money(row['tax']),
+        "discounts": _money(row['discount']),
+        "delivery_fees": _money(row['delivery_fee']),
+        "total": _money(row['total']),
+        "cancelled_total": _money(row['cancelled_total']),
+        "outstanding": _money(row['outstanding']),
+    }
+
+
+def compute_z_report(cursor, business_date: date) -> dict:
+    """Calcular el Z-report de un día (sin guardarlo)"""
+    # Rango sobre created_at (usa idx_orders_created_at, a diferencia de DATE())
+    start = datetime.combine(business_date, time.min)
+    end = start + timedelta(days=1)
+
+    # Las órdenes canceladas cuentan aparte y no suman a las ventas
+    cursor.execute(
+        """SELECT GROUPING(order_type) AS by_type,
+                  order_type,
+                  COUNT(*) AS orders,
+                  COUNT(*) FILTER (WHERE status = 'completed') AS completed_orders,
+                  COUNT(*) FILTER (WHERE status = 'cancelled') AS cancelled_orders,
+                  SUM(subtotal) FILTER (WHERE status <> 'cancelled') AS subtotal,
+                  SUM(tax) FILTER (WHERE status <> 'cancelled') AS tax,
+                  SUM(discount) FILTER (WHERE status <> 'cancelled') AS discount,
+                  SUM(delivery_fee) FILTER (WHERE status <> 'cancelled') AS delivery_fee,
+                  SUM(total) FILTER (WHERE status <> 'cancelled') AS total,
+                  SUM(total) FILTER (WHERE status = 'cancelled') AS cancelled_total,
+                  SUM(total - paid_amount) FILTER (WHERE status <> 'cancelled') AS outstanding
+           FROM orders
+           WHERE created_at >= %s AND created_at < %s
+           GROUP BY GROUPING SETS ((), (order_type))""",
+        (start, end)
+    )
+    summary, by_type = None, []
+    for row in cursor.fetchall():
+        if row['by_type']:
+            summary = _totals(row)
+        else:
+            by_type.append(dict(_totals(row), order_type=row['order_type']))
+
+    # Lo cobrado en el día por forma de pago (pagos no anulados)
+    cursor.execute(
+        """SELECT method, payments_count, amount
+           FROM payment_totals
+           WHERE business_date = %s AND payments_count > 0
+           ORDER BY method""",
+        (business_date,)
+    )
+    by_payment = [
+        {"payment_method": row['method'], "payments": row['payments_count'], "amount": _money(row['amount'])}
+        for row in cursor.fetchall()
+    ]
+
+    cursor.execute(
+        """SELECT oi.product_id, p.name AS product_name,
+                  SUM(oi.quantity) AS quantity,
+                  SUM(oi.subtotal) AS revenue
+           FROM orders o
+           JOIN order_items oi ON oi.order_id = o.id
+           JOIN products p ON p.id = oi.product_id
+           WHERE o.created_at >= %s AND o.created_at < %s
+             AND o.status <> 'cancelled'
+           GROUP BY oi.product_id, p.name
+           ORDER BY quantity DESC, p.name""",
+        (start, end)
+    )
+    products = [
+        {
+            "product_id": row['product_id'],
+            "product_name": row['product_name'],
+            "quantity": int(row['quantity']),
+            "revenue": _money(row['revenue']),
+        }
+        for row in cursor.fetchall()
+    ]
+
+    return {
+        "business_date": business_date.isoformat(),
+        "summary": summary,
+        "by_payment_method": by_payment,
+        "by_order_type": sorted(by_type, key=lambda r: r['order_type']),
+        "products": products,
+    }
+
+
+def close_day(conn, business_date: date, force: bool = False) -> dict:
+    """
+    Calcular y congelar el Z-report de un día
+
+    Raises:
+        DayAlreadyClosed: si ya estaba cerrado y no se pidió force
+    """
+    cursor = conn.cursor()
+
+    # Serializa cierres concurrentes del mismo día
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('z_report'), %s)", (business_date.toordinal(),))
+    cursor.execute("SELECT 1 FROM z_reports WHERE business_date = %s", (business_date,))
+    if cursor.fetchone() and not force:
+        raise DayAlreadyClosed(business_date)
+
+    report = compute_z_report(cursor, business_date)
+    cursor.execute(
+        """INSERT INTO z_reports (business_date, report, orders_count, total_sales)
+           VALUES (%s, %s, %s, %s)
+           ON CONFLICT (business_date) DO UPDATE SET
+               report = EXCLUDED.report,
+               orders_count = EXCLUDED.orders_count,
+               total_sales = EXCLUDED.total_sales,
+               closed_at = CURRENT_TIMESTAMP
+           RETURNING business_date, closed_at""",
+        (business_date, Json(report), report['summary']['orders'], report['summary']['total'])
+    )
+    closed = cursor.fetchone()
+    conn.commit()
+    return dict(report, closed_at=closed['closed_at'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cierre del día (Z-report)")
+    parser.add_argument("--date", type=date.fromisoformat, default=None,
+                        help="Día a cerrar (por defecto, ayer)")
+    parser.add_argument("--force", action="store_true", help="Recalcular aunque ya esté cerrado")
+    parser.add_argument("--store", choices=sorted(stores), default=None,
+                        help="Local a cerrar (por defecto, todos)")
+    args = parser.parse_args()
+
+    business_date = args.date or date.today() - timedelta(days=1)
+    already_closed = []
+    for store in ([stores[args.store]] if args.store else stores.values()):
+        conn = store.connect()
+        try:
+            report = close_day(conn, business_date, args.force)
+            print(store.id, report['summary'])
+        except DayAlreadyClosed:
+            already_closed.append(store.id)
+        finally:
+            conn.close()
+
+    if already_closed:
+        parser.exit(1, f"El día {business_date} ya está cerrado en: {', '.join(already_closed)} "
+                       "(use --force para recalcular)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+Pronóstico de demanda por hora (órdenes y unidades por producto)
+
+Tarea nocturna (python -m app.forecast), por local:
+
+1. Completa de forma incremental los acumulados por hora (orders_hourly y
+   sales_hourly) desde la última hora acumulada hasta el inicio de hoy.
+2. Ajusta con NumPy, para cada serie (el total de órdenes y cada producto),
+   un modelo estacional: tendencia lineal del total diario
+   desestacionalizado × factor del día de la semana × perfil horario de ese
+   día de la semana.
+3. Guarda los coeficientes del modelo (JSON) en forecast_models.
+
+La API no ajusta nada ni importa NumPy: ForecastCache carga el modelo
+guardado (revisando cada FORECAST_CHECK_SECONDS si hay uno nuevo) y la
+predicción de un día son unas sumas y productos sobre listas, que además
+quedan en caché por día.
+
+Uso como tarea programada (desde backend/):
+    python -m app.forecast [--weeks 12] [--rebuild] [--store ID]
+"""
+import argparse
+import threading
+import time as clock
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from psycopg2.extras import Json
+
+from .config import settings
+
+# Serie del volumen total de órdenes (las demás son ids de producto)
+ORDERS_SERIES = "orders"
+
+# Con menos historia que esto la tendencia no es fiable y se deja plana
+MIN_TREND_DAYS = 14
+
+# Días pronosticados que se guardan ya calculados
+PREDICTION_CACHE_SIZE = 8
+
+
+def roll_up(cursor, rebuild: bool = False) -> Optional[datetime]:
+    """
+    Completar los acumulados por hora hasta el inicio de hoy (sin commit)
+
+    Retoma desde la última hora acumulada; con `rebuild` recalcula todo.
+
+    Returns:
+        datetime: primera hora recalculada (None si no había nada nuevo)
+    """
+    end = datetime.combine(date.today(), time.min)
+    start = None
+    if rebuild:
+        cursor.execute("DELETE FROM sales_hourly")
+        cursor.execute("DELETE FROM orders_hourly")
+    else:
+        cursor.execute("SELECT MAX(hour) AS last FROM orders_hourly")
+        last = cursor.fetchone()['last']
+        start = last + timedelta(hours=1) if last else None
+    if start is None:
+        cursor.execute("SELECT date_trunc('hour', MIN(created_at)) AS first FROM orders")
+        start = cursor.fetchone()['first']
+    if start is None or start >= end:
+        return None
+
+    cursor.execute(
+        """INSERT INTO orders_hourly (hour, orders_count, revenue)
+           SELECT date_trunc('hour', created_at), COUNT(*), SUM(total)
+           FROM orders
+           WHERE created_at >= %s AND created_at < %s AND status <> 'cancelled'
+           GROUP BY 1
+           ON CONFLICT (hour) DO UPDATE SET
+               orders_count = EXCLUDED.orders_count,
+               revenue = EXCLUDED.revenue""",
+        (start, end)
+    )
+    cursor.execute(
+        """INSERT INTO sales_hourly (hour, product_id, quantity, revenue)
+           SELECT date_trunc('hour', o.created_at), oi.product_id, SUM(oi.quantity), SUM(oi.subtotal)
+           FROM orders o
+           JOIN order_items oi ON oi.order_id = o.id
+           WHERE o.created_at >= %s AND o.created_at < %s AND o.status <> 'cancelled'
+           GROUP BY 1, 2
+           ON CONFLICT (hour, product_id) DO UPDATE SET
+               quantity = EXCLUDED.quantity,
+               revenue = EXCLUDED.revenue""",
+        (start, end)
+    )
+    return start
+
+
+def load_history(cursor, start: datetime, end: datetime) -> list:
+    """
+    Filas (hour, series, quantity) entre `start` y `end`
+
+    Lo ya acumulado sale de orders_hourly/sales_hourly; las horas posteriores
+    a la última acumulada se agregan desde orders.
+    """
+    cursor.execute("SELECT MAX(hour) + interval '1 hour' AS rolled FROM orders_hourly")
+    rolled = min(max(cursor.fetchone()['rolled'] or start, start), end)
+    params = {"start": start, "rolled": rolled, "end": end}
+
+    cursor.execute(
+        """SELECT hour, NULL::integer AS product_id, orders_count AS quantity
+           FROM orders_hourly WHERE hour >= %(start)s AND hour < %(rolled)s
+           UNION ALL
+           SELECT hour, product_id, quantity
+           FROM sales_hourly WHERE hour >= %(start)s AND hour < %(rolled)s
+           UNION ALL
+           SELECT date_trunc('hour', created_at), NULL, COUNT(*)
+           FROM orders
+           WHERE created_at >= %(rolled)s AND created_at < %(end)s AND status <> 'cancelled'
+           GROUP BY 1
+           UNION ALL
+           SELECT date_trunc('hour', o.created_at), oi.product_id, SUM(oi.quantity)
+           FROM orders o
+           JOIN order_items oi ON oi.order_id = o.id
+           WHERE o.created_at >= %(rolled)s AND o.created_at < %(end)s AND o.status <> 'cancelled'
+           GROUP BY 1, 2""",
+        params
+    )
+    return [
+        (row['hour'], ORDERS_SERIES if row['product_id'] is None else row['product_id'], row['quantity'])
+        for row in cursor.fetchall()
+    ]
+
+
+def fit(rows: list, origin: date, days: int) -> dict:
+    """
+    Ajustar el modelo estacional de cada serie sobre `days` días desde `origin`
+
+    Returns:
+        dict: coeficientes por serie, serializable a JSON
+    """
+    import numpy as np  # solo lo necesita la tarea nocturna, no la API
+
+    keys = sorted({key for _, key, _ in rows}, key=lambda key: (key != ORDERS_SERIES, str(key)))
+    if ORDERS_SERIES not in keys:
+        keys.insert(0, ORDERS_SERIES)
+    index = {key: position for position, key in enumerate(keys)}
+
+    counts = np.zeros((len(keys), days, 24))
+    for hour, key, quantity in rows:
+        counts[index[key], (hour.date() - origin).days, hour.hour] += float(quantity)
+
+    daily = counts.sum(axis=2)
+    weekday = np.array([(origin + timedelta(days=offset)).weekday() for offset in range(days)])
+    mean = daily.mean(axis=1)
+
+    # Factor de cada día de la semana: su media respecto de la media general
+    weekday_mean = np.stack(
+        [daily[:, weekday == day].mean(axis=1) if (weekday == day).any() else mean for day in range(7)],
+        axis=1
+    )
+    factor = np.ones_like(weekday_mean)
+    np.divide(weekday_mean, mean[:, None], out=factor, where=mean[:, None] > 0)
+
+    # Tendencia: recta por mínimos cuadrados sobre el total desestacionalizado
+    seasonal = factor[:, weekday]
+    deseasonalized = np.zeros_like(daily)
+    np.divide(daily, seasonal, out=deseasonalized, where=seasonal > 0)
+    design = np.column_stack([np.ones(days), np.arange(days)])
+    (intercept, slope), *_ = np.linalg.lstsq(design, deseasonalized.T, rcond=None)
+    if days < MIN_TREND_DAYS:
+        intercept, slope = deseasonalized.mean(axis=1), np.zeros(len(keys))
+
+    # Perfil horario de cada día de la semana (fracción del día en cada hora);
+    # sin ventas ese día de la semana se usa el perfil de todos los días
+    by_weekday = np.stack([counts[:, weekday == day, :].sum(axis=1) for day in range(7)], axis=1)
+    overall = counts.sum(axis=1)
+    overall_total = overall.sum(axis=1, keepdims=True)
+    overall_share = np.full_like(overall, 1 / 24)
+    np.divide(overall, overall_total, out=overall_share, where=overall_total > 0)
+    totals = by_weekday.sum(axis=2, keepdims=True)
+    profile = np.where(totals > 0, by_weekday / np.where(totals > 0, totals, 1), overall_share[:, None, :])
+
+    return {
+        "origin": origin.isoformat(),
+        "days": days,
+        "series": {
+            str(key): {
+                "intercept": float(intercept[position]),
+                "slope": float(slope[position]),
+                "weekday": np.round(factor[position], 4).tolist(),
+                "profile": np.round(profile[position], 5).tolist(),
+            }
+            for key, position in index.items()
+        },
+    }
+
+
+def refresh_model(conn, weeks: int = settings.FORECAST_HISTORY_WEEKS, rebuild: bool = False) -> Optional[dict]:
+    """
+    Acumular lo nuevo, reajustar el modelo del local y guardarlo
+
+    Returns:
+        dict: resumen del ajuste (None si todavía no hay órdenes)
+    """
+    cursor = conn.cursor()
+    roll_up(cursor, rebuild)
+
+    end = datetime.combine(date.today(), time.min)
+    start = end - timedelta(weeks=weeks)
+    rows = load_history(cursor, start, end)
+    if not rows:
+        conn.commit()
+        return None
+
+    # Un local nuevo no tiene `weeks` semanas: el ajuste empieza en su primer día
+    origin = max(start.date(), min(hour for hour, _, _ in rows).date())
+    days = (end.date() - origin).days
+    model = fit(rows, origin, days)
+
+    cursor.execute("SELECT id, name FROM products")
+    model["names"] = {str(row['id']): row['name'] for row in cursor.fetchall()}
+
+    cursor.execute(
+        """INSERT INTO forecast_models (id, fitted_at, model) VALUES (true, CURRENT_TIMESTAMP, %s)
+           ON CONFLICT (id) DO UPDATE SET fitted_at = EXCLUDED.fitted_at, model = EXCLUDED.model
+           RETURNING fitted_at""",
+        (Json(model),)
+    )
+    fitted_at = cursor.fetchone()['fitted_at']
+    conn.commit()
+    return {"fitted_at": fitted_at, "origin": model["origin"], "days": days, "series": len(model["series"])}
+
+
+class ForecastModel:
+    """Modelo ajustado en memoria; predice sin NumPy"""
+
+    def __init__(self, fitted_at: datetime, model: dict):
+        self.fitted_at = fitted_at
+        self.origin = date.fromisoformat(model["origin"])
+        self.series = model["series"]
+        self.names = model.get("names", {})
+        self._lock = threading.Lock()
+        self._predictions = OrderedDict()
+
+    def _series(self, key: str, offset: int, weekday: int) -> dict:
+        coefficients = self.series[key]
+        level = max(coefficients["intercept"] + coefficients["slope"] * offset, 0.0)
+        total = level * coefficients["weekday"][weekday]
+        return {
+            "total": round(total, 2),
+            "hourly": [round(total * share, 2) for share in coefficients["profile"][weekday]],
+        }
+
+    def predict(self, day: date) -> dict:
+        """Demanda prevista por hora de un día: órdenes y unidades por producto"""
+        with self._lock:
+            if day in self._predictions:
+                self._predictions.move_to_end(day)
+                return self._predictions[day]
+
+        offset, weekday = (day - self.origin).days, day.weekday()
+        products = [
+            dict(self._series(key, offset, weekday), product_id=int(key), product_name=self.names.get(key))
+            for key in self.series if key != ORDERS_SERIES
+        ]
+        products.sort(key=lambda row: row["total"], reverse=True)
+        prediction = {
+            "date": day.isoformat(),
+            "fitted_at": self.fitted_at,
+            "orders": self._series(ORDERS_SERIES, offset, weekday),
+            "products": products,
+        }
+
+        with self._lock:
+            self._predictions[day] = prediction
+            while len(self._predictions) > PREDICTION_CACHE_SIZE:
+                self._predictions.popitem(last=False)
+        return prediction
+
+
+class ForecastCache:
+    """Último modelo guardado de un local, recargado cuando se reajusta"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self.current: Optional[ForecastModel] = None
+
+    def get(self, conn, max_age: float = 0) -> Optional[ForecastModel]:
+        """Modelo vigente (None si todavía no se ajustó ninguno)"""
+        current = self.current
+        if current is not None and clock.monotonic() - self._checked_at < max_age:
+            return current
+
+        cursor = conn.cursor()
+        cursor.execute("SELECT fitted_at FROM forecast_models")
+        row = cursor.fetchone()
+        self._checked_at = clock.monotonic()
+        if row is None:
+            return None
+        if current is not None and row['fitted_at'] <= current.fitted_at:
+            return current
+
+        with self._lock:
+            if self.current is None or row['fitted_at'] > self.current.fitted_at:
+                cursor.execute("SELECT fitted_at, model FROM forecast_models")
+                row = cursor.fetchone()
+                self.current = ForecastModel(row['fitted_at'], row['model'])
+            return self.current
+
+
+def main():
+    from .stores import stores  # stores.py importa este módulo (ForecastCache)
+
+    parser = argparse.ArgumentParser(description="Ajuste nocturno del pronóstico de demanda")
+    parser.add_argument("--weeks", type=int, default=settings.FORECAST_HISTORY_WEEKS,
+                        help="Semanas de historia para el ajuste")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Recalcular todos los acumulados por hora")
+    parser.add_argument("--store", choices=sorted(stores), default=None,
+                        help="Local a ajustar (por defecto, todos)")
+    args = parser.parse_args()
+
+    for store in ([stores[args.store]] if args.store else stores.values()):
+        conn = store.connect()
+        try:
+            print(store.id, refresh_model(conn, args.weeks, args.rebuild) or "sin órdenes todavía")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
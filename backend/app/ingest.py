@@ -0,0 +1,313 @@
+"""
+Ingesta diferida de órdenes (write-behind)
+
+Con ORDER_WRITE_BEHIND activo, POST /api/orders tasa la orden contra el
+catálogo en memoria, le asigna número, la escribe en un journal local
+(append-only, con fsync) y responde de inmediato. Un hilo escritor la
+persiste después en PostgreSQL agrupando varias órdenes por transacción
+(group commit). Al reiniciar, las órdenes del journal sin marca de commit se
+vuelven a encolar.
+
+Los números de orden se asignan en memoria, así que este modo supone un solo
+proceso de API creando órdenes, y solo cubre al local por defecto (las
+órdenes de otros locales se guardan por el camino síncrono).
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+from typing import Optional
+
+import psycopg2
+
+from .config import settings
+from .database import connect
+from .stores import default_store
+from .order_writer import price_order, insert_order
+from .queries import PreparingConnection
+
+logger = logging.getLogger(__name__)
+
+
+class OrderJournal:
+    """Journal append-only de órdenes aceptadas y lotes confirmados"""
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def append(self, priced: dict):
+        self._write({"op": "order", "order": priced})
+
+    def mark_committed(self, order_numbers: list):
+        self._write({"op": "commit", "order_numbers": order_numbers})
+
+    def pending(self) -> list:
+        """Órdenes del journal que todavía no tienen marca de commit"""
+        orders = {}
+        with open(self.path, encoding="utf-8") as journal:
+            for line in journal:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Última línea a medio escribir por una caída: se descarta
+                    continue
+                if record["op"] == "order":
+                    orders[record["order"]["order_number"]] = record["order"]
+                elif record["op"] == "commit":
+                    for number in record["order_numbers"]:
+                        orders.pop(number, None)
+        return list(orders.values())
+
+    def truncate(self):
+        """Vaciar el journal (solo cuando no queda nada pendiente)"""
+        self._file.truncate(0)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class OrderIngestQueue:
+    """Cola de órdenes aceptadas pendientes de persistir"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._failed = {}
+        self._journal: Optional[OrderJournal] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._day: Optional[date] = None
+        self._counter = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Abrir el journal, re-encolar lo pendiente y arrancar el escritor"""
+        self._journal = OrderJournal(settings.ORDER_JOURNAL_PATH, settings.ORDER_JOURNAL_FSYNC)
+        pending = self._journal.pending()
+
+        conn = connect()
+        try:
+            cursor = conn.cursor()
+            # Una caída entre el COMMIT y la marca en el journal deja órdenes
+            # ya guardadas como "pendientes": esas no se vuelven a insertar
+            if pending:
+                cursor.execute(
+                    "SELECT order_number FROM orders WHERE order_number = ANY(%s)",
+                    ([p['order_number'] for p in pending],)
+                )
+                saved = {row['order_number'] for row in cursor.fetchall()}
+                pending = [p for p in pending if p['order_number'] not in saved]
+            self._seed_counter(cursor, pending)
+        finally:
+            conn.close()
+
+        for priced in pending:
+            self._in_flight[priced['order_number']] = priced
+            self._queue.put(priced)
+        if pending:
+            logger.info("Re-encoladas %d órdenes del journal", len(pending))
+
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="order-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Detener el escritor tras vaciar la cola (lo que quede sigue en el journal)"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Sigue reintentando contra una BD caída: el journal queda abierto
+            # para que pueda marcar lo que llegue a guardar; lo pendiente se
+            # re-encola al arrancar de nuevo
+            logger.warning("El escritor de órdenes no terminó en %.0f s; el journal queda abierto", timeout)
+            return
+        self._thread = None
+        self._journal.close()
+
+    def submit(self, order, snapshot, delivery_fee: float = 0) -> dict:
+        """Tasar, numerar y registrar una orden; la respuesta no espera a la BD"""
+        priced = price_order(order, snapshot.product_price, snapshot.modifier_price,
+                             delivery_fee, default_store().tax_rate, snapshot.promotions)
+
+        with self._lock:
+            priced['order_number'] = self._next_number()
+            priced['created_at'] = datetime.now().isoformat()
+            priced['status'] = 'pending'
+            # Bajo el mismo lock para que el journal quede en orden de número
+            self._journal.append(priced)
+            self._in_flight[priced['order_number']] = priced
+
+        self._queue.put(priced)
+        return dict(priced, persisted=False)
+
+    def lookup(self, order_number: str) -> Optional[dict]:
+        """Orden todavía en vuelo (o que no se pudo guardar), si existe"""
+        with self._lock:
+            if order_number in self._in_flight:
+                return dict(self._in_flight[order_number], persisted=False)
+            if order_number in self._failed:
+                return dict(self._failed[order_number], persisted=False, status='failed')
+        return None
+
+    def _seed_counter(self, cursor, pending: list):
+        today = date.today()
+        prefix = f"{default_store().order_prefix}-{today.strftime('%Y%m%d')}-"
+        cursor.execute(
+            "SELECT MAX(order_number) AS last FROM orders WHERE order_number LIKE %s",
+            (prefix + "%",)
+        )
+        numbers = [cursor.fetchone()['last']] + [p['order_number'] for p in pending]
+        self._day = today
+        self._counter = max(
+            (int(n[len(prefix):]) for n in numbers if n and n.startswith(prefix)),
+            default=0
+        )
+
+    def _next_number(self) -> str:
+        today = date.today()
+        if today != self._day:
+            self._day = today
+            self._counter = 0
+        self._counter += 1
+        return f"{default_store().order_prefix}-{today.strftime('%Y%m%d')}-{self._counter:04d}"
+
+    def _next_batch(self) -> list:
+        """Esperar la primera orden y juntar las que lleguen dentro de la ventana"""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + settings.ORDER_BATCH_WINDOW_MS / 1000
+        while len(batch) < settings.ORDER_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        conn = None
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            delay = 0.5
+            while True:
+                try:
+                    if conn is None or conn.closed:
+                        # Conexión de larga vida: vale la pena preparar sus
+                        # sentencias (ver queries.py)
+                        conn = default_store().connect(connection_factory=PreparingConnection)
+                    self._write(conn, batch)
+                    break
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    # Conexión caída, deadlock, BD reiniciando: se reintenta lo pendiente del lote
+                    logger.exception("Error guardando lote de %d órdenes; reintentando", len(batch))
+                    if conn is not None:
+                        conn.close()
+                    conn = None
+                    time.sleep(delay)
+                    delay = min(delay * 2, 10)
+
+        if conn is not None:
+            conn.close()
+
+    def _write(self, conn, batch: list):
+        """
+        Guardar un lote en una sola transacción (o una a una si alguna falla)
+
+        Un error de la orden misma (datos, restricciones) solo descarta esa
+        orden, que queda en _failed; los de conexión (OperationalError,
+        InterfaceError) se propagan para que _run reintente. Las órdenes que ya
+        quedaron guardadas o descartadas salen de `batch`, así el reintento
+        solo repite las pendientes.
+        """
+        cursor = conn.cursor()
+        try:
+            for priced in batch:
+                insert_order(cursor, priced)
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            raise
+        except psycopg2.DatabaseError:
+            conn.rollback()
+        else:
+            self._settle(batch, [])
+            batch.clear()
+            return
+
+        for priced in list(batch):
+            try:
+                insert_order(cursor, priced)
+                conn.commit()
+                self._settle([priced], [])
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                raise
+            except psycopg2.IntegrityError:
+                conn.rollback()
+                # Un COMMIT que falló del lado del cliente pero llegó al
+                # servidor: el reintento choca con su propio order_number
+                if self._saved(conn, priced['order_number']):
+                    self._settle([priced], [])
+                else:
+                    logger.exception("Orden %s rechazada por la BD", priced['order_number'])
+                    self._settle([], [priced])
+            except psycopg2.DatabaseError:
+                conn.rollback()
+                logger.exception("Orden %s rechazada por la BD", priced['order_number'])
+                self._settle([], [priced])
+            batch.remove(priced)
+
+    @staticmethod
+    def _saved(conn, order_number: str) -> bool:
+        """¿La orden ya está en la BD?"""
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM orders WHERE order_number = %s", (order_number,))
+        found = cursor.fetchone() is not None
+        conn.rollback()
+        return found
+
+    def _settle(self, saved: list, failed: list):
+        """Marcar órdenes como resueltas en el journal y sacarlas de vuelo"""
+        numbers = [p['order_number'] for p in saved + failed]
+        with self._lock:
+            # Bajo el lock de submit(): dos escrituras a la vez mezclarían líneas
+            # del journal, y pending() descarta las que no puede leer
+            self._journal.mark_committed(numbers)
+            for priced in failed:
+                self._failed[priced['order_number']] = priced
+            for number in numbers:
+                self._in_flight.pop(number, None)
+            if not self._in_flight and self._queue.empty():
+                self._journal.truncate()
+
+
+ingest_queue = OrderIngestQueue()
@@ -0,0 +1,82 @@
+"""
+Control de stock de ingredientes
+
+El descuento de stock se hace dentro de la misma transacción que inserta la
+orden y con un único UPDATE ... FROM sobre toda la canasta. Antes se bloquean
+las filas de ingredientes en orden de id: dos órdenes con ingredientes en
+común siempre toman los locks en el mismo orden, así que no hay deadlocks.
+El CHECK (stock >= 0) de la tabla rechaza la orden si no alcanza el stock.
+"""
+from collections import defaultdict
+from typing import Iterable, List
+
+
+def consume_stock(cursor, items: Iterable[dict]) -> List[int]:
+    """
+    Descontar del stock los ingredientes de una canasta (sin commit)
+
+    Args:
+        items: items tasados, con `product_id` y `quantity`
+
+    Returns:
+        list: ids de productos marcados como no disponibles por falta de stock
+
+    Raises:
+        psycopg2.errors.CheckViolation: si algún ingrediente quedaría negativo
+    """
+    basket = defaultdict(int)
+    for item in items:
+        basket[item['product_id']] += item['quantity']
+    product_ids, quantities = list(basket), list(basket.values())
+
+    # Bloquear en orden fijo los ingredientes que se van a tocar
+    cursor.execute(
+        """SELECT i.id FROM ingredients i
+           WHERE i.id IN (SELECT r.ingredient_id FROM recipes r WHERE r.product_id = ANY(%s))
+           ORDER BY i.id
+           FOR UPDATE""",
+        (product_ids,)
+    )
+    if not cursor.fetchall():
+        # Ningún producto de la canasta tiene receta: no se controla stock
+        return []
+
+    # Descuento en bloque y, en la misma sentencia, qué productos ya no se
+    # pueden preparar con el stock restante
+    cursor.execute(
+        """WITH basket AS (
+               SELECT * FROM unnest(%s::int[], %s::int[]) AS b(product_id, quantity)
+           ), needed AS (
+               SELECT r.ingredient_id, SUM(r.quantity * b.quantity) AS amount
+               FROM basket b
+               JOIN recipes r ON r.product_id = b.product_id
+               GROUP BY r.ingredient_id
+           ), updated AS (
+               UPDATE ingredients i
+               SET stock = i.stock - n.amount
+               FROM needed n
+               WHERE i.id = n.ingredient_id
+               RETURNING i.id, i.stock
+           )
+           SELECT DISTINCT r.product_id
+           FROM updated u
+           JOIN recipes r ON r.ingredient_id = u.id
+           JOIN products p ON p.id = r.product_id
+           WHERE u.stock < r.quantity AND p.is_available""",
+        (product_ids, quantities)
+    )
+    exhausted = [row['product_id'] for row in cursor.fetchall()]
+
+    # Solo si hay productos que recién se agotan: el trigger de sentencia
+    # cambia la versión del catálogo (y avisa por NOTIFY) aunque el UPDATE no
+    # toque ninguna fila
+    if exhausted:
+        cursor.execute(
+            """UPDATE products SET is_available = false
+               WHERE id = ANY(%s) AND is_available = true
+               RETURNING id""",
+            (exhausted,)
+        )
+        exhausted = [row['id'] for row in cursor.fetchall()]
+
+    return exhausted
@@ -1,20 +1,73 @@
 """
 Aplicación principal FastAPI
 """
+import logging
+from contextlib import asynccontextmanager, contextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime
 
+import psycopg2
+
 from .config import settings
-from .routers import categories, products, orders, modifiers, tables, reports, customers
+from .database import close_pools, open_pool, store_db
+from .serialization import PosJSONResponse
+from .compression import CompressionMiddleware
+from .coalescing import CoalescingMiddleware
+from .ratelimit import RateLimitMiddleware
+from .ingest import ingest_queue
+from .stores import stores as store_registry
+from .routers import categories, products, orders, modifiers, tables, reports, customers, kitchen, menu, delivery, inventory, stores, promotions, forecast, sync, receipts
+
+logger = logging.getLogger(__name__)
+
+def warm_up():
+    """
+    Dejar listo lo que si no pagaría el primer request: conexiones de los
+    pools, menú e índice de clientes de cada local, y el esquema OpenAPI
+    """
+    app.openapi()
+    for store in store_registry.values():
+        try:
+            open_pool(store)
+            with contextmanager(store_db)(store) as conn:
+                store.catalog.get(conn)
+                store.customer_index.get(conn)
+        except psycopg2.Error:
+            # Sin BD al arrancar: se abrirá todo con el primer request
+            logger.exception("No se pudo precalentar la conexión del local %s", store.id)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y apagado de la aplicación"""
+    warm_up()
+    # Escuchar cambios del catálogo (agotados, precios) para aplicarlos al instante
+    for store in store_registry.values():
+        store.catalog_listener.start()
+    # Escritor de órdenes diferidas (re-encola lo pendiente del journal)
+    if settings.ORDER_WRITE_BEHIND:
+        ingest_queue.start()
+    yield
+    # Vaciar la cola de órdenes diferidas antes de cerrar las conexiones
+    ingest_queue.stop()
+    for store in store_registry.values():
+        store.catalog_listener.stop()
+    close_pools()
 
 # Crear aplicación
 app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
-    description=settings.API_DESCRIPTION
+    description=settings.API_DESCRIPTION,
+    default_response_class=PosJSONResponse,
+    lifespan=lifespan
 )
 
+# Compartir una sola consulta entre GETs idénticos simultáneos (p. ej. todas
+# las cajas reconectándose a la vez). Va por dentro de CORS y compresión.
+if settings.COALESCE_PATHS:
+    app.add_middleware(CoalescingMiddleware, paths=settings.COALESCE_PATHS)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +77,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Comprimir respuestas grandes (listas JSON) para la Wi-Fi del local
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
+# Límite por cliente: lo más externo, para que rechazar no cueste nada
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(
+        RateLimitMiddleware,
+        rate=settings.RATE_LIMIT_PER_SECOND,
+        burst=settings.RATE_LIMIT_BURST
+    )
+
 # Registrar routers
 app.include_router(categories.router, prefix="/api/categories", tags=["Categories"])
 app.include_router(products.router, prefix="/api/products", tags=["Products"])
@@ -32,6 +97,15 @@ app.include_router(modifiers.router, prefix="/api/modifiers", tags=["Modifiers"]
 app.include_router(tables.router, prefix="/api/tables", tags=["Tables"])
 app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
 app.include_router(customers.router, prefix="/api/customers", tags=["Customers"])
+app.include_router(kitchen.router, prefix="/api/kitchen", tags=["Kitchen"])
+app.include_router(menu.router, prefix="/api/menu", tags=["Menu"])
+app.include_router(delivery.router, prefix="/api/delivery", tags=["Delivery"])
+app.include_router(inventory.router, prefix="/api/inventory", tags=["Inventory"])
+app.include_router(stores.router, prefix="/api/stores", tags=["Stores"])
+app.include_router(promotions.router, prefix="/api/promotions", tags=["Promotions"])
+app.include_router(forecast.router, prefix="/api/forecast", tags=["Forecast"])
+app.include_router(sync.router, prefix="/api/sync", tags=["Sync"])
+app.include_router(receipts.router, prefix="/api/receipts", tags=["Receipts"])
 
 # Endpoints principales
 @app.get("/")
@@ -49,7 +123,12 @@ def read_root():
             "modifiers": "/api/modifiers",
             "tables": "/api/tables",
             "reports": "/api/reports",
-            "customers": "/api/customers"
+            "customers": "/api/customers",
+            "kitchen": "/api/kitchen/queue",
+            "menu": "/api/menu",
+            "delivery": "/api/delivery",
+            "inventory": "/api/inventory",
+            "stores": "/api/stores"
         }
     }
 
@@ -2,7 +2,7 @@
 Exportación centralizada de modelos
 """
 from .category import Category, CategoryCreate, CategoryBase
-from .product import Product, ProductCreate, ProductUpdate, ProductBase
+from .product import Product, ProductCreate, ProductUpdate, ProductBase, ProductAvailabilityUpdate
 from .order import (
     OrderCreate, OrderUpdate, OrderResponse, OrderItemCreate,
     OrderItemResponse, OrderItemModifier, UpdateOrderPaymentRequest,
@@ -11,14 +11,25 @@ from .order import (
 from .modifier import Modifier, ModifierCreate, ModifierBase
 from .table import Table, TableCreate, TableBase
 from .customer import Customer, CustomerCreate, CustomerUpdate, CustomerBase
+from .kitchen import KitchenTicket, KitchenTicketItem, KitchenTicketModifier
+from .inventory import (
+    Ingredient, IngredientCreate, IngredientBase, RestockRequest, RecipeLine, RecipeUpdate
+)
+from .promotion import Promotion, PromotionCreate, PromotionBase
+from .payment import Payment, PaymentRequest, TenderCreate
 
 __all__ = [
     "Category", "CategoryCreate", "CategoryBase",
-    "Product", "ProductCreate", "ProductUpdate", "ProductBase",
+    "Product", "ProductCreate", "ProductUpdate", "ProductBase", "ProductAvailabilityUpdate",
     "OrderCreate", "OrderUpdate", "OrderResponse", "OrderItemCreate",
     "OrderItemResponse", "OrderItemModifier", "UpdateOrderPaymentRequest",
     "CreateOrderRequest", "OrderItemDto",
     "Modifier", "ModifierCreate", "ModifierBase",
     "Table", "TableCreate", "TableBase",
     "Customer", "CustomerCreate", "CustomerUpdate", "CustomerBase",
+    "KitchenTicket", "KitchenTicketItem", "KitchenTicketModifier",
+    "Ingredient", "IngredientCreate", "IngredientBase", "RestockRequest",
+    "RecipeLine", "RecipeUpdate",
+    "Promotion", "PromotionCreate", "PromotionBase",
+    "Payment", "PaymentRequest", "TenderCreate",
 ]
@@ -1,10 +1,47 @@
 """
 Modelos Pydantic para Clientes
 """
-from pydantic import BaseModel
+import re
+from pydantic import BaseModel, field_validator
 from typing import Optional
 from datetime import datetime
 
+_PHONE_SEPARATORS = re.compile(r"[\s().\-/]")
+
+
+def normalize_phone(raw: Optional[str]) -> Optional[str]:
+    """
+    Teléfono en formato nacional (0871234567), o None si no es válido
+
+    Acepta separadores, el prefijo +353/00353 (con o sin el 0 después) y el 0
+    inicial que se pierde al abrir el CSV en una planilla. Los números de
+    otros países quedan como +<dígitos>.
+    """
+    phone = _PHONE_SEPARATORS.sub("", raw or "")
+    if phone.startswith("00"):
+        phone = "+" + phone[2:]
+    if phone.startswith("+353"):
+        phone = "0" + phone[4:].lstrip("0")
+    elif phone.startswith("+"):
+        digits = phone[1:]
+        return phone if digits.isdigit() and 7 <= len(digits) <= 15 else None
+
+    if not phone.isdigit():
+        return None
+    if not phone.startswith("0") and 8 <= len(phone) <= 9:
+        phone = "0" + phone
+    return phone if phone.startswith("0") and 7 <= len(phone) <= 11 else None
+
+
+def _validate_phone(value: Optional[str]) -> Optional[str]:
+    """Validador de pydantic: teléfono normalizado (422 si no es válido)"""
+    if value is None:
+        return None
+    phone = normalize_phone(value)
+    if phone is None:
+        raise ValueError(f"Teléfono inválido: {value}")
+    return phone
+
 class CustomerBase(BaseModel):
     """Base para cliente"""
     phone: str
@@ -22,7 +59,10 @@ class CustomerBase(BaseModel):
 
 class CustomerCreate(CustomerBase):
     """Modelo para crear cliente"""
-    pass
+    # El teléfono identifica al cliente: se guarda siempre normalizado. Va en
+    # los modelos de entrada y no en CustomerBase para que Customer no rechace
+    # filas viejas que no se pudieron normalizar
+    _normalize_phone = field_validator("phone")(_validate_phone)
 
 class CustomerUpdate(BaseModel):
     """Modelo para actualizar cliente"""
@@ -40,6 +80,8 @@ class CustomerUpdate(BaseModel):
     notes: Optional[str] = None
     is_active: Optional[bool] = None
 
+    _normalize_phone = field_validator("phone")(_validate_phone)
+
 class Customer(CustomerBase):
     """Modelo completo de cliente"""
     id: int
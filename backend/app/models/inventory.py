@@ -0,0 +1,38 @@
+"""
+Modelos Pydantic para Inventario
+"""
+from pydantic import BaseModel, Field
+from typing import List
+from datetime import datetime
+
+class IngredientBase(BaseModel):
+    """Base para ingrediente"""
+    name: str
+    unit: str = "unit"  # 'unit', 'g', 'ml', ...
+    stock: float = Field(0, ge=0)
+
+class IngredientCreate(IngredientBase):
+    """Modelo para crear ingrediente"""
+    pass
+
+class Ingredient(IngredientBase):
+    """Modelo completo de ingrediente"""
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class RestockRequest(BaseModel):
+    """Modelo para ajustar stock (positivo para reponer, negativo para mermas)"""
+    quantity: float
+
+class RecipeLine(BaseModel):
+    """Ingrediente de una receta, por unidad de producto"""
+    ingredient_id: int
+    quantity: float = Field(..., gt=0)
+
+class RecipeUpdate(BaseModel):
+    """Modelo para reemplazar la receta de un producto"""
+    ingredients: List[RecipeLine]
@@ -0,0 +1,37 @@
+"""
+Modelos Pydantic para la pantalla de cocina
+"""
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class KitchenTicketModifier(BaseModel):
+    """Modificador de un item en el ticket de cocina"""
+    modifier_id: int
+    modifier_name: str
+    quantity: int = 1
+    price: float = 0.00
+
+class KitchenTicketItem(BaseModel):
+    """Item de un ticket de cocina"""
+    id: int
+    product_id: int
+    product_name: str
+    quantity: int
+    unit_price: float
+    subtotal: float
+    special_instructions: Optional[str] = None
+    modifiers: List[KitchenTicketModifier] = []
+
+class KitchenTicket(BaseModel):
+    """Ticket abierto (pending/preparing) con sus items"""
+    id: int
+    order_number: str
+    customer_name: Optional[str] = None
+    order_type: str
+    table_id: Optional[int] = None
+    status: str
+    notes: Optional[str] = None
+    created_at: datetime
+    promised_at: Optional[datetime] = None
+    items: List[KitchenTicketItem] = []
@@ -30,12 +30,16 @@ class OrderItemResponse(BaseModel):
 
 class OrderCreate(BaseModel):
     """Modelo para crear orden"""
-    customer_name: Optional[str] = None
-    order_type: str  # 'dine-in', 'takeout', 'delivery'
+    customer_id: Optional[int] = None
+    # Largos de las columnas de orders: con write-behind la orden se acepta
+    # antes de llegar a la BD, así que se validan aquí
+    customer_name: Optional[str] = Field(None, max_length=200)
+    order_type: str = Field(..., max_length=20)  # 'dine-in', 'takeout', 'delivery'
     table_id: Optional[int] = None
     items: List[OrderItemCreate]
-    payment_method: Optional[str] = None
+    payment_method: Optional[str] = Field(None, max_length=50)
     notes: Optional[str] = None
+    promised_at: Optional[datetime] = None
 
 class OrderUpdate(BaseModel):
     """Modelo para actualizar orden"""
@@ -46,15 +50,20 @@ class OrderResponse(BaseModel):
     """Respuesta completa de orden"""
     id: int
     order_number: str
+    customer_id: Optional[int] = None
     customer_name: Optional[str]
     order_type: str
     status: str
     subtotal: float
     tax: float
     discount: float
+    delivery_fee: float = 0.00
     total: float
     payment_method: Optional[str]
+    paid_amount: float = 0.00
+    payment_status: str = "unpaid"  # 'unpaid', 'partial', 'paid'
     notes: Optional[str]
+    promised_at: Optional[datetime] = None
     created_at: datetime
     completed_at: Optional[datetime]
 
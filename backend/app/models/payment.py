@@ -0,0 +1,34 @@
+"""
+Modelos Pydantic para Pagos
+"""
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class TenderCreate(BaseModel):
+    """Un pago (una forma de pago) dentro de un cobro"""
+    method: str  # 'cash', 'card', 'transfer'
+    # Se guardan con dos decimales: por debajo de un céntimo quedarían en 0.00
+    amount: float = Field(..., ge=0.01)
+    tendered: Optional[float] = Field(None, ge=0.01)  # efectivo entregado
+    reference: Optional[str] = None
+
+class PaymentRequest(BaseModel):
+    """Cobro de una orden: una o varias formas de pago (cuenta dividida)"""
+    tenders: List[TenderCreate] = Field(..., min_length=1)
+    created_by: Optional[str] = None
+
+class Payment(BaseModel):
+    """Pago registrado"""
+    id: int
+    order_id: int
+    method: str
+    amount: float
+    tendered: Optional[float] = None
+    reference: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: datetime
+    voided_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
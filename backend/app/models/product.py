@@ -2,7 +2,7 @@
 Modelos Pydantic para Productos
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 class ProductBase(BaseModel):
@@ -27,6 +27,12 @@ class ProductUpdate(BaseModel):
     image_url: Optional[str] = None
     is_available: Optional[bool] = None
 
+class ProductAvailabilityUpdate(BaseModel):
+    """Modelo para activar/desactivar ("86") varios productos a la vez"""
+    product_ids: List[int] = []
+    category_ids: List[int] = []
+    is_available: bool
+
 class Product(ProductBase):
     """Modelo completo de producto"""
     id: int
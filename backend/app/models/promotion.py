@@ -0,0 +1,36 @@
+"""
+Modelos Pydantic para Promociones
+"""
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import date, datetime, time
+
+class PromotionBase(BaseModel):
+    """Base para promoción"""
+    name: str
+    kind: str  # 'percentage', 'bogo', 'combo'
+    product_ids: List[int] = []  # combo: sus productos (repetidos = varias unidades)
+    category_ids: List[int] = []
+    percent: Optional[float] = Field(None, gt=0, le=100)
+    buy_quantity: Optional[int] = Field(None, gt=0)
+    free_quantity: Optional[int] = Field(None, gt=0)
+    combo_price: Optional[float] = Field(None, ge=0)
+    days_of_week: List[int] = []  # 1 = lunes ... 7 = domingo; vacío = todos
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    valid_from: Optional[date] = None
+    valid_until: Optional[date] = None
+    is_active: bool = True
+
+class PromotionCreate(PromotionBase):
+    """Modelo para crear (o reemplazar) una promoción"""
+    pass
+
+class Promotion(PromotionBase):
+    """Modelo completo de promoción"""
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
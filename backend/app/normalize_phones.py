@@ -0,0 +1,134 @@
+"""
+Migración: normalizar los teléfonos de los clientes existentes
+
+Los clientes creados antes de que la API normalizara el teléfono pueden tener
+el mismo número escrito de varias formas (087 123 4567, +353871234567...).
+Este script los pasa al formato de normalize_phone; si varios clientes quedan
+con el mismo teléfono se fusionan en uno: el que ya tenía el teléfono
+normalizado o, si no, el de más órdenes (a igualdad, el más antiguo). Sus
+órdenes y favoritos pasan a ese cliente, se suman los totales, los datos que
+le falten se completan con los de los otros y los otros se borran.
+
+Los teléfonos que no se pueden normalizar se dejan como están y se listan.
+Cada local se migra en una sola transacción; con --dry-run se informa lo que
+se haría sin guardar nada.
+
+Uso (desde backend/):
+    python -m app.normalize_phones [--store ID] [--dry-run]
+"""
+import argparse
+from typing import Dict, List
+
+from .models.customer import normalize_phone
+from .stores import stores
+
+# Columnas que se completan con las de los clientes fusionados si están vacías
+FILLED_COLUMNS = (
+    "email", "address_line1", "address_line2", "eircode", "latitude", "longitude", "notes",
+)
+
+
+def _merge(cursor, keeper: int, duplicates: List[int]):
+    """Pasar órdenes, favoritos, totales y datos de los duplicados al cliente que queda"""
+    cursor.execute(
+        "UPDATE orders SET customer_id = %s WHERE customer_id = ANY(%s)",
+        (keeper, duplicates)
+    )
+    cursor.execute(
+        """INSERT INTO customer_favourites
+               (customer_id, product_id, times_ordered, total_quantity, last_ordered_at)
+           SELECT %s, product_id, SUM(times_ordered), SUM(total_quantity), MAX(last_ordered_at)
+           FROM customer_favourites
+           WHERE customer_id = ANY(%s)
+           GROUP BY product_id
+           ON CONFLICT (customer_id, product_id) DO UPDATE SET
+               times_ordered = customer_favourites.times_ordered + EXCLUDED.times_ordered,
+               total_quantity = customer_favourites.total_quantity + EXCLUDED.total_quantity,
+               last_ordered_at = GREATEST(customer_favourites.last_ordered_at, EXCLUDED.last_ordered_at)""",
+        (keeper, duplicates)
+    )
+    # Del más nuevo al más viejo: ante dos valores gana el dato más reciente
+    filled = ", ".join(
+        f"{column} = COALESCE(c.{column}, (SELECT d.{column} FROM customers d"
+        f" WHERE d.id = ANY(%(duplicates)s) AND d.{column} IS NOT NULL ORDER BY d.id DESC LIMIT 1))"
+        for column in FILLED_COLUMNS
+    )
+    cursor.execute(
+        f"""UPDATE customers c SET {filled},
+               total_orders = c.total_orders + d.total_orders,
+               total_spent = c.total_spent + d.total_spent,
+               is_active = c.is_active OR d.is_active
+           FROM (SELECT COALESCE(SUM(total_orders), 0) AS total_orders,
+                        COALESCE(SUM(total_spent), 0) AS total_spent,
+                        bool_or(is_active) AS is_active
+                 FROM customers WHERE id = ANY(%(duplicates)s)) d
+           WHERE c.id = %(keeper)s""",
+        {"keeper": keeper, "duplicates": duplicates}
+    )
+    cursor.execute("DELETE FROM customers WHERE id = ANY(%s)", (duplicates,))
+
+
+def migrate(conn, dry_run: bool = False) -> dict:
+    """
+    Normalizar los teléfonos de un local (una transacción)
+
+    Returns:
+        dict: clientes normalizados, fusionados (id que queda -> ids borrados)
+            y teléfonos inválidos (id -> teléfono)
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, phone, total_orders FROM customers ORDER BY id FOR UPDATE")
+
+    groups: Dict[str, List[dict]] = {}
+    invalid = {}
+    for row in cursor.fetchall():
+        phone = normalize_phone(row['phone'])
+        if phone is None:
+            invalid[row['id']] = row['phone']
+        else:
+            groups.setdefault(phone, []).append(row)
+
+    normalized = 0
+    merged = {}
+    for phone, rows in groups.items():
+        keeper, *duplicates = sorted(
+            rows, key=lambda row: (row['phone'] != phone, -row['total_orders'], row['id'])
+        )
+        if duplicates:
+            merged[keeper['id']] = [row['id'] for row in duplicates]
+            _merge(cursor, keeper['id'], merged[keeper['id']])
+        # Los duplicados ya no están: el teléfono normalizado quedó libre
+        if keeper['phone'] != phone:
+            cursor.execute("UPDATE customers SET phone = %s WHERE id = %s", (phone, keeper['id']))
+            normalized += 1
+
+    if dry_run:
+        conn.rollback()
+    else:
+        conn.commit()
+    return {"normalized": normalized, "merged": merged, "invalid": invalid}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Normalizar los teléfonos de los clientes")
+    parser.add_argument("--store", choices=sorted(stores), default=None,
+                        help="Local a migrar (por defecto, todos)")
+    parser.add_argument("--dry-run", action="store_true", help="Informar sin guardar los cambios")
+    args = parser.parse_args()
+
+    for store in ([stores[args.store]] if args.store else stores.values()):
+        conn = store.connect()
+        try:
+            result = migrate(conn, args.dry_run)
+        finally:
+            conn.close()
+        print(f"{store.id}: {result['normalized']} teléfonos normalizados, "
+              f"{sum(len(ids) for ids in result['merged'].values())} clientes fusionados")
+        for keeper, duplicates in result['merged'].items():
+            print(f"  cliente {keeper} <- {', '.join(map(str, duplicates))}")
+        for customer_id, phone in result['invalid'].items():
+            print(f"  cliente {customer_id}: teléfono inválido, sin cambios: {phone}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Fragmentos SQL para obtener el árbol de una orden (orden → items → modificadores)
+en una sola consulta, en lugar de una consulta por item.
+"""
+
+# Subconsulta correlacionada sobre el alias `o` (orders): devuelve los items de
+# la orden con sus modificadores como un arreglo JSON ya armado por PostgreSQL.
+ORDER_ITEMS_JSON = """
+    COALESCE((
+        SELECT json_agg(json_build_object(
+            'id', oi.id,
+            'product_id', oi.product_id,
+            'product_name', p.name,
+            'quantity', oi.quantity,
+            'unit_price', oi.unit_price,
+            'subtotal', oi.subtotal,
+            'special_instructions', oi.special_instructions,
+            'modifiers', COALESCE((
+                SELECT json_agg(json_build_object(
+                    'modifier_id', oim.modifier_id,
+                    'modifier_name', m.name,
+                    'quantity', oim.quantity,
+                    'price', oim.price
+                ) ORDER BY oim.id)
+                FROM order_item_modifiers oim
+                JOIN modifiers m ON m.id = oim.modifier_id
+                WHERE oim.order_item_id = oi.id
+            ), '[]'::json)
+        ) ORDER BY oi.id)
+        FROM order_items oi
+        JOIN products p ON p.id = oi.product_id
+        WHERE oi.order_id = o.id
+    ), '[]'::json)
+"""
+
+# Pagos vigentes de la orden (alias `o`), para tickets y recibos
+ORDER_PAYMENTS_JSON = """
+    COALESCE((
+        SELECT json_agg(json_build_object(
+            'method', pa.method,
+            'amount', pa.amount,
+            'tendered', pa.tendered,
+            'reference', pa.reference
+        ) ORDER BY pa.id)
+        FROM payments pa
+        WHERE pa.order_id = o.id AND pa.voided_at IS NULL
+    ), '[]'::json)
+"""
+
+# Promociones aplicadas a la orden (alias `o`) con su descuento
+ORDER_PROMOTIONS_JSON = """
+    COALESCE((
+        SELECT json_agg(json_build_object(
+            'promotion_id', op.promotion_id,
+            'name', pr.name,
+            'amount', op.amount
+        ) ORDER BY op.promotion_id)
+        FROM order_promotions op
+        JOIN promotions pr ON pr.id = op.promotion_id
+        WHERE op.order_id = o.id
+    ), '[]'::json)
+"""
@@ -0,0 +1,167 @@
+"""
+Cálculo de totales y persistencia de órdenes
+
+Compartido por POST /api/orders (camino síncrono) y por la ingesta diferida
+(app.ingest), para que ambos calculen y guarden las órdenes exactamente igual.
+Una orden "tasada" es un dict plano serializable a JSON (se escribe tal cual
+en el journal de la ingesta diferida).
+"""
+from datetime import datetime
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+
+from . import queries
+from .config import settings
+from .inventory import consume_stock
+from .promotions import PromotionIndex
+
+# Búsquedas de precio: devuelven el precio o None si no existe/no está disponible
+PriceLookup = Callable[[int], Optional[float]]
+
+
+def price_order(order, product_price: PriceLookup, modifier_price: PriceLookup,
+                delivery_fee: float = 0, tax_rate: float = settings.TAX_RATE,
+                promotions: Optional[PromotionIndex] = None, at: Optional[datetime] = None) -> dict:
+    """
+    Validar y tasar una OrderCreate (con la tasa de impuestos del local)
+
+    Con `promotions` se aplican las promociones vigentes en `at` (por defecto
+    ahora); el impuesto se calcula sobre el subtotal ya descontado.
+
+    Raises:
+        HTTPException: 400 si no tiene items, 404 si un producto no está disponible
+    """
+    if not order.items:
+        raise HTTPException(status_code=400, detail="La orden debe tener al menos un item")
+
+    subtotal = 0
+    items = []
+    for item in order.items:
+        unit_price = product_price(item.product_id)
+        if unit_price is None:
+            raise HTTPException(status_code=404, detail=f"Producto {item.product_id} no encontrado o no disponible")
+
+        item_price = unit_price * item.quantity
+
+        # Agregar precio de modificadores (los inexistentes se ignoran)
+        modifiers = []
+        for mod in item.modifiers or []:
+            price = modifier_price(mod.modifier_id)
+            if price is not None:
+                item_price += price * mod.quantity * item.quantity
+                modifiers.append({
+                    "modifier_id": mod.modifier_id,
+                    "quantity": mod.quantity,
+                    "price": price,
+                })
+
+        subtotal += item_price
+        items.append({
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "unit_price": unit_price,
+            "subtotal": unit_price * item.quantity,
+            "special_instructions": item.special_instructions,
+            "modifiers": modifiers,
+        })
+
+    discount, applied = promotions.apply(items, at or datetime.now()) if promotions else (0, [])
+    taxable = subtotal - discount
+    tax = taxable * tax_rate
+    return {
+        "customer_id": order.customer_id,
+        "customer_name": order.customer_name,
+        "order_type": order.order_type,
+        "table_id": order.table_id,
+        "payment_method": order.payment_method,
+        "notes": order.notes,
+        "promised_at": order.promised_at.isoformat() if order.promised_at else None,
+        "subtotal": round(subtotal, 2),
+        "tax": round(tax, 2),
+        "discount": discount,
+        "delivery_fee": delivery_fee,
+        "total": round(taxable + tax + delivery_fee, 2),
+        "items": items,
+        "promotions": applied,
+    }
+
+
+def next_order_number(cursor, prefix: str) -> str:
+    """Número de la próxima orden del día: <prefijo>-AAAAMMDD-NNNN"""
+    queries.execute(cursor, "orders_today_count")
+    count = cursor.fetchone()['count']
+    return f"{prefix}-{datetime.now().strftime('%Y%m%d')}-{count + 1:04d}"
+
+
+def insert_order(cursor, priced: dict) -> dict:
+    """
+    Insertar una orden tasada con sus items y modificadores (sin commit)
+
+    Raises:
+        psycopg2.errors.CheckViolation: si no alcanza el stock de algún ingrediente
+
+    `priced` debe traer `order_number`; `created_at` es opcional (la ingesta
+    diferida guarda la hora en que se aceptó la orden, no la de escritura).
+    """
+    # La orden y la primera fila de su historial de estados, en una sentencia
+    queries.execute(
+        cursor, "insert_order",
+        (priced['order_number'], priced.get('customer_id'), priced['customer_name'],
+         priced['order_type'], priced['table_id'], priced['subtotal'], priced['tax'],
+         priced.get('delivery_fee', 0), priced['total'], priced['payment_method'], priced['notes'],
+         priced['promised_at'], 'pending', priced.get('created_at'), priced.get('discount', 0))
+    )
+    new_order = cursor.fetchone()
+    order_id = new_order['id']
+
+    # Promociones aplicadas y su importe (para medir su efecto en ventas)
+    for promotion in priced.get('promotions', ()):
+        queries.execute(
+            cursor, "insert_order_promotion",
+            (order_id, promotion['promotion_id'], promotion['amount'])
+        )
+
+    # Si la orden es para una mesa, marcar mesa como ocupada
+    if priced['table_id']:
+        queries.execute(cursor, "occupy_table", (priced['table_id'],))
+
+    # Insertar items de la orden y sus modificadores
+    for item in priced['items']:
+        queries.execute(
+            cursor, "insert_order_item",
+            (order_id, item['product_id'], item['quantity'], item['unit_price'],
+             item['subtotal'], item['special_instructions'])
+        )
+        order_item_id = cursor.fetchone()['id']
+
+        for mod in item['modifiers']:
+            queries.execute(
+                cursor, "insert_order_item_modifier",
+                (order_item_id, mod['modifier_id'], mod['quantity'], mod['price'])
+            )
+
+    # Descontar stock de ingredientes (agota productos si ya no alcanza)
+    consume_stock(cursor, priced['items'])
+
+    # Acumulados del cliente: totales y productos favoritos
+    if priced.get('customer_id'):
+        cursor.execute(
+            """UPDATE customers
+               SET total_orders = total_orders + 1, total_spent = total_spent + %s
+               WHERE id = %s""",
+            (priced['total'], priced['customer_id'])
+        )
+        cursor.execute(
+            """INSERT INTO customer_favourites (customer_id, product_id, times_ordered, total_quantity, last_ordered_at)
+               SELECT %s, product_id, 1, SUM(quantity), CURRENT_TIMESTAMP
+               FROM order_items WHERE order_id = %s
+               GROUP BY product_id
+               ON CONFLICT (customer_id, product_id) DO UPDATE SET
+                   times_ordered = customer_favourites.times_ordered + 1,
+                   total_quantity = customer_favourites.total_quantity + EXCLUDED.total_quantity,
+                   last_ordered_at = EXCLUDED.last_ordered_at""",
+            (priced['customer_id'], order_id)
+        )
+
+    return new_order
@@ -0,0 +1,128 @@
+"""
+Cobro de órdenes: cuentas divididas y pagos parciales
+
+Cada cobro (una o varias formas de pago) se registra en la misma transacción
+que actualiza el saldo de la orden, con la fila de la orden bloqueada
+(SELECT ... FOR UPDATE): dos tills cobrando la misma cuenta a la vez se
+serializan y el segundo ve el saldo que dejó el primero, así que nunca se
+cobra de más. Los totales por forma de pago del día los acumula un trigger en
+payment_totals (ver init.sql).
+"""
+from decimal import Decimal
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from . import queries
+
+VALID_METHODS = ("cash", "card", "transfer")
+
+CENT = Decimal("0.01")
+
+
+def _cents(value) -> Decimal:
+    return Decimal(str(value)).quantize(CENT)
+
+
+def _status(total: Decimal, paid: Decimal) -> str:
+    if paid <= 0:
+        return "unpaid"
+    return "paid" if paid >= total else "partial"
+
+
+def _lock_order(cursor, order_id: int) -> dict:
+    queries.execute(cursor, "order_for_update", (order_id,))
+    order = cursor.fetchone()
+    if not order:
+        raise HTTPException(status_code=404, detail="Orden no encontrada")
+    return order
+
+
+def take_payments(cursor, order_id: int, tenders: List, created_by: Optional[str] = None) -> dict:
+    """
+    Registrar un cobro de una orden (sin commit)
+
+    Args:
+        tenders: TenderCreate (method, amount y opcionalmente tendered y reference)
+
+    Returns:
+        dict: orden actualizada, pagos registrados y vuelto total
+
+    Raises:
+        HTTPException: 400 si una forma de pago es inválida o el cobro excede
+            el saldo, 404 si la orden no existe, 409 si está cancelada o pagada
+    """
+    for tender in tenders:
+        if tender.method not in VALID_METHODS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Forma de pago inválida. Debe ser: {', '.join(VALID_METHODS)}"
+            )
+        if tender.tendered is not None and _cents(tender.tendered) < _cents(tender.amount):
+            raise HTTPException(status_code=400, detail="El monto entregado es menor que el pago")
+
+    order = _lock_order(cursor, order_id)
+    if order['status'] == 'cancelled':
+        raise HTTPException(status_code=409, detail="La orden está cancelada")
+
+    total = _cents(order['total'])
+    paid = _cents(order['paid_amount'])
+    if paid >= total:
+        raise HTTPException(status_code=409, detail="La orden ya está pagada")
+
+    amount = sum((_cents(tender.amount) for tender in tenders), Decimal(0))
+    if paid + amount > total:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El cobro ({amount}) excede el saldo pendiente ({total - paid})"
+        )
+
+    payments = []
+    for tender in tenders:
+        queries.execute(
+            cursor, "insert_payment",
+            (order_id, tender.method, _cents(tender.amount), tender.tendered, tender.reference, created_by)
+        )
+        payments.append(cursor.fetchone())
+
+    paid += amount
+    queries.execute(cursor, "settle_order", (paid, _status(total, paid), order_id))
+    updated_order = cursor.fetchone()
+
+    change = sum(
+        (_cents(row['tendered']) - _cents(row['amount']) for row in payments if row['tendered'] is not None),
+        Decimal(0)
+    )
+    return {
+        "order": updated_order,
+        "payments": payments,
+        "balance_due": float(total - paid),
+        "change": float(change),
+    }
+
+
+def void_payment(cursor, order_id: int, payment_id: int) -> dict:
+    """
+    Anular un pago de una orden y devolver su saldo (sin commit)
+
+    Raises:
+        HTTPException: 404 si la orden o el pago no existen, 409 si ya estaba anulado
+    """
+    order = _lock_order(cursor, order_id)
+    cursor.execute(
+        """UPDATE payments SET voided_at = CURRENT_TIMESTAMP
+           WHERE id = %s AND order_id = %s AND voided_at IS NULL
+           RETURNING *""",
+        (payment_id, order_id)
+    )
+    payment = cursor.fetchone()
+    if not payment:
+        cursor.execute("SELECT 1 FROM payments WHERE id = %s AND order_id = %s", (payment_id, order_id))
+        if cursor.fetchone():
+            raise HTTPException(status_code=409, detail="El pago ya estaba anulado")
+        raise HTTPException(status_code=404, detail="Pago no encontrado")
+
+    total = _cents(order['total'])
+    paid = _cents(order['paid_amount']) - _cents(payment['amount'])
+    queries.execute(cursor, "settle_order", (paid, _status(total, paid), order_id))
+    return {"order": cursor.fetchone(), "payment": payment, "balance_due": float(total - paid)}
@@ -0,0 +1,119 @@
+"""
+Impresora de prueba: consume el spool de impresión
+
+Reemplaza a la impresora real mientras no hay una conectada: toma los
+documentos de spool/<impresora>/ en orden de llegada, muestra el texto (de los
+ESC/POS interpreta los comandos que genera app/receipts.py) y los mueve a
+spool/<impresora>/done/. Cada archivo se reclama renombrándolo antes de
+imprimirlo, así que se pueden correr varias sin imprimir dos veces lo mismo.
+
+Uso (desde backend/):
+    python -m app.printer [--printer kitchen] [--once] [--interval 1.0]
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+from .config import settings
+from .receipts import (
+    ESC_BOLD, ESC_CODEPAGE, ESC_FEED, ESC_INIT, ESCPOS_ENCODING, GS_CUT, GS_SIZE, KINDS
+)
+
+CLAIMED_SUFFIX = ".printing"
+
+# Comandos con un byte de argumento
+_COMMANDS_WITH_ARG = (ESC_BOLD, ESC_FEED, GS_SIZE, GS_CUT, ESC_CODEPAGE[:2])
+
+
+def escpos_to_text(data: bytes) -> str:
+    """Texto de un documento ESC/POS; marca los cortes de papel"""
+    out = bytearray()
+    position = 0
+    while position < len(data):
+        command = data[position:position + 2]
+        if command == ESC_INIT:
+            position += 2
+        elif command in _COMMANDS_WITH_ARG:
+            if command == GS_CUT:
+                out += b"--- corte ---\n"
+            elif command == ESC_FEED:
+                out += b"\n" * data[position + 2]
+            position += 3
+        else:
+            out.append(data[position])
+            position += 1
+    return out.decode(ESCPOS_ENCODING, errors="replace")
+
+
+def pending(directory: str) -> List[str]:
+    """Documentos listos para imprimir, del más antiguo al más nuevo"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return sorted(
+        name for name in names
+        if not name.endswith((".tmp", CLAIMED_SUFFIX)) and os.path.isfile(os.path.join(directory, name))
+    )
+
+
+def print_file(path: str, out=sys.stdout):
+    """'Imprimir' un documento del spool"""
+    with open(path, "rb") as f:
+        data = f.read()
+    name = os.path.basename(path)[:-len(CLAIMED_SUFFIX)]
+    out.write(f"=== {name} ===\n")
+    if name.endswith(".bin"):
+        out.write(escpos_to_text(data))
+    elif name.endswith(".txt"):
+        out.write(data.decode("utf-8", errors="replace"))
+    else:
+        out.write(f"[{len(data)} bytes]\n")
+    out.flush()
+
+
+def drain(printer: str) -> int:
+    """
+    Imprimir todo lo pendiente de una impresora
+
+    Returns:
+        int: documentos impresos
+    """
+    directory = os.path.join(settings.PRINT_SPOOL_DIR, printer)
+    done = os.path.join(directory, "done")
+    printed = 0
+    for name in pending(directory):
+        path = os.path.join(directory, name)
+        claimed = path + CLAIMED_SUFFIX
+        try:
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            continue  # la tomó otra impresora
+        print_file(claimed)
+        os.makedirs(done, exist_ok=True)
+        os.replace(claimed, os.path.join(done, name))
+        printed += 1
+    return printed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Impresora de prueba que consume el spool")
+    parser.add_argument("--printer", choices=KINDS, action="append",
+                        help="Impresora a atender (repetible; por defecto, todas)")
+    parser.add_argument("--once", action="store_true", help="Imprimir lo pendiente y salir")
+    parser.add_argument("--interval", type=float, default=1.0, help="Segundos entre revisiones del spool")
+    args = parser.parse_args()
+
+    printers = args.printer or list(KINDS)
+    while True:
+        for printer in printers:
+            drain(printer)
+        if args.once:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Motor de promociones: combos, 2x1 (compre N lleve M), happy hour y
+descuentos por categoría
+
+Las promociones activas se compilan una vez por versión del catálogo (ver
+catalog.MenuSnapshot) en un índice por producto y por franja horaria (hora de
+la semana). Así cada canasta solo evalúa las reglas que tocan alguno de sus
+productos y están vigentes a esa hora, en lugar de recorrer todas.
+
+Cada unidad de producto recibe a lo sumo una promoción: primero los combos
+(el de mayor ahorro primero), luego los 2x1 y por último el mejor porcentaje
+aplicable a lo que queda. Los descuentos se calculan sobre el precio del
+producto, no sobre los modificadores.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+
+KINDS = ("percentage", "bogo", "combo")
+
+# Franjas del índice: una por hora de la semana (lunes 0:00 = 0)
+SLOTS_PER_WEEK = 7 * 24
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def _minute(value, default: int) -> int:
+    """Minuto del día de un TIME (o `default` si es NULL)"""
+    return default if value is None else value.hour * 60 + value.minute
+
+
+def slot_of(at: datetime) -> int:
+    """Franja (hora de la semana) de un instante"""
+    return (at.isoweekday() - 1) * 24 + at.hour
+
+
+class Promotion:
+    """Regla compilada de una fila de promotions"""
+
+    __slots__ = (
+        "id", "name", "kind", "percent", "buy_quantity", "free_quantity",
+        "combo_price", "components", "targets", "days", "start", "end",
+        "valid_from", "valid_until",
+    )
+
+    def __init__(self, row: dict, targets: Iterable[int]):
+        self.id = row['id']
+        self.name = row['name']
+        self.kind = row['kind']
+        self.percent = float(row.get('percent') or 0)
+        self.buy_quantity = row.get('buy_quantity') or 0
+        self.free_quantity = row.get('free_quantity') or 0
+        self.combo_price = float(row.get('combo_price') or 0)
+        # Combo: los productos que lo forman (repetidos = más de una unidad)
+        self.components = Counter(row.get('product_ids') or ()) if self.kind == "combo" else Counter()
+        self.targets = frozenset(self.components or targets)
+        self.days = frozenset(row.get('days_of_week') or range(1, 8))
+        self.start = _minute(row.get('start_time'), 0)
+        self.end = _minute(row.get('end_time'), MINUTES_PER_DAY)
+        self.valid_from = row.get('valid_from')
+        self.valid_until = row.get('valid_until')
+
+    def covers(self, at: datetime) -> bool:
+        """True si la regla está vigente en ese instante"""
+        today = at.date()
+        if self.valid_from and today < self.valid_from:
+            return False
+        if self.valid_until and today > self.valid_until:
+            return False
+
+        minute = at.hour * 60 + at.minute
+        day = at.isoweekday()
+        if self.start < self.end:
+            return day in self.days and self.start <= minute < self.end
+        # La franja cruza la medianoche: después de las 0:00 cuenta el día anterior
+        if minute >= self.start:
+            return day in self.days
+        return minute < self.end and (day - 2) % 7 + 1 in self.days
+
+    def slots(self) -> Iterable[int]:
+        """Franjas del índice en las que la regla puede estar vigente"""
+        for day in self.days:
+            base = (day - 1) * 24
+            if self.start < self.end:
+                for hour in range(self.start // 60, (self.end - 1) // 60 + 1):
+                    yield base + hour
+                continue
+            for hour in range(self.start // 60, 24):
+                yield base + hour
+            if self.end > 0:
+                following = day % 7 * 24
+                for hour in range((self.end - 1) // 60 + 1):
+                    yield following + hour
+
+
+class PromotionIndex:
+    """Promociones activas de una versión del catálogo, indexadas"""
+
+    def __init__(self, rows: Iterable[dict], products: Dict[int, dict]):
+        by_category = defaultdict(set)
+        for product in products.values():
+            by_category[product['category_id']].add(product['id'])
+
+        by_product = defaultdict(list)
+        by_slot = [set() for _ in range(SLOTS_PER_WEEK)]
+        self.rules: Dict[int, Promotion] = {}
+        for row in rows:
+            targets = set(row.get('product_ids') or ())
+            for category_id in row.get('category_ids') or ():
+                targets |= by_category.get(category_id, set())
+            rule = Promotion(row, targets)
+            if not rule.targets:
+                continue
+            self.rules[rule.id] = rule
+            for product_id in rule.targets:
+                by_product[product_id].append(rule.id)
+            for slot in rule.slots():
+                by_slot[slot].add(rule.id)
+
+        self._by_product = {key: tuple(ids) for key, ids in by_product.items()}
+        self._by_slot = [frozenset(ids) for ids in by_slot]
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def candidates(self, product_ids: Iterable[int], at: datetime) -> List[Promotion]:
+        """Reglas vigentes en `at` que tocan alguno de los productos"""
+        in_slot = self._by_slot[slot_of(at)]
+        if not in_slot:
+            return []
+        ids = set()
+        for product_id in product_ids:
+            ids.update(self._by_product.get(product_id, ()))
+        ids &= in_slot
+        rules = self.rules
+        return [rules[key] for key in sorted(ids) if rules[key].covers(at)]
+
+    def apply(self, items: List[dict], at: datetime) -> Tuple[float, List[dict]]:
+        """
+        Descuento de una canasta tasada (items con product_id, quantity y
+        unit_price) en el instante `at`
+
+        Returns:
+            tuple: (descuento total, [{promotion_id, name, amount}])
+        """
+        if not self.rules:
+            return 0.0, []
+        product_ids = {item['product_id'] for item in items}
+        return evaluate(self.candidates(product_ids, at), items)
+
+
+def evaluate(rules: List[Promotion], items: List[dict]) -> Tuple[float, List[dict]]:
+    """Aplicar a una canasta unas reglas ya filtradas (vigentes y pertinentes)"""
+    if not rules:
+        return 0.0, []
+
+    remaining = Counter()
+    price = {}
+    for item in items:
+        remaining[item['product_id']] += item['quantity']
+        price[item['product_id']] = float(item['unit_price'])
+    basket = set(remaining)
+
+    savings = defaultdict(float)
+    by_kind = defaultdict(list)
+    for rule in rules:
+        by_kind[rule.kind].append(rule)
+
+    # Combos: el de mayor ahorro primero, tantas veces como alcancen las unidades
+    combos = []
+    for rule in by_kind["combo"]:
+        if all(product_id in price for product_id in rule.components):
+            saving = sum(price[key] * count for key, count in rule.components.items()) - rule.combo_price
+            if saving > 0:
+                combos.append((saving, rule))
+    for saving, rule in sorted(combos, key=lambda pair: (-pair[0], pair[1].id)):
+        times = min(remaining[key] // count for key, count in rule.components.items())
+        if times:
+            for key, count in rule.components.items():
+                remaining[key] -= count * times
+            savings[rule] += saving * times
+
+    # 2x1: en cada grupo de buy + free unidades, las más baratas van gratis
+    for rule in by_kind["bogo"]:
+        if not rule.buy_quantity or not rule.free_quantity:
+            continue
+        group = rule.buy_quantity + rule.free_quantity
+        units = sorted(
+            ((price[key], key) for key in rule.targets & basket for _ in range(remaining[key])),
+            reverse=True
+        )
+        groups = len(units) // group
+        for start in range(0, groups * group, group):
+            for unit_price, key in units[start:start + group]:
+                remaining[key] -= 1
+            savings[rule] += sum(unit_price for unit_price, _ in units[start + rule.buy_quantity:start + group])
+
+    # Porcentajes (happy hour, categorías): el mejor por producto
+    best = {}
+    for rule in by_kind["percentage"]:
+        for key in rule.targets & basket:
+            if remaining[key] > 0 and rule.percent > best.get(key, (0, None))[0]:
+                best[key] = (rule.percent, rule)
+    for key, (percent, rule) in best.items():
+        savings[rule] += price[key] * remaining[key] * percent / 100
+
+    applied = [
+        {"promotion_id": rule.id, "name": rule.name, "amount": round(amount, 2)}
+        for rule, amount in sorted(savings.items(), key=lambda pair: pair[0].id)
+        if round(amount, 2) > 0
+    ]
+    return round(sum(entry['amount'] for entry in applied), 2), applied
@@ -0,0 +1,159 @@
+"""
+Registro de consultas con nombre (sentencias preparadas)
+
+Las consultas más frecuentes se registran aquí con un nombre y se preparan
+(PREPARE) una sola vez por conexión del pool; desde ahí se ejecutan con
+EXECUTE y PostgreSQL no vuelve a parsearlas ni a planificarlas. Los
+parámetros se escriben $1, $2, ... como en PREPARE.
+
+Solo las conexiones de larga vida (PreparingConnection: los pools de la
+primaria y de la réplica, el escritor de ingest.py) preparan: en una
+conexión de un solo uso (pool agotado, scripts) preparar costaría más de lo
+que ahorra, así que ahí la consulta se ejecuta tal cual.
+
+Las sentencias preparadas viven en la sesión: no sirve detrás de un pooler en
+modo transacción (pgbouncer), que cambia la sesión entre transacciones.
+"""
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, Sequence
+
+from psycopg2.extensions import connection as _connection
+
+# Máximo de sentencias preparadas por conexión (las menos usadas se liberan)
+MAX_PREPARED_PER_CONNECTION = 128
+
+PARAM = re.compile(r"\$(\d+)")
+
+QUERIES: Dict[str, str] = {
+    # Versión del catálogo: se consulta en cada GET /api/menu y cada orden
+    "catalog_version": "SELECT version FROM catalog_version",
+    # Validadores de GET condicionales (ver conditional.py): versión hasta la
+    # que todo está confirmado y si una tabla cambió en un rango de versiones
+    "watermark_version": """
+        SELECT pg_snapshot_xmin(pg_current_snapshot())::text AS version,
+               (SELECT pruned_before::text FROM change_log_horizon) AS pruned_before
+    """,
+    "changed_between": """
+        SELECT EXISTS (
+            SELECT 1 FROM change_log
+            WHERE entity = $1 AND txid >= $2::xid8 AND txid < $3::xid8
+        ) AS changed
+    """,
+    "product_by_id": "SELECT * FROM products WHERE id = $1",
+    "order_for_update": "SELECT * FROM orders WHERE id = $1 FOR UPDATE",
+    "orders_today_count": "SELECT COUNT(*) as count FROM orders WHERE DATE(created_at) = CURRENT_DATE",
+    # Alta de órdenes (order_writer.insert_order): la orden con la primera
+    # fila de su historial de estados, sus items y sus modificadores
+    "insert_order": """
+        WITH new_order AS (
+            INSERT INTO orders (order_number, customer_id, customer_name, order_type, table_id,
+            subtotal, tax, delivery_fee, total, payment_method, notes, promised_at, status, created_at, discount)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, COALESCE($14, CURRENT_TIMESTAMP), $15)
+            RETURNING *
+        ), history AS (
+            INSERT INTO order_status_history (order_id, status, changed_at)
+            SELECT id, status, created_at FROM new_order
+        )
+        SELECT * FROM new_order""",
+    "insert_order_item": """
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price, subtotal, special_instructions)
+        VALUES ($1, $2, $3, $4, $5, $6) RETURNING id""",
+    "insert_order_item_modifier": """
+        INSERT INTO order_item_modifiers (order_item_id, modifier_id, quantity, price)
+        VALUES ($1, $2, $3, $4)""",
+    "insert_order_promotion": """
+        INSERT INTO order_promotions (order_id, promotion_id, amount)
+        VALUES ($1, $2, $3)""",
+    # Cobros (payments.py): cada pago y el saldo de la orden. payment_method
+    # queda como la forma de pago de sus pagos vigentes ('split' si son varias)
+    "insert_payment": """
+        INSERT INTO payments (order_id, method, amount, tendered, reference, created_by)
+        VALUES ($1, $2, $3, $4, $5, $6) RETURNING *""",
+    "settle_order": """
+        UPDATE orders SET paid_amount = $1, payment_status = $2,
+            payment_method = COALESCE(
+                (SELECT CASE WHEN COUNT(DISTINCT method) > 1 THEN 'split' ELSE MIN(method) END
+                 FROM payments WHERE order_id = $3 AND voided_at IS NULL),
+                payment_method)
+        WHERE id = $3 RETURNING *""",
+    "occupy_table": "UPDATE tables SET status = 'occupied' WHERE id = $1",
+}
+
+# Ingresos por período: una forma fija por agrupación (antes, un f-string)
+for _period, _expression in (
+    ("day", "DATE(created_at)"),
+    ("week", "DATE_TRUNC('week', created_at)"),
+    ("month", "DATE_TRUNC('month', created_at)"),
+):
+    QUERIES[f"revenue_by_{_period}"] = f"""
+        SELECT
+            {_expression} as period,
+            COUNT(*) as orders_count,
+            SUM(total) as total_revenue,
+            AVG(total) as average_ticket
+        FROM orders
+        WHERE status = 'completed'
+        AND DATE(created_at) BETWEEN $1 AND $2
+        GROUP BY period
+        ORDER BY period"""
+
+
+class PreparingConnection(_connection):
+    """Conexión que recuerda qué consultas del registro ya preparó"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = OrderedDict()
+
+
+def execute(cursor, name: str, params: Sequence = ()):
+    """
+    Ejecutar una consulta del registro por nombre
+
+    En una PreparingConnection la primera vez se prepara (PREPARE no es
+    transaccional: queda preparada aunque después se haga rollback) y
+    desde ahí se ejecuta con EXECUTE.
+    """
+    sql = QUERIES[name]
+    prepared = getattr(cursor.connection, "prepared", None)
+    if prepared is None:
+        cursor.execute(PARAM.sub(r"%(p\1)s", sql.replace("%", "%%")),
+                       {f"p{i}": value for i, value in enumerate(params, start=1)})
+        return
+
+    if name in prepared:
+        prepared.move_to_end(name)
+    else:
+        if len(prepared) >= MAX_PREPARED_PER_CONNECTION:
+            evicted, _ = prepared.popitem(last=False)
+            cursor.execute(f"DEALLOCATE {evicted}")
+        cursor.execute(f"PREPARE {name} AS {sql}")
+        prepared[name] = True
+
+    placeholders = f" ({', '.join(['%s'] * len(params))})" if params else ""
+    cursor.execute(f"EXECUTE {name}{placeholders}", params)
+
+
+def update_statement(table: str, fields: Iterable[str], allowed: Sequence[str]) -> str:
+    """
+    Nombre (registrado) del UPDATE parcial de `table` para un conjunto de campos
+
+    Los campos se ordenan según `allowed`, así que cada combinación tiene una
+    única forma y como mucho hay 2^len(allowed) formas, que se preparan solo
+    cuando se usan. Los parámetros son los valores en ese orden y luego el id.
+    """
+    fields = set(fields)
+    columns = [column for column in allowed if column in fields]
+    if len(columns) != len(fields):
+        raise ValueError(f"Campos no permitidos para {table}: {sorted(fields - set(allowed))}")
+
+    mask = sum(1 << allowed.index(column) for column in columns)
+    name = f"update_{table}_{mask:x}"
+    if name not in QUERIES:
+        assignments = ", ".join(f"{column} = ${i}" for i, column in enumerate(columns, start=1))
+        QUERIES[name] = (
+            f"UPDATE {table} SET {assignments}, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE id = ${len(columns) + 1} RETURNING *"
+        )
+    return name
@@ -0,0 +1,73 @@
+"""
+Límite de requests por cliente (token bucket)
+
+Cada cliente (IP de la caja) tiene un balde de RATE_LIMIT_BURST fichas que se
+recarga a RATE_LIMIT_PER_SECOND; cada request consume una. Una caja que entra
+en un bucle de reintentos recibe 429 sin quitarle capacidad a las demás.
+Los baldes viven en memoria de cada proceso (con varios workers, el límite
+efectivo es por worker).
+"""
+import time
+
+import orjson
+
+# Rutas que nunca se limitan
+EXEMPT_PATHS = ("/health", "/docs", "/openapi.json")
+
+# A partir de cuántos clientes se descartan los baldes llenos (inactivos)
+MAX_TRACKED_CLIENTS = 1024
+
+
+class RateLimitMiddleware:
+    """Middleware ASGI que responde 429 cuando un cliente agota su balde"""
+
+    def __init__(self, app, rate: float, burst: int):
+        self.app = app
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # cliente -> (fichas, último instante)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope["client"][0] if scope.get("client") else ""
+        wait = self._take(client, time.monotonic())
+        if wait == 0:
+            await self.app(scope, receive, send)
+            return
+
+        body = orjson.dumps({"detail": "Demasiadas solicitudes, intente de nuevo en unos segundos"})
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(1, round(wait))).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def _take(self, client: str, now: float) -> float:
+        """Consumir una ficha; devuelve 0 si había, o los segundos hasta la próxima"""
+        tokens, last = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+
+        if tokens >= 1:
+            self._buckets[client] = (tokens - 1, now)
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._prune(now)
+            return 0
+
+        self._buckets[client] = (tokens, now)
+        return (1 - tokens) / self.rate
+
+    def _prune(self, now: float):
+        """Olvidar los clientes cuyo balde ya se recargó por completo"""
+        self._buckets = {
+            client: (tokens, last)
+            for client, (tokens, last) in self._buckets.items()
+            if tokens + (now - last) * self.rate < self.burst
+        }
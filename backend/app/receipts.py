@@ -0,0 +1,365 @@
+"""
+Tickets de cocina y recibos listos para imprimir
+
+Todo sale de una sola consulta del árbol de la orden (orden → items →
+modificadores, más pagos y promociones), para una orden o para todas las de
+un turno, y se arma con una plantilla de app/templates/<tipo>.tpl en tres
+formatos: ESC/POS (bytes para la impresora térmica), texto y PDF.
+
+Sintaxis de las plantillas, una línea de salida por línea de plantilla:
+
+    texto {campo} {total:.2f}   campos con la sintaxis de str.format; un campo
+                                vacío (None) se imprime vacío
+    @center @right @bold @big   estilos al inicio de la línea (@big: doble
+                                alto y ancho, la mitad de columnas)
+    @pair izquierda | derecha   texto a los dos extremos (precios)
+    @rule [carácter]            línea divisoria
+    @each lista ... @end        repetir para cada elemento; sus campos tapan
+                                los de afuera
+    @if campo ... @end          solo si el campo tiene valor (no vacío ni cero)
+    # comentario
+
+Las plantillas se compilan una vez y quedan en caché hasta que cambia el
+archivo. Los documentos impresos van a un directorio spool (un subdirectorio
+por impresora) del que los toma la impresora; ver app/printer.py.
+"""
+import os
+import re
+import string
+import textwrap
+import threading
+from collections import ChainMap, namedtuple
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import settings
+from .order_tree import ORDER_ITEMS_JSON, ORDER_PAYMENTS_JSON, ORDER_PROMOTIONS_JSON
+
+KINDS = ("receipt", "kitchen")
+
+# Formato → (media type, extensión en el spool)
+FORMATS = {
+    "escpos": ("application/octet-stream", "bin"),
+    "text": ("text/plain", "txt"),
+    "pdf": ("application/pdf", "pdf"),
+}
+
+TEMPLATE_DIR = settings.PRINT_TEMPLATE_DIR or os.path.join(os.path.dirname(__file__), "templates")
+
+ORDER_DOCUMENT_QUERY = f"""
+    SELECT o.*, t.table_number,
+           c.phone AS customer_phone, c.address_line1, c.address_line2, c.eircode,
+           {ORDER_ITEMS_JSON} AS items,
+           {ORDER_PAYMENTS_JSON} AS payments,
+           {ORDER_PROMOTIONS_JSON} AS promotions
+    FROM orders o
+    LEFT JOIN tables t ON t.id = o.table_id
+    LEFT JOIN customers c ON c.id = o.customer_id
+"""
+
+# Comandos ESC/POS (los mismos que interpreta app/printer.py)
+ESC_INIT = b"\x1b@"
+ESC_CODEPAGE = b"\x1bt\x13"  # página de códigos 19: PC858 (incluye €)
+ESC_BOLD = b"\x1bE"
+ESC_FEED = b"\x1bd"
+GS_SIZE = b"\x1d!"
+GS_CUT = b"\x1dV"
+ESCPOS_ENCODING = "cp858"
+
+Line = namedtuple("Line", "text bold big")
+
+
+# --- Plantillas ---------------------------------------------------------------
+
+STYLES = ("center", "right", "bold", "big")
+
+
+class _Formatter(string.Formatter):
+    def format_field(self, value, format_spec):
+        if value is None:
+            return ""
+        return super().format_field(value, format_spec)
+
+
+class _Context(ChainMap):
+    def __missing__(self, key):
+        return None
+
+
+_formatter = _Formatter()
+
+
+class Template:
+    """Plantilla compilada: árbol de nodos listo para renderizar"""
+
+    def __init__(self, nodes: list):
+        self.nodes = nodes
+
+    def render(self, context: dict, width: int) -> List[Line]:
+        lines: List[Line] = []
+        self._render(self.nodes, _Context(context), width, lines)
+        return lines
+
+    def _render(self, nodes: list, context: ChainMap, width: int, lines: List[Line]):
+        for node in nodes:
+            kind = node[0]
+            if kind == "each":
+                for element in context[node[1]] or ():
+                    self._render(node[2], context.new_child(element), width, lines)
+            elif kind == "if":
+                if context[node[1]]:
+                    self._render(node[2], context, width, lines)
+            elif kind == "rule":
+                lines.append(Line(node[1] * width, False, False))
+            else:
+                _, styles, left, right = node
+                big = "big" in styles
+                columns = width // 2 if big else width
+                left_text = _formatter.vformat(left, (), context)
+                if right is None:
+                    wrapped = _wrap(left_text, columns)
+                    if "center" in styles:
+                        wrapped = [text.center(columns).rstrip() for text in wrapped]
+                    elif "right" in styles:
+                        wrapped = [text.rjust(columns) for text in wrapped]
+                else:
+                    right_text = _formatter.vformat(right, (), context)
+                    wrapped = _wrap(left_text, max(columns - len(right_text) - 1, 1))
+                    wrapped[-1] = (wrapped[-1].ljust(columns - len(right_text)) + right_text).rstrip()
+                lines.extend(Line(text, "bold" in styles, big) for text in wrapped)
+
+
+def _wrap(text: str, columns: int) -> List[str]:
+    """Cortar en líneas de `columns` conservando la sangría inicial"""
+    indent = text[:len(text) - len(text.lstrip(" "))]
+    return textwrap.wrap(text, columns, subsequent_indent=indent, break_on_hyphens=False) or [""]
+
+
+def compile_template(source: str) -> Template:
+    """
+    Compilar el texto de una plantilla
+
+    Raises:
+        ValueError: si un bloque @each/@if no cierra o sobra un @end
+    """
+    root: list = []
+    stack = [root]
+    for number, raw in enumerate(source.splitlines(), 1):
+        line = raw.rstrip("\n")
+        if line.startswith("#"):
+            continue
+        if line.startswith(("@each ", "@if ")):
+            directive, field = line.split(None, 1)
+            block: list = []
+            stack[-1].append((directive[1:], field.strip(), block))
+            stack.append(block)
+            continue
+        if line.strip() == "@end":
+            if len(stack) == 1:
+                raise ValueError(f"Línea {number}: @end sin bloque abierto")
+            stack.pop()
+            continue
+        if line.startswith("@rule"):
+            stack[-1].append(("rule", line[len("@rule"):].strip()[:1] or "-"))
+            continue
+
+        styles = set()
+        while True:
+            match = re.match(r"@(\w+)(?: |$)", line)
+            if not match or match[1] not in STYLES:
+                break
+            styles.add(match[1])
+            line = line[match.end():]
+        right = None
+        if line.startswith("@pair "):
+            line, separator, right = line[len("@pair "):].partition("|")
+            if not separator:
+                raise ValueError(f"Línea {number}: @pair sin '|'")
+            line, right = line.rstrip(), right.strip()
+        stack[-1].append(("text", frozenset(styles), line, right))
+
+    if len(stack) > 1:
+        raise ValueError("Falta @end al final de la plantilla")
+    return Template(root)
+
+
+_templates: Dict[str, Tuple[float, Template]] = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(kind: str) -> Template:
+    """Plantilla compilada de un tipo de documento (se recompila si cambió el archivo)"""
+    path = os.path.join(TEMPLATE_DIR, f"{kind}.tpl")
+    mtime = os.stat(path).st_mtime
+    cached = _templates.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with _templates_lock:
+        cached = _templates.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        with open(path, encoding="utf-8") as f:
+            template = compile_template(f.read())
+        _templates[path] = (mtime, template)
+        return template
+
+
+# --- Formatos de salida -------------------------------------------------------
+
+def to_text(lines: Sequence[Line]) -> bytes:
+    return "".join(line.text + "\n" for line in lines).encode()
+
+
+def to_escpos(lines: Sequence[Line]) -> bytes:
+    """Bytes ESC/POS: estilos por línea, avance y corte parcial al final"""
+    out = bytearray(ESC_INIT + ESC_CODEPAGE)
+    bold = big = False
+    for line in lines:
+        if line.bold != bold:
+            bold = line.bold
+            out += ESC_BOLD + bytes((bold,))
+        if line.big != big:
+            big = line.big
+            out += GS_SIZE + (b"\x11" if big else b"\x00")
+        out += line.text.encode(ESCPOS_ENCODING, errors="replace") + b"\n"
+    out += ESC_FEED + b"\x04" + GS_CUT + b"\x01"
+    return bytes(out)
+
+
+# Papel de 80 mm; Courier tiene un ancho de 0,6 veces su tamaño
+PDF_PAGE_WIDTH = 226.8
+PDF_MARGIN = 10.0
+
+
+def _pdf_escape(text: str) -> bytes:
+    data = text.encode("cp1252", errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def to_pdf(lines: Sequence[Line], width: int) -> bytes:
+    """PDF de una página del largo del ticket, con las fuentes base Courier"""
+    size = (PDF_PAGE_WIDTH - 2 * PDF_MARGIN) / (0.6 * width)
+    height = 2 * PDF_MARGIN + sum(size * (2.4 if line.big else 1.2) for line in lines)
+
+    content = bytearray()
+    y = height - PDF_MARGIN
+    for line in lines:
+        font_size = size * 2 if line.big else size
+        y -= font_size * 1.2
+        font = b"/F2" if line.bold else b"/F1"
+        content += b"BT %s %.2f Tf %.2f %.2f Td (%s) Tj ET\n" % (
+            font, font_size, PDF_MARGIN, y + font_size * 0.2, _pdf_escape(line.text)
+        )
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %.2f %.2f] "
+        b"/Resources << /Font << /F1 5 0 R /F2 6 0 R >> >> /Contents 4 0 R >>" % (PDF_PAGE_WIDTH, height),
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), bytes(content)),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+# --- Órdenes → documentos -----------------------------------------------------
+
+def fetch_orders(cursor, order_ids: Optional[Sequence[int]] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 include_cancelled: bool = False) -> List[dict]:
+    """Árbol completo de las órdenes (por id o por rango de creación) en una consulta"""
+    conditions, params = [], []
+    if order_ids is not None:
+        conditions.append("o.id = ANY(%s)")
+        params.append(list(order_ids))
+    if since is not None:
+        conditions.append("o.created_at >= %s")
+        params.append(since)
+    if until is not None:
+        conditions.append("o.created_at < %s")
+        params.append(until)
+    if not include_cancelled:
+        conditions.append("o.status <> 'cancelled'")
+    query = ORDER_DOCUMENT_QUERY
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    cursor.execute(query + " ORDER BY o.created_at, o.id", params)
+    return cursor.fetchall()
+
+
+def _context(order: dict, store, reprint: bool) -> dict:
+    """Campos de la orden más los calculados que usan las plantillas"""
+    items = []
+    for item in order['items']:
+        # Modificadores sin costo: precio vacío en el recibo
+        modifiers = [
+            dict(mod, line_total=mod['price'] * mod['quantity'] * item['quantity'] or None)
+            for mod in item['modifiers']
+        ]
+        items.append(dict(item, modifiers=modifiers))
+
+    total = Decimal(order['total'])
+    paid = Decimal(order['paid_amount'])
+    change = sum(
+        Decimal(str(payment['tendered'])) - Decimal(str(payment['amount']))
+        for payment in order['payments'] if payment['tendered'] is not None
+    )
+    return dict(
+        order,
+        items=items,
+        store_name=store.name,
+        order_type_label=order['order_type'].upper(),
+        change=change,
+        balance_due=total - paid if 0 < paid < total else 0,
+        reprint=reprint,
+        printed_at=datetime.now(),
+    )
+
+
+def render(order: dict, store, kind: str, fmt: str, reprint: bool = False,
+           width: int = settings.PRINT_WIDTH) -> bytes:
+    """Documento de una orden (de fetch_orders) en el formato pedido"""
+    lines = get_template(kind).render(_context(order, store, reprint), width)
+    if fmt == "escpos":
+        return to_escpos(lines)
+    if fmt == "pdf":
+        return to_pdf(lines, width)
+    return to_text(lines)
+
+
+def spool(data: bytes, store, order: dict, kind: str, fmt: str) -> str:
+    """
+    Dejar un documento en el spool de su impresora (spool/<tipo>/)
+
+    Se escribe con otro nombre y se renombra al final, así la impresora nunca
+    toma un archivo a medio escribir.
+
+    Returns:
+        str: ruta del archivo
+    """
+    directory = os.path.join(settings.PRINT_SPOOL_DIR, kind)
+    os.makedirs(directory, exist_ok=True)
+    number = re.sub(r"[^\w.-]", "_", order['order_number'])
+    name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{store.id}-{number}.{FORMATS[fmt][1]}"
+    path = os.path.join(directory, name)
+    with open(path + ".tmp", "wb") as f:
+        f.write(data)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def print_orders(orders: Sequence[dict], store, kind: str, fmt: str = "escpos",
+                 reprint: bool = False) -> List[str]:
+    """Renderizar y mandar al spool varias órdenes (la plantilla se compila una vez)"""
+    return [spool(render(order, store, kind, fmt, reprint), store, order, kind, fmt) for order in orders]
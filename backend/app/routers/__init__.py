@@ -1,7 +1,7 @@
 """
 Inicialización de routers
 """
-from . import categories, products, orders, modifiers, tables, reports
+from . import categories, products, orders, modifiers, tables, reports, kitchen, menu, delivery, inventory, stores, promotions, forecast, sync, receipts
 
 __all__ = [
     "categories",
@@ -9,5 +9,14 @@ __all__ = [
     "orders",
     "modifiers",
     "tables",
-    "reports"
+    "reports",
+    "kitchen",
+    "menu",
+    "delivery",
+    "inventory",
+    "stores",
+    "promotions",
+    "forecast",
+    "sync",
+    "receipts"
 ]
\ No newline at end of file
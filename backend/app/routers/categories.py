@@ -4,21 +4,23 @@ Router para gestión de categorías
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import List
 
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models import Category, CategoryCreate
+from ..serialization import rows_response
+from ..stores import Store, get_store
 
 router = APIRouter()
 
 @router.get("", response_model=List[Category])
-def get_categories(conn = Depends(get_db)):
+def get_categories(conn = Depends(get_read_db)):
     """Obtener todas las categorías"""
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM categories ORDER BY name")
     categories = cursor.fetchall()
-    return categories
+    return rows_response(Category, categories)
 
 @router.get("/{category_id}", response_model=Category)
-def get_category(category_id: int, conn = Depends(get_db)):
+def get_category(category_id: int, conn = Depends(get_read_db)):
     """Obtener una categoría por ID"""
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM categories WHERE id = %s", (category_id,))
@@ -28,7 +30,11 @@ def get_category(category_id: int, conn = Depends(get_db)):
     return category
 
 @router.post("", response_model=Category, status_code=status.HTTP_201_CREATED)
-def create_category(category: CategoryCreate, conn = Depends(get_db)):
+def create_category(
+    category: CategoryCreate,
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
     """Crear una nueva categoría"""
     cursor = conn.cursor()
     cursor.execute(
@@ -37,4 +43,5 @@ def create_category(category: CategoryCreate, conn = Depends(get_db)):
     )
     new_category = cursor.fetchone()
     conn.commit()
+    store.catalog.refresh(conn)
     return new_category
\ No newline at end of file
@@ -1,22 +1,41 @@
 """
 Router para gestión de clientes
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, File, Query, Request, UploadFile, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+from datetime import datetime
 import psycopg2
 
-from ..database import get_db
-from ..models.customer import Customer, CustomerCreate, CustomerUpdate
+from .. import customer_csv, queries
+from ..config import settings
+from ..database import get_db, get_read_db
+from ..models.customer import Customer, CustomerCreate, CustomerUpdate, normalize_phone
+from ..serialization import PosJSONResponse, rows_response
+from ..stores import Store, get_store
+from ..conditional import table_watermark
+from ..order_tree import ORDER_ITEMS_JSON
 
 router = APIRouter()
 
+# Columnas actualizables con PUT, en el orden de sus parámetros
+CUSTOMER_FIELDS = (
+    "phone", "name", "email", "address_line1", "address_line2", "city", "county",
+    "eircode", "latitude", "longitude", "notes", "is_active"
+)
+
 @router.get("", response_model=List[Customer])
 def get_customers(
+    request: Request,
     search: Optional[str] = None,
     limit: int = 100,
-    conn = Depends(get_db)
+    conn = Depends(get_read_db)
 ):
     """Obtener todos los clientes con búsqueda opcional"""
+    watermark = table_watermark(conn, "customers", request)
+    if watermark.unchanged:
+        return watermark.not_modified()
+    
     cursor = conn.cursor()
     
     if search:
@@ -32,21 +51,50 @@ def get_customers(
         cursor.execute(query, (limit,))
     
     customers = cursor.fetchall()
-    return customers
+    return watermark.apply(rows_response(Customer, customers))
 
 @router.get("/search-by-phone/{phone}")
-def search_by_phone(phone: str, conn = Depends(get_db)):
-    """Buscar cliente por teléfono"""
+def search_by_phone(phone: str, conn = Depends(get_read_db)):
+    """Buscar cliente por teléfono (en cualquier formato: se normaliza como al guardarlo)"""
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM customers WHERE phone = %s", (phone,))
+    cursor.execute("SELECT * FROM customers WHERE phone = %s", (normalize_phone(phone) or phone,))
     customer = cursor.fetchone()
     
     if customer:
         return {"found": True, "customer": dict(customer)}
     return {"found": False, "customer": None}
 
+@router.get("/export")
+def export_customers(
+    include_inactive: bool = False,
+    store: Store = Depends(get_store)
+):
+    """Exportar clientes a CSV (en streaming; se puede volver a importar)"""
+    return StreamingResponse(
+        customer_csv.export_customers(store, settings.REPLICA_MAX_LAG_SECONDS, include_inactive),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="customers-{store.id}.csv"'}
+    )
+
+@router.post("/import")
+def import_customers(
+    file: UploadFile = File(...),
+    on_conflict: str = "update",
+    encoding: str = "utf-8-sig",
+    conn = Depends(get_db)
+):
+    """
+    Importar clientes desde CSV (COPY a una tabla temporal + INSERT ... ON CONFLICT)
+
+    Requiere las columnas phone y name; teléfonos y eircodes se normalizan. Con
+    `on_conflict=update` un teléfono ya registrado actualiza al cliente (las
+    celdas vacías no pisan datos), con `skip` se deja como está. Devuelve un
+    reporte por línea: inserted, updated, skipped, duplicate o invalid.
+    """
+    return PosJSONResponse(customer_csv.import_customers(conn, file.file, on_conflict, encoding))
+
 @router.get("/{customer_id}", response_model=Customer)
-def get_customer(customer_id: int, conn = Depends(get_db)):
+def get_customer(customer_id: int, conn = Depends(get_read_db)):
     """Obtener un cliente por ID"""
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM customers WHERE id = %s", (customer_id,))
@@ -57,6 +105,81 @@ def get_customer(customer_id: int, conn = Depends(get_db)):
     
     return customer
 
+@router.get("/{customer_id}/orders")
+def get_customer_orders(
+    customer_id: int,
+    limit: int = Query(10, ge=1, le=50),
+    before: Optional[str] = None,
+    conn = Depends(get_read_db)
+):
+    """
+    Últimas órdenes de un cliente con items y modificadores (para recall)
+
+    Paginación por cursor: pasar en `before` el `next_cursor` de la respuesta
+    anterior para obtener las órdenes más antiguas.
+    """
+    cursor = conn.cursor()
+    
+    query = f"""SELECT o.*, {ORDER_ITEMS_JSON} AS items
+                FROM orders o
+                WHERE o.customer_id = %s"""
+    params = [customer_id]
+    
+    if before:
+        try:
+            before_at, before_id = before.rsplit("_", 1)
+            params.extend([datetime.fromisoformat(before_at), int(before_id)])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        query += " AND (o.created_at, o.id) < (%s, %s)"
+    
+    query += " ORDER BY o.created_at DESC, o.id DESC LIMIT %s"
+    params.append(limit)
+    
+    cursor.execute(query, params)
+    orders = cursor.fetchall()
+    
+    if not orders and not before:
+        cursor.execute("SELECT 1 FROM customers WHERE id = %s", (customer_id,))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    
+    next_cursor = None
+    if len(orders) == limit:
+        last = orders[-1]
+        next_cursor = f"{last['created_at'].isoformat()}_{last['id']}"
+    
+    return {
+        "customer_id": customer_id,
+        "orders": [dict(order) for order in orders],
+        "next_cursor": next_cursor
+    }
+
+@router.get("/{customer_id}/favourites")
+def get_customer_favourites(
+    customer_id: int,
+    limit: int = Query(5, ge=1, le=50),
+    conn = Depends(get_read_db)
+):
+    """Productos más pedidos por un cliente (acumulados al crear cada orden)"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT cf.product_id, p.name AS product_name, p.price, p.is_available,
+                  cf.times_ordered, cf.total_quantity, cf.last_ordered_at
+           FROM customer_favourites cf
+           JOIN products p ON p.id = cf.product_id
+           WHERE cf.customer_id = %s
+           ORDER BY cf.times_ordered DESC, cf.total_quantity DESC
+           LIMIT %s""",
+        (customer_id, limit)
+    )
+    favourites = cursor.fetchall()
+    
+    return {
+        "customer_id": customer_id,
+        "favourites": [dict(row) for row in favourites]
+    }
+
 @router.post("", response_model=Customer, status_code=status.HTTP_201_CREATED)
 def create_customer(customer: CustomerCreate, conn = Depends(get_db)):
     """Crear un nuevo cliente"""
@@ -89,55 +212,17 @@ def update_customer(
     """Actualizar un cliente"""
     cursor = conn.cursor()
     
-    # Construir query dinámicamente
-    updates = []
-    values = []
-    
-    if customer.phone is not None:
-        updates.append("phone = %s")
-        values.append(customer.phone)
-    if customer.name is not None:
-        updates.append("name = %s")
-        values.append(customer.name)
-    if customer.email is not None:
-        updates.append("email = %s")
-        values.append(customer.email)
-    if customer.address_line1 is not None:
-        updates.append("address_line1 = %s")
-        values.append(customer.address_line1)
-    if customer.address_line2 is not None:
-        updates.append("address_line2 = %s")
-        values.append(customer.address_line2)
-    if customer.city is not None:
-        updates.append("city = %s")
-        values.append(customer.city)
-    if customer.county is not None:
-        updates.append("county = %s")
-        values.append(customer.county)
-    if customer.eircode is not None:
-        updates.append("eircode = %s")
-        values.append(customer.eircode)
-    if customer.latitude is not None:
-        updates.append("latitude = %s")
-        values.append(customer.latitude)
-    if customer.longitude is not None:
-        updates.append("longitude = %s")
-        values.append(customer.longitude)
-    if customer.notes is not None:
-        updates.append("notes = %s")
-        values.append(customer.notes)
-    if customer.is_active is not None:
-        updates.append("is_active = %s")
-        values.append(customer.is_active)
-    
-    if not updates:
+    # Solo los campos que se enviaron (una sentencia preparada por combinación)
+    fields = customer.model_dump(include=set(CUSTOMER_FIELDS), exclude_none=True)
+    if not fields:
         raise HTTPException(status_code=400, detail="No hay campos para actualizar")
     
-    updates.append("updated_at = CURRENT_TIMESTAMP")
-    values.append(customer_id)
-    
-    query = f"UPDATE customers SET {', '.join(updates)} WHERE id = %s RETURNING *"
-    cursor.execute(query, values)
+    name = queries.update_statement("customers", fields, CUSTOMER_FIELDS)
+    try:
+        queries.execute(cursor, name, [fields[key] for key in CUSTOMER_FIELDS if key in fields] + [customer_id])
+    except psycopg2.IntegrityError:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail="El teléfono ya está registrado")
     updated_customer = cursor.fetchone()
     
     if not updated_customer:
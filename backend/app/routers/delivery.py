@@ -0,0 +1,87 @@
+"""
+Router para reparto (delivery): tarifas, cercanía y viajes
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+
+from ..config import settings
+from ..database import get_db, get_read_db
+from ..delivery import plan_runs, quote
+from ..stores import Store, get_store
+
+router = APIRouter()
+
+@router.get("/quote")
+def get_delivery_quote(
+    customer_id: Optional[int] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    store: Store = Depends(get_store),
+    conn = Depends(get_read_db)
+):
+    """Distancia, zona y tarifa de reparto para un cliente o unas coordenadas"""
+    if customer_id is not None:
+        grid = store.customer_index.get(conn, max_age=settings.CATALOG_MAX_AGE_SECONDS)
+        point = grid.points.get(customer_id)
+        if point is None:
+            raise HTTPException(status_code=404, detail="Cliente no encontrado o sin coordenadas")
+        latitude, longitude = point
+    elif latitude is None or longitude is None:
+        raise HTTPException(status_code=400, detail="Indique customer_id o latitude y longitude")
+
+    return dict(quote(latitude, longitude, store.origin), latitude=latitude, longitude=longitude)
+
+@router.get("/customers/nearby")
+def get_nearby_customers(
+    latitude: float,
+    longitude: float,
+    radius_km: float = Query(1.0, gt=0, le=20),
+    limit: int = Query(20, ge=1, le=200),
+    store: Store = Depends(get_store),
+    conn = Depends(get_read_db)
+):
+    """Clientes activos más cercanos a un punto (índice de grilla en memoria)"""
+    grid = store.customer_index.get(conn, max_age=settings.CATALOG_MAX_AGE_SECONDS)
+    nearby = grid.within(latitude, longitude, radius_km)[:limit]
+    return {
+        "customers": [
+            {"customer_id": key, "distance_km": round(distance, 3)}
+            for distance, key in nearby
+        ]
+    }
+
+@router.get("/runs")
+def get_delivery_runs(
+    max_stops: int = Query(settings.DELIVERY_RUN_MAX_STOPS, ge=1, le=20),
+    radius_km: float = Query(settings.DELIVERY_RUN_RADIUS_KM, gt=0),
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
+    """Agrupar los pedidos de delivery abiertos en viajes de reparto por cercanía"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT o.id AS order_id, o.order_number, o.status, o.customer_id, o.promised_at,
+                  c.name AS customer_name, c.address_line1, c.eircode,
+                  c.latitude, c.longitude
+           FROM orders o
+           JOIN customers c ON c.id = o.customer_id
+           WHERE o.order_type = 'delivery'
+             AND o.status IN ('pending', 'preparing', 'ready')"""
+    )
+    orders = cursor.fetchall()
+
+    stops, unlocated = [], []
+    for order in orders:
+        stop = dict(order)
+        if stop['latitude'] is None or stop['longitude'] is None:
+            unlocated.append(stop)
+            continue
+        stop['latitude'] = float(stop['latitude'])
+        stop['longitude'] = float(stop['longitude'])
+        stops.append(stop)
+
+    runs = plan_runs(stops, max_stops, radius_km, store.origin)
+    return {
+        "runs": [{"run": index, "stops": run} for index, run in enumerate(runs, start=1)],
+        "unlocated": unlocated
+    }
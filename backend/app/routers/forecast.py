@@ -0,0 +1,33 @@
+"""
+Router para el pronóstico de demanda
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from datetime import date, timedelta
+
+from ..config import settings
+from ..database import get_read_db
+from ..serialization import PosJSONResponse
+from ..stores import Store, get_store
+
+router = APIRouter()
+
+@router.get("/next-day")
+def get_next_day_forecast(
+    day: Optional[date] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    store: Store = Depends(get_store),
+    conn = Depends(get_read_db)
+):
+    """Órdenes y unidades por producto previstas por hora para un día (por defecto, mañana)"""
+    model = store.forecast.get(conn, max_age=settings.FORECAST_CHECK_SECONDS)
+    if model is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Todavía no hay un modelo ajustado (ejecute python -m app.forecast)"
+        )
+
+    prediction = model.predict(day or date.today() + timedelta(days=1))
+    if limit is not None:
+        prediction = dict(prediction, products=prediction['products'][:limit])
+    return PosJSONResponse(prediction)
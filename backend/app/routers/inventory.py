@@ -0,0 +1,102 @@
+"""
+Router para inventario: ingredientes, stock y recetas
+"""
+from fastapi import APIRouter, HTTPException, Depends, status
+from typing import List
+import psycopg2
+
+from ..database import get_db, get_read_db
+from ..models import Ingredient, IngredientCreate, RestockRequest, RecipeUpdate
+from ..serialization import rows_response
+
+router = APIRouter()
+
+@router.get("/ingredients", response_model=List[Ingredient])
+def get_ingredients(conn = Depends(get_read_db)):
+    """Obtener todos los ingredientes con su stock"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM ingredients ORDER BY name")
+    ingredients = cursor.fetchall()
+    return rows_response(Ingredient, ingredients)
+
+@router.post("/ingredients", response_model=Ingredient, status_code=status.HTTP_201_CREATED)
+def create_ingredient(ingredient: IngredientCreate, conn = Depends(get_db)):
+    """Crear un nuevo ingrediente"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO ingredients (name, unit, stock) VALUES (%s, %s, %s) RETURNING *",
+            (ingredient.name, ingredient.unit, ingredient.stock)
+        )
+        new_ingredient = cursor.fetchone()
+        conn.commit()
+        return new_ingredient
+    except psycopg2.IntegrityError:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail="El ingrediente ya existe")
+
+@router.post("/ingredients/{ingredient_id}/restock", response_model=Ingredient)
+def restock_ingredient(ingredient_id: int, restock: RestockRequest, conn = Depends(get_db)):
+    """
+    Ajustar el stock de un ingrediente
+
+    No reactiva productos agotados: eso se hace con PATCH /api/products/availability.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "UPDATE ingredients SET stock = stock + %s WHERE id = %s RETURNING *",
+            (restock.quantity, ingredient_id)
+        )
+    except psycopg2.IntegrityError:
+        conn.rollback()
+        raise HTTPException(status_code=400, detail="El stock no puede quedar negativo")
+    updated_ingredient = cursor.fetchone()
+
+    if not updated_ingredient:
+        raise HTTPException(status_code=404, detail="Ingrediente no encontrado")
+
+    conn.commit()
+    return updated_ingredient
+
+@router.get("/recipes/{product_id}")
+def get_recipe(product_id: int, conn = Depends(get_read_db)):
+    """Obtener la receta de un producto"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT r.ingredient_id, i.name, i.unit, r.quantity, i.stock
+           FROM recipes r
+           JOIN ingredients i ON i.id = r.ingredient_id
+           WHERE r.product_id = %s
+           ORDER BY i.name""",
+        (product_id,)
+    )
+    ingredients = cursor.fetchall()
+    return {"product_id": product_id, "ingredients": [dict(row) for row in ingredients]}
+
+@router.put("/recipes/{product_id}")
+def update_recipe(product_id: int, recipe: RecipeUpdate, conn = Depends(get_db)):
+    """Reemplazar la receta de un producto (lista vacía = sin control de stock)"""
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT 1 FROM products WHERE id = %s", (product_id,))
+    if not cursor.fetchone():
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+
+    cursor.execute("DELETE FROM recipes WHERE product_id = %s", (product_id,))
+    if recipe.ingredients:
+        try:
+            cursor.execute(
+                """INSERT INTO recipes (product_id, ingredient_id, quantity)
+                   SELECT %s, ingredient_id, quantity
+                   FROM unnest(%s::int[], %s::numeric[]) AS r(ingredient_id, quantity)""",
+                (product_id,
+                 [line.ingredient_id for line in recipe.ingredients],
+                 [line.quantity for line in recipe.ingredients])
+            )
+        except psycopg2.IntegrityError:
+            conn.rollback()
+            raise HTTPException(status_code=400, detail="Ingrediente inexistente o repetido")
+
+    conn.commit()
+    return get_recipe(product_id, conn)
@@ -0,0 +1,45 @@
+"""
+Router para la pantalla de cocina
+"""
+from fastapi import APIRouter, Depends, Query
+from typing import List
+
+from ..database import get_db
+from ..models import KitchenTicket
+from ..order_tree import ORDER_ITEMS_JSON
+from ..serialization import rows_response
+
+router = APIRouter()
+
+# Estados que se muestran en cocina (deben coincidir con idx_orders_kitchen_queue)
+KITCHEN_STATUSES = ('pending', 'preparing')
+
+@router.get("/queue", response_model=List[KitchenTicket])
+def get_kitchen_queue(
+    limit: int = Query(50, ge=1, le=200),
+    conn = Depends(get_db)
+):
+    """Obtener la cola de cocina con items y modificadores en una sola consulta"""
+    cursor = conn.cursor()
+
+    # El filtro de estado y el primer criterio del ORDER BY coinciden con el índice
+    # parcial, así que solo se recorren los tickets abiertos y se corta en el LIMIT.
+    # A igual hora comprometida: primero delivery, luego para llevar, luego mesa.
+    cursor.execute(
+        f"""SELECT o.id, o.order_number, o.customer_name, o.order_type, o.table_id,
+                  o.status, o.notes, o.created_at, o.promised_at,
+                  {ORDER_ITEMS_JSON} AS items
+           FROM orders o
+           WHERE o.status IN %s
+           ORDER BY COALESCE(o.promised_at, o.created_at),
+                    CASE o.order_type
+                        WHEN 'delivery' THEN 0
+                        WHEN 'takeout' THEN 1
+                        ELSE 2
+                    END,
+                    o.id
+           LIMIT %s""",
+        (KITCHEN_STATUSES, limit)
+    )
+    tickets = cursor.fetchall()
+    return rows_response(KitchenTicket, tickets)
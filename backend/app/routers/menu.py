@@ -0,0 +1,78 @@
+"""
+Router para el menú completo (una sola llamada al iniciar el till)
+"""
+import asyncio
+
+from fastapi import APIRouter, Depends, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from ..compression import encode
+from ..database import get_read_db
+from ..stores import Store, get_store
+
+router = APIRouter()
+
+@router.get("")
+def get_menu(
+    request: Request,
+    since: Optional[int] = None,
+    store: Store = Depends(get_store),
+    conn = Depends(get_read_db)
+):
+    """
+    Obtener el menú completo: categorías → productos disponibles, más modificadores
+
+    Con `since=<versión>` devuelve solo las diferencias desde esa versión
+    (upserted/removed por entidad, con el campo `since`). Si esa versión ya no
+    está en el historial se devuelve el menú completo, que no trae `since`.
+    """
+    snapshot = store.catalog.get(conn)
+    etag = f'"menu-{store.id}-{snapshot.version}"'
+    headers = {"ETag": etag, "Vary": "Accept-Encoding, X-Store-Id"}
+
+    if request.headers.get("if-none-match") == etag or since == snapshot.version:
+        return Response(status_code=304, headers=headers)
+
+    accept_encoding = request.headers.get("accept-encoding", "")
+    old = store.catalog.snapshot(since) if since is not None else None
+    if old is not None and old.version < snapshot.version:
+        body, encoding = encode(snapshot.diff_since(old), accept_encoding)
+    else:
+        body, encoding = encode(snapshot.body, accept_encoding, snapshot.encoded)
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# Cada cuánto se manda un comentario SSE para mantener viva la conexión
+EVENTS_KEEPALIVE_SECONDS = 15
+
+@router.get("/events")
+async def menu_events(request: Request, store: Store = Depends(get_store)):
+    """
+    Cambios del catálogo en tiempo real (Server-Sent Events)
+
+    Cada evento `menu` trae las diferencias (como GET /api/menu?since=...)
+    respecto de la versión anterior, p. ej. productos marcados como agotados.
+    """
+    listener = store.catalog_listener
+    queue = listener.subscribe()
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    message = await asyncio.wait_for(queue.get(), EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                yield b"event: menu\ndata: " + message + b"\n\n"
+        finally:
+            listener.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -7,6 +7,8 @@ import psycopg2
 
 from ..database import get_db
 from ..models import Modifier, ModifierCreate
+from ..serialization import rows_response
+from ..stores import Store, get_store
 
 router = APIRouter()
 
@@ -16,10 +18,14 @@ def get_modifiers(conn = Depends(get_db)):
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM modifiers ORDER BY modifier_type, name")
     modifiers = cursor.fetchall()
-    return modifiers
+    return rows_response(Modifier, modifiers)
 
 @router.post("", response_model=Modifier, status_code=status.HTTP_201_CREATED)
-def create_modifier(modifier: ModifierCreate, conn = Depends(get_db)):
+def create_modifier(
+    modifier: ModifierCreate,
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
     """Crear un nuevo modificador"""
     cursor = conn.cursor()
     cursor.execute(
@@ -28,4 +34,5 @@ def create_modifier(modifier: ModifierCreate, conn = Depends(get_db)):
     )
     new_modifier = cursor.fetchone()
     conn.commit()
+    store.catalog.refresh(conn)
     return new_modifier
@@ -1,109 +1,84 @@
 """
 Router para gestión de órdenes
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from typing import List, Optional
-from datetime import datetime, date
+import psycopg2
+from datetime import date
 
-from ..database import get_db
+from .. import queries
+from ..database import get_db, get_read_db
 from ..models import (
     OrderCreate, OrderResponse, OrderUpdate, 
-    UpdateOrderPaymentRequest, CreateOrderRequest
+    UpdateOrderPaymentRequest, CreateOrderRequest,
+    PaymentRequest, TenderCreate
 )
 from ..config import settings
+from ..serialization import PosJSONResponse, rows_response
+from ..conditional import table_watermark
+from ..ingest import ingest_queue
+from ..order_writer import price_order, insert_order, next_order_number
+from ..delivery import order_delivery_fee
+from ..inventory import consume_stock
+from ..payments import take_payments, void_payment
+from ..stores import Store, get_store, default_store
 
 router = APIRouter()
 
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-def create_order(order: OrderCreate, conn = Depends(get_db)):
-    """Crear una nueva orden"""
-    cursor = conn.cursor()
+def create_order(order: OrderCreate, store: Store = Depends(get_store), conn = Depends(get_db)):
+    """
+    Crear una nueva orden
+
+    Con ORDER_WRITE_BEHIND activo (solo el local por defecto) la orden se tasa
+    contra el catálogo en memoria y se responde 202 de inmediato; se guarda
+    después en segundo plano y su estado se consulta con
+    GET /api/orders/number/{order_number}.
+    """
+    fee = order_delivery_fee(order, conn, store)
     
-    if not order.items:
-        raise HTTPException(status_code=400, detail="La orden debe tener al menos un item")
+    # Precios y disponibilidad desde el catálogo en memoria (se actualiza al
+    # instante con cada cambio), sin una consulta por item
+    snapshot = store.catalog.get(conn, max_age=settings.CATALOG_MAX_AGE_SECONDS)
     
-    # Generar número de orden único
-    cursor.execute("SELECT COUNT(*) as count FROM orders WHERE DATE(created_at) = CURRENT_DATE")
-    count = cursor.fetchone()['count']
-    order_number = f"ORD-{datetime.now().strftime('%Y%m%d')}-{count + 1:04d}"
+    if settings.ORDER_WRITE_BEHIND and store is default_store():
+        accepted = ingest_queue.submit(order, snapshot, fee)
+        return PosJSONResponse(accepted, status_code=status.HTTP_202_ACCEPTED)
     
-    # Calcular totales
-    subtotal = 0
-    for item in order.items:
-        cursor.execute("SELECT price FROM products WHERE id = %s AND is_available = true", (item.product_id,))
-        product = cursor.fetchone()
-        if not product:
-            raise HTTPException(status_code=404, detail=f"Producto {item.product_id} no encontrado o no disponible")
-        
-        item_price = float(product['price']) * item.quantity
-        
-        # Agregar precio de modificadores
-        if item.modifiers:
-            for mod in item.modifiers:
-                cursor.execute("SELECT price FROM modifiers WHERE id = %s", (mod.modifier_id,))
-                modifier = cursor.fetchone()
-                if modifier:
-                    item_price += float(modifier['price']) * mod.quantity * item.quantity
-        
-        subtotal += item_price
+    cursor = conn.cursor()
     
-    tax = subtotal * settings.TAX_RATE
-    total = subtotal + tax
+    # Calcular totales (con las promociones vigentes)
+    priced = price_order(order, snapshot.product_price, snapshot.modifier_price, fee,
+                         store.tax_rate, snapshot.promotions)
     
-    # Crear orden
-    cursor.execute(
-        """INSERT INTO orders (order_number, customer_name, order_type, table_id, 
-           subtotal, tax, total, payment_method, notes, status) 
-           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING *""",
-        (order_number, order.customer_name, order.order_type, order.table_id,
-         subtotal, tax, total, order.payment_method, order.notes, 'pending')
-    )
-    new_order = cursor.fetchone()
-    order_id = new_order['id']
-    
-    # Si la orden es para una mesa, marcar mesa como ocupada
-    if order.table_id:
-        cursor.execute("UPDATE tables SET status = 'occupied' WHERE id = %s", (order.table_id,))
+    # Generar número de orden único
+    priced['order_number'] = next_order_number(cursor, store.order_prefix)
     
-    # Insertar items de la orden
-    for item in order.items:
-        cursor.execute("SELECT price FROM products WHERE id = %s", (item.product_id,))
-        product = cursor.fetchone()
-        unit_price = float(product['price'])
-        item_subtotal = unit_price * item.quantity
-        
-        cursor.execute(
-            """INSERT INTO order_items (order_id, product_id, quantity, unit_price, subtotal, special_instructions)
-               VALUES (%s, %s, %s, %s, %s, %s) RETURNING id""",
-            (order_id, item.product_id, item.quantity, unit_price, item_subtotal, item.special_instructions)
-        )
-        order_item_id = cursor.fetchone()['id']
-        
-        # Insertar modificadores del item
-        if item.modifiers:
-            for mod in item.modifiers:
-                cursor.execute("SELECT price FROM modifiers WHERE id = %s", (mod.modifier_id,))
-                modifier = cursor.fetchone()
-                if modifier:
-                    cursor.execute(
-                        """INSERT INTO order_item_modifiers (order_item_id, modifier_id, quantity, price)
-                           VALUES (%s, %s, %s, %s)""",
-                        (order_item_id, mod.modifier_id, mod.quantity, float(modifier['price']))
-                    )
+    # Crear orden con sus items y modificadores (y descontar stock)
+    try:
+        new_order = insert_order(cursor, priced)
+    except psycopg2.errors.CheckViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="Stock insuficiente para completar la orden")
     
     conn.commit()
     return new_order
 
 @router.get("", response_model=List[OrderResponse])
 def get_orders(
+    request: Request,
     status: Optional[str] = None,
     order_type: Optional[str] = None,
     date_from: Optional[date] = None,
     date_to: Optional[date] = None,
     limit: int = 100,
-    conn = Depends(get_db)
+    conn = Depends(get_read_db)
 ):
     """Obtener órdenes con filtros opcionales"""
+    watermark = table_watermark(conn, "orders", request)
+    if watermark.unchanged:
+        return watermark.not_modified()
+    
     cursor = conn.cursor()
     
     query = "SELECT * FROM orders WHERE 1=1"
@@ -130,7 +105,27 @@ def get_orders(
     
     cursor.execute(query, params)
     orders = cursor.fetchall()
-    return orders
+    return watermark.apply(rows_response(OrderResponse, orders))
+
+@router.get("/number/{order_number}")
+def get_order_by_number(order_number: str, conn = Depends(get_db)):
+    """
+    Obtener una orden por número, incluidas las que aún no se guardaron
+
+    Las órdenes en vuelo (ingesta diferida) se devuelven con `persisted: false`
+    y sin `id`; una vez guardadas se devuelve la fila de la BD.
+    """
+    in_flight = ingest_queue.lookup(order_number)
+    if in_flight:
+        return in_flight
+    
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM orders WHERE order_number = %s", (order_number,))
+    order = cursor.fetchone()
+    if not order:
+        raise HTTPException(status_code=404, detail="Orden no encontrada")
+    
+    return dict(order, persisted=True)
 
 @router.get("/{order_id}/details")
 def get_order_detail(order_id: int, conn = Depends(get_db)):
@@ -170,8 +165,13 @@ def get_order_detail(order_id: int, conn = Depends(get_db)):
     }
 
 @router.patch("/{order_id}/status")
-def update_order_status(order_id: int, new_status: str, conn = Depends(get_db)):
-    """Actualizar el estado de una orden"""
+def update_order_status(
+    order_id: int,
+    new_status: str,
+    changed_by: Optional[str] = None,
+    conn = Depends(get_db)
+):
+    """Actualizar el estado de una orden (queda registrado en su historial)"""
     valid_statuses = ['pending', 'preparing', 'ready', 'completed', 'cancelled']
     
     if new_status not in valid_statuses:
@@ -182,12 +182,13 @@ def update_order_status(order_id: int, new_status: str, conn = Depends(get_db)):
     
     cursor = conn.cursor()
     
-    # Obtener la orden actual
-    cursor.execute("SELECT * FROM orders WHERE id = %s", (order_id,))
+    # Obtener la orden actual (bloqueada: el estado anterior del historial
+    # tiene que ser el que se reemplaza)
+    queries.execute(cursor, "order_for_update", (order_id,))
     order = cursor.fetchone()
     if not order:
         raise HTTPException(status_code=404, detail="Orden no encontrada")
-    
+
     # Actualizar orden
     update_query = "UPDATE orders SET status = %s"
     params = [new_status]
@@ -203,37 +204,101 @@ def update_order_status(order_id: int, new_status: str, conn = Depends(get_db)):
     update_query += " WHERE id = %s RETURNING *"
     params.append(order_id)
     
-    cursor.execute(update_query, params)
+    # Actualización y fila del historial en la misma sentencia (solo si cambia)
+    cursor.execute(
+        f"""WITH updated AS ({update_query}),
+           history AS (
+               INSERT INTO order_status_history (order_id, from_status, status, changed_by)
+               SELECT id, %s, status, %s FROM updated WHERE status <> %s
+           )
+           SELECT * FROM updated""",
+        params + [order['status'], changed_by, order['status']]
+    )
     updated_order = cursor.fetchone()
     conn.commit()
     
     return updated_order
 
+@router.get("/{order_id}/history")
+def get_order_history(order_id: int, conn = Depends(get_read_db)):
+    """Historial de estados de una orden"""
+    cursor = conn.cursor()
+    cursor.execute(
+        """SELECT from_status, status, changed_by, changed_at
+           FROM order_status_history
+           WHERE order_id = %s
+           ORDER BY changed_at, id""",
+        (order_id,)
+    )
+    history = cursor.fetchall()
+
+    if not history:
+        raise HTTPException(status_code=404, detail="Orden no encontrada")
+
+    return {"order_id": order_id, "history": [dict(row) for row in history]}
+
+@router.post("/{order_id}/payments")
+def create_order_payments(order_id: int, payment: PaymentRequest, conn = Depends(get_db)):
+    """
+    Cobrar una orden con una o varias formas de pago
+
+    Admite pagos parciales: la orden queda 'partial' hasta cubrir su total.
+    """
+    cursor = conn.cursor()
+    result = take_payments(cursor, order_id, payment.tenders, payment.created_by)
+    conn.commit()
+    return result
+
+@router.get("/{order_id}/payments")
+def get_order_payments(order_id: int, conn = Depends(get_db)):
+    """Pagos de una orden (incluidos los anulados) y su saldo"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT total, paid_amount, payment_status FROM orders WHERE id = %s", (order_id,))
+    order = cursor.fetchone()
+    if not order:
+        raise HTTPException(status_code=404, detail="Orden no encontrada")
+
+    cursor.execute("SELECT * FROM payments WHERE order_id = %s ORDER BY id", (order_id,))
+    return {
+        "order_id": order_id,
+        "total": order['total'],
+        "paid_amount": order['paid_amount'],
+        "payment_status": order['payment_status'],
+        "balance_due": order['total'] - order['paid_amount'],
+        "payments": [dict(row) for row in cursor.fetchall()],
+    }
+
+@router.post("/{order_id}/payments/{payment_id}/void")
+def void_order_payment(order_id: int, payment_id: int, conn = Depends(get_db)):
+    """Anular un pago (el importe vuelve al saldo de la orden)"""
+    cursor = conn.cursor()
+    result = void_payment(cursor, order_id, payment_id)
+    conn.commit()
+    return result
+
 @router.put("/{order_id}/payment")
 def update_order_payment(
     order_id: int,
     payment_data: UpdateOrderPaymentRequest,
     conn = Depends(get_db)
 ):
-    """Actualizar método de pago de una orden"""
+    """Cobrar el saldo pendiente de una orden con una sola forma de pago"""
     cursor = conn.cursor()
-    
-    order = cursor.fetchone("SELECT * FROM orders WHERE id = %s", (order_id,))
+    cursor.execute("SELECT total, paid_amount FROM orders WHERE id = %s", (order_id,))
+    order = cursor.fetchone()
     if not order:
         raise HTTPException(status_code=404, detail="Orden no encontrada")
-    
-    # Actualizar payment method
-    cursor.execute(
-        "UPDATE orders SET payment_method = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s RETURNING *",
-        (payment_data.payment_method, order_id)
-    )
-    updated_order = cursor.fetchone()
+    if order['paid_amount'] >= order['total']:
+        raise HTTPException(status_code=409, detail="La orden ya está pagada")
+
+    # El saldo se vuelve a comprobar con la orden bloqueada en take_payments
+    tender = TenderCreate(method=payment_data.payment_method, amount=order['total'] - order['paid_amount'])
+    result = take_payments(cursor, order_id, [tender])
     conn.commit()
-    
-    return updated_order
+    return result['order']
 
 @router.post("/recall", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-def recall_order(order_data: CreateOrderRequest, conn = Depends(get_db)):
+def recall_order(order_data: CreateOrderRequest, store: Store = Depends(get_store), conn = Depends(get_db)):
     """Crear nueva orden basada en una existente (recall)"""
     cursor = conn.cursor()
     
@@ -241,9 +306,7 @@ def recall_order(order_data: CreateOrderRequest, conn = Depends(get_db)):
         raise HTTPException(status_code=400, detail="La orden debe tener al menos un item")
     
     # Generar número de orden
-    cursor.execute("SELECT COUNT(*) as count FROM orders WHERE DATE(created_at) = CURRENT_DATE")
-    count = cursor.fetchone()['count']
-    order_number = f"ORD-{datetime.now().strftime('%Y%m%d')}-{count + 1:04d}"
+    order_number = next_order_number(cursor, store.order_prefix)
     
     # Calcular totales
     subtotal = 0
@@ -268,14 +331,20 @@ def recall_order(order_data: CreateOrderRequest, conn = Depends(get_db)):
         })
     
     # Calculate tax and total
-    tax = subtotal * settings.TAX_RATE
+    tax = subtotal * store.tax_rate
     total = subtotal + tax
     
     # Create order
     cursor.execute(
-        """INSERT INTO orders (order_number, customer_name, order_type, status, 
-           subtotal, tax, discount, total, payment_method, notes, created_at, updated_at)
-           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) RETURNING *""",
+        """WITH new_order AS (
+               INSERT INTO orders (order_number, customer_name, order_type, status, 
+               subtotal, tax, discount, total, payment_method, notes, created_at, updated_at)
+               VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP) RETURNING *
+           ), history AS (
+               INSERT INTO order_status_history (order_id, status, changed_at)
+               SELECT id, status, created_at FROM new_order
+           )
+           SELECT * FROM new_order""",
         (order_number, order_data.customer_name, order_data.order_type, 'pending',
          subtotal, tax, 0, total, None, order_data.notes)
     )
@@ -291,5 +360,12 @@ def recall_order(order_data: CreateOrderRequest, conn = Depends(get_db)):
              item_data['unit_price'], item_data['subtotal'], item_data['special_instructions'])
         )
     
+    # Descontar stock de ingredientes
+    try:
+        consume_stock(cursor, items_to_create)
+    except psycopg2.errors.CheckViolation:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="Stock insuficiente para completar la orden")
+    
     conn.commit()
     return new_order
\ No newline at end of file
@@ -1,21 +1,33 @@
 """
 Router para gestión de productos
 """
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from typing import List, Optional
 
-from ..database import get_db
-from ..models import Product, ProductCreate, ProductUpdate
+from .. import queries
+from ..database import get_db, get_read_db
+from ..models import Product, ProductCreate, ProductUpdate, ProductAvailabilityUpdate
+from ..serialization import rows_response
+from ..stores import Store, get_store
+from ..conditional import table_watermark
 
 router = APIRouter()
 
+# Columnas actualizables con PUT, en el orden de sus parámetros
+PRODUCT_FIELDS = ("category_id", "name", "description", "price", "image_url", "is_available")
+
 @router.get("", response_model=List[Product])
 def get_products(
+    request: Request,
     category_id: Optional[int] = None,
     available_only: bool = True,
-    conn = Depends(get_db)
+    conn = Depends(get_read_db)
 ):
     """Obtener todos los productos, con filtros opcionales"""
+    watermark = table_watermark(conn, "products", request)
+    if watermark.unchanged:
+        return watermark.not_modified()
+    
     cursor = conn.cursor()
     
     if category_id:
@@ -32,20 +44,57 @@ def get_products(
     
     cursor.execute(query, params)
     products = cursor.fetchall()
-    return products
+    return watermark.apply(rows_response(Product, products))
+
+@router.patch("/availability")
+def update_availability(
+    update: ProductAvailabilityUpdate,
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
+    """
+    Activar/desactivar ("86") varios productos y/o categorías completas
+
+    Un solo UPDATE; el cambio de versión del catálogo se avisa al instante a
+    los tills conectados a /api/menu/events.
+    """
+    if not update.product_ids and not update.category_ids:
+        raise HTTPException(status_code=400, detail="Indique product_ids o category_ids")
+    
+    cursor = conn.cursor()
+    cursor.execute(
+        """UPDATE products SET is_available = %s
+           WHERE (id = ANY(%s) OR category_id = ANY(%s))
+             AND is_available IS DISTINCT FROM %s
+           RETURNING id""",
+        (update.is_available, update.product_ids, update.category_ids, update.is_available)
+    )
+    changed = [row['id'] for row in cursor.fetchall()]
+    conn.commit()
+    
+    snapshot = store.catalog.refresh(conn)
+    return {
+        "is_available": update.is_available,
+        "changed_product_ids": changed,
+        "catalog_version": snapshot.version
+    }
 
 @router.get("/{product_id}", response_model=Product)
-def get_product(product_id: int, conn = Depends(get_db)):
+def get_product(product_id: int, conn = Depends(get_read_db)):
     """Obtener un producto por ID"""
     cursor = conn.cursor()
-    cursor.execute("SELECT * FROM products WHERE id = %s", (product_id,))
+    queries.execute(cursor, "product_by_id", (product_id,))
     product = cursor.fetchone()
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     return product
 
 @router.post("", response_model=Product, status_code=status.HTTP_201_CREATED)
-def create_product(product: ProductCreate, conn = Depends(get_db)):
+def create_product(
+    product: ProductCreate,
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
     """Crear un nuevo producto"""
     cursor = conn.cursor()
     cursor.execute(
@@ -56,54 +105,38 @@ def create_product(product: ProductCreate, conn = Depends(get_db)):
     )
     new_product = cursor.fetchone()
     conn.commit()
+    store.catalog.refresh(conn)
     return new_product
 
 @router.put("/{product_id}", response_model=Product)
-def update_product(product_id: int, product: ProductUpdate, conn = Depends(get_db)):
+def update_product(
+    product_id: int,
+    product: ProductUpdate,
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
     """Actualizar un producto"""
     cursor = conn.cursor()
     
-    # Construir query dinámicamente solo con campos que se enviaron
-    updates = []
-    values = []
-    
-    if product.category_id is not None:
-        updates.append("category_id = %s")
-        values.append(product.category_id)
-    if product.name is not None:
-        updates.append("name = %s")
-        values.append(product.name)
-    if product.description is not None:
-        updates.append("description = %s")
-        values.append(product.description)
-    if product.price is not None:
-        updates.append("price = %s")
-        values.append(product.price)
-    if product.image_url is not None:
-        updates.append("image_url = %s")
-        values.append(product.image_url)
-    if product.is_available is not None:
-        updates.append("is_available = %s")
-        values.append(product.is_available)
-    
-    if not updates:
+    # Solo los campos que se enviaron; cada combinación es una sentencia
+    # preparada distinta (ver queries.update_statement)
+    fields = product.model_dump(include=set(PRODUCT_FIELDS), exclude_none=True)
+    if not fields:
         raise HTTPException(status_code=400, detail="No hay campos para actualizar")
     
-    updates.append("updated_at = CURRENT_TIMESTAMP")
-    values.append(product_id)
-    
-    query = f"UPDATE products SET {', '.join(updates)} WHERE id = %s RETURNING *"
-    cursor.execute(query, values)
+    name = queries.update_statement("products", fields, PRODUCT_FIELDS)
+    queries.execute(cursor, name, [fields[key] for key in PRODUCT_FIELDS if key in fields] + [product_id])
     updated_product = cursor.fetchone()
     
     if not updated_product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
     conn.commit()
+    store.catalog.refresh(conn)
     return updated_product
 
 @router.delete("/{product_id}")
-def delete_product(product_id: int, conn = Depends(get_db)):
+def delete_product(product_id: int, store: Store = Depends(get_store), conn = Depends(get_db)):
     """Eliminar un producto (soft delete - marca como no disponible)"""
     cursor = conn.cursor()
     cursor.execute(
@@ -116,4 +149,5 @@ def delete_product(product_id: int, conn = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Producto no encontrado")
     
     conn.commit()
+    store.catalog.refresh(conn)
     return {"message": "Producto eliminado correctamente", "id": product_id}
\ No newline at end of file
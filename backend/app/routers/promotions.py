@@ -0,0 +1,128 @@
+"""
+Router para gestión de promociones
+"""
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, status
+from typing import List
+
+from ..config import settings
+from ..database import get_db, get_read_db
+from ..delivery import order_delivery_fee
+from ..models import OrderCreate, Promotion, PromotionCreate
+from ..order_writer import price_order
+from ..promotions import KINDS
+from ..serialization import rows_response
+from ..stores import Store, get_store
+
+router = APIRouter()
+
+COLUMNS = (
+    "name", "kind", "product_ids", "category_ids", "percent", "buy_quantity", "free_quantity",
+    "combo_price", "days_of_week", "start_time", "end_time", "valid_from", "valid_until", "is_active"
+)
+
+def _validate(promotion: PromotionCreate):
+    """Campos obligatorios según el tipo de promoción"""
+    if promotion.kind not in KINDS:
+        raise HTTPException(status_code=400, detail=f"Tipo inválido. Debe ser: {', '.join(KINDS)}")
+    if promotion.kind == "percentage" and promotion.percent is None:
+        raise HTTPException(status_code=400, detail="Una promoción 'percentage' requiere percent")
+    if promotion.kind == "bogo" and (promotion.buy_quantity is None or promotion.free_quantity is None):
+        raise HTTPException(status_code=400, detail="Una promoción 'bogo' requiere buy_quantity y free_quantity")
+    if promotion.kind == "combo" and (promotion.combo_price is None or len(promotion.product_ids) < 2):
+        raise HTTPException(status_code=400, detail="Un combo requiere combo_price y al menos dos productos")
+    if not promotion.product_ids and not promotion.category_ids:
+        raise HTTPException(status_code=400, detail="Indique product_ids o category_ids")
+    if any(day < 1 or day > 7 for day in promotion.days_of_week):
+        raise HTTPException(status_code=400, detail="days_of_week va de 1 (lunes) a 7 (domingo)")
+    if promotion.valid_from and promotion.valid_until and promotion.valid_from > promotion.valid_until:
+        raise HTTPException(status_code=400, detail="valid_from es posterior a valid_until")
+
+@router.get("", response_model=List[Promotion])
+def get_promotions(active_only: bool = False, conn = Depends(get_read_db)):
+    """Obtener las promociones (opcionalmente solo las activas)"""
+    cursor = conn.cursor()
+    query = "SELECT * FROM promotions"
+    if active_only:
+        query += " WHERE is_active = true"
+    cursor.execute(query + " ORDER BY id")
+    return rows_response(Promotion, cursor.fetchall())
+
+@router.get("/current")
+def get_current_promotions(store: Store = Depends(get_store), conn = Depends(get_read_db)):
+    """Promociones vigentes en este momento (desde el catálogo en memoria)"""
+    snapshot = store.catalog.get(conn, max_age=settings.CATALOG_MAX_AGE_SECONDS)
+    now = datetime.now()
+    return {
+        "promotions": [
+            {"id": rule.id, "name": rule.name, "kind": rule.kind, "product_ids": sorted(rule.targets)}
+            for rule in snapshot.promotions.rules.values()
+            if rule.covers(now)
+        ]
+    }
+
+@router.post("/quote")
+def quote_order(order: OrderCreate, store: Store = Depends(get_store), conn = Depends(get_db)):
+    """Tasar una orden con las promociones vigentes, sin crearla"""
+    fee = order_delivery_fee(order, conn, store)
+    snapshot = store.catalog.get(conn, max_age=settings.CATALOG_MAX_AGE_SECONDS)
+    priced = price_order(order, snapshot.product_price, snapshot.modifier_price, fee,
+                         store.tax_rate, snapshot.promotions)
+    return {key: priced[key] for key in ("subtotal", "discount", "tax", "delivery_fee", "total", "promotions")}
+
+@router.post("", response_model=Promotion, status_code=status.HTTP_201_CREATED)
+def create_promotion(
+    promotion: PromotionCreate,
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
+    """Crear una nueva promoción"""
+    _validate(promotion)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""INSERT INTO promotions ({', '.join(COLUMNS)})
+            VALUES ({', '.join(['%s'] * len(COLUMNS))}) RETURNING *""",
+        [getattr(promotion, column) for column in COLUMNS]
+    )
+    new_promotion = cursor.fetchone()
+    conn.commit()
+    store.catalog.refresh(conn)
+    return new_promotion
+
+@router.put("/{promotion_id}", response_model=Promotion)
+def update_promotion(
+    promotion_id: int,
+    promotion: PromotionCreate,
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
+    """Reemplazar una promoción"""
+    _validate(promotion)
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""UPDATE promotions SET {', '.join(f'{column} = %s' for column in COLUMNS)}
+            WHERE id = %s RETURNING *""",
+        [getattr(promotion, column) for column in COLUMNS] + [promotion_id]
+    )
+    updated_promotion = cursor.fetchone()
+    if not updated_promotion:
+        raise HTTPException(status_code=404, detail="Promoción no encontrada")
+
+    conn.commit()
+    store.catalog.refresh(conn)
+    return updated_promotion
+
+@router.delete("/{promotion_id}")
+def delete_promotion(promotion_id: int, store: Store = Depends(get_store), conn = Depends(get_db)):
+    """Desactivar una promoción (soft delete)"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "UPDATE promotions SET is_active = false WHERE id = %s RETURNING id",
+        (promotion_id,)
+    )
+    if not cursor.fetchone():
+        raise HTTPException(status_code=404, detail="Promoción no encontrada")
+
+    conn.commit()
+    store.catalog.refresh(conn)
+    return {"message": "Promoción desactivada"}
@@ -0,0 +1,82 @@
+"""
+Router para tickets de cocina y recibos
+"""
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import Optional
+from datetime import datetime
+
+from .. import receipts
+from ..database import get_db, get_read_db
+from ..stores import Store, get_store
+
+router = APIRouter()
+
+def _validate(kind: str, fmt: str):
+    if kind not in receipts.KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tipo de documento inválido. Debe ser: {', '.join(receipts.KINDS)}"
+        )
+    if fmt not in receipts.FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Formato inválido. Debe ser: {', '.join(receipts.FORMATS)}"
+        )
+
+def _fetch_order(conn, order_id: int) -> dict:
+    orders = receipts.fetch_orders(conn.cursor(), order_ids=[order_id], include_cancelled=True)
+    if not orders:
+        raise HTTPException(status_code=404, detail="Orden no encontrada")
+    return orders[0]
+
+@router.post("/reprint")
+def reprint_shift(
+    since: datetime,
+    until: Optional[datetime] = None,
+    kind: str = "receipt",
+    fmt: str = Query("escpos", alias="format"),
+    include_cancelled: bool = False,
+    store: Store = Depends(get_store),
+    conn = Depends(get_read_db)
+):
+    """Reimprimir todas las órdenes de un turno (creadas entre since y until) al spool"""
+    _validate(kind, fmt)
+    if until is not None and until <= since:
+        raise HTTPException(status_code=400, detail="until debe ser posterior a since")
+
+    orders = receipts.fetch_orders(conn.cursor(), since=since, until=until, include_cancelled=include_cancelled)
+    files = receipts.print_orders(orders, store, kind, fmt, reprint=True)
+    return {"kind": kind, "format": fmt, "printed": len(files), "files": files}
+
+@router.get("/{order_id}")
+def get_document(
+    order_id: int,
+    kind: str = "receipt",
+    fmt: str = Query("text", alias="format"),
+    store: Store = Depends(get_store),
+    conn = Depends(get_read_db)
+):
+    """Recibo o ticket de cocina de una orden (escpos, text o pdf)"""
+    _validate(kind, fmt)
+    order = _fetch_order(conn, order_id)
+    media_type, extension = receipts.FORMATS[fmt]
+    return Response(
+        content=receipts.render(order, store, kind, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'inline; filename="{kind}-{order_id}.{extension}"'}
+    )
+
+@router.post("/{order_id}/print")
+def print_document(
+    order_id: int,
+    kind: str = "receipt",
+    fmt: str = Query("escpos", alias="format"),
+    reprint: bool = False,
+    store: Store = Depends(get_store),
+    conn = Depends(get_db)
+):
+    """Mandar el recibo o el ticket de cocina de una orden al spool de su impresora"""
+    _validate(kind, fmt)
+    order = _fetch_order(conn, order_id)
+    files = receipts.print_orders([order], store, kind, fmt, reprint=reprint)
+    return {"kind": kind, "format": fmt, "printed": len(files), "files": files}
@@ -3,20 +3,18 @@ Router para reportes y analytics
 """
 from fastapi import APIRouter, HTTPException, Depends
 from typing import Optional
-from datetime import date
+from datetime import date, timedelta
 
-from ..database import get_db
+from .. import queries
+from ..database import fan_out, get_db, get_read_db
+from ..eod import DayAlreadyClosed, close_day
 
 router = APIRouter()
 
-@router.get("/daily-sales")
-def get_daily_sales(report_date: Optional[date] = None, conn = Depends(get_db)):
-    """Reporte de ventas diarias"""
+def _daily_sales(conn, report_date: date) -> dict:
+    """Resumen de ventas de un día y ventas por tipo de orden"""
     cursor = conn.cursor()
     
-    if not report_date:
-        report_date = date.today()
-    
     cursor.execute(
         """SELECT 
             COUNT(*) as total_orders,
@@ -47,14 +45,13 @@ def get_daily_sales(report_date: Optional[date] = None, conn = Depends(get_db)):
         "by_order_type": [dict(row) for row in by_type]
     }
 
-@router.get("/top-products")
-def get_top_products(
-    date_from: Optional[date] = None,
-    date_to: Optional[date] = None,
-    limit: int = 10,
-    conn = Depends(get_db)
-):
-    """Reporte de productos más vendidos"""
+@router.get("/daily-sales")
+def get_daily_sales(report_date: Optional[date] = None, conn = Depends(get_read_db)):
+    """Reporte de ventas diarias"""
+    return _daily_sales(conn, report_date or date.today())
+
+def _top_products(conn, date_from: Optional[date], date_to: Optional[date], limit: int) -> list:
+    """Productos más vendidos (órdenes completadas) en un rango de fechas"""
     cursor = conn.cursor()
     
     query = """
@@ -89,12 +86,20 @@ def get_top_products(
     params.append(limit)
     
     cursor.execute(query, params)
-    products = cursor.fetchall()
-    
+    return [dict(row) for row in cursor.fetchall()]
+
+@router.get("/top-products")
+def get_top_products(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = 10,
+    conn = Depends(get_read_db)
+):
+    """Reporte de productos más vendidos"""
     return {
         "date_from": date_from,
         "date_to": date_to,
-        "top_products": [dict(row) for row in products]
+        "top_products": _top_products(conn, date_from, date_to, limit)
     }
 
 @router.get("/revenue-by-period")
@@ -102,34 +107,15 @@ def get_revenue_by_period(
     date_from: date,
     date_to: date,
     group_by: str = "day",  # 'day', 'week', 'month'
-    conn = Depends(get_db)
+    conn = Depends(get_read_db)
 ):
     """Reporte de ingresos por período"""
     cursor = conn.cursor()
     
-    if group_by == "day":
-        date_format = "DATE(created_at)"
-    elif group_by == "week":
-        date_format = "DATE_TRUNC('week', created_at)"
-    elif group_by == "month":
-        date_format = "DATE_TRUNC('month', created_at)"
-    else:
+    if group_by not in ("day", "week", "month"):
         raise HTTPException(status_code=400, detail="group_by debe ser: day, week, o month")
     
-    query = f"""
-        SELECT 
-            {date_format} as period,
-            COUNT(*) as orders_count,
-            SUM(total) as total_revenue,
-            AVG(total) as average_ticket
-        FROM orders
-        WHERE status = 'completed'
-        AND DATE(created_at) BETWEEN %s AND %s
-        GROUP BY period
-        ORDER BY period
-    """
-    
-    cursor.execute(query, (date_from, date_to))
+    queries.execute(cursor, f"revenue_by_{group_by}", (date_from, date_to))
     results = cursor.fetchall()
     
     return {
@@ -137,4 +123,153 @@ def get_revenue_by_period(
         "date_to": date_to,
         "group_by": group_by,
         "data": [dict(row) for row in results]
-    }
\ No newline at end of file
+    }
+
+@router.get("/stores/daily-sales")
+def get_stores_daily_sales(report_date: Optional[date] = None):
+    """Ventas diarias de todos los locales (consultados en paralelo) y el total"""
+    report_date = report_date or date.today()
+    results, unavailable = fan_out(lambda conn: _daily_sales(conn, report_date))
+
+    keys = ("total_orders", "total_sales", "total_tax", "completed_orders", "cancelled_orders")
+    summary = {key: sum(r['summary'][key] for r in results.values()) for key in keys}
+    summary['average_ticket'] = (
+        summary['total_sales'] / summary['total_orders'] if summary['total_orders'] else 0
+    )
+    by_type = {}
+    for result in results.values():
+        for row in result['by_order_type']:
+            merged = by_type.setdefault(
+                row['order_type'], {"order_type": row['order_type'], "count": 0, "total": 0}
+            )
+            merged['count'] += row['count']
+            merged['total'] += row['total']
+
+    return {
+        "date": report_date,
+        "summary": summary,
+        "by_order_type": list(by_type.values()),
+        "stores": {store_id: result['summary'] for store_id, result in results.items()},
+        "unavailable_stores": unavailable
+    }
+
+@router.get("/stores/top-products")
+def get_stores_top_products(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    limit: int = 10
+):
+    """
+    Productos más vendidos sumando todos los locales (consultados en paralelo)
+
+    Los ids de producto son propios de cada local, así que se agrupa por nombre.
+    Cada local aporta su top `limit`; un producto que quede fuera del top de
+    algún local puede quedar subestimado.
+    """
+    results, unavailable = fan_out(lambda conn: _top_products(conn, date_from, date_to, limit))
+
+    merged = {}
+    for rows in results.values():
+        for row in rows:
+            product = merged.setdefault(row['name'], {
+                "name": row['name'], "category": row['category'],
+                "times_ordered": 0, "total_quantity": 0, "total_revenue": 0
+            })
+            for key in ("times_ordered", "total_quantity", "total_revenue"):
+                product[key] += row[key]
+
+    top = sorted(merged.values(), key=lambda row: row['total_quantity'], reverse=True)[:limit]
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "top_products": top,
+        "unavailable_stores": unavailable
+    }
+
+@router.get("/prep-times")
+def get_prep_times(
+    date_from: date,
+    date_to: date,
+    conn = Depends(get_read_db)
+):
+    """
+    Tiempos de cocina por producto y hora del día, desde el historial de estados
+
+    `wait` es de pendiente a en preparación y `prep` de en preparación a lista
+    (segundos). Cada transición se arma con LEAD sobre el historial de la orden.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        """WITH transitions AS (
+               SELECT h.order_id, h.status, h.changed_at,
+                      LEAD(h.status) OVER w AS next_status,
+                      LEAD(h.changed_at) OVER w AS next_changed_at
+               FROM orders o
+               JOIN order_status_history h ON h.order_id = o.id
+               WHERE o.created_at >= %s AND o.created_at < %s + 1
+               WINDOW w AS (PARTITION BY h.order_id ORDER BY h.changed_at, h.id)
+           ), stages AS (
+               SELECT order_id,
+                      MIN(changed_at) FILTER (WHERE status = 'pending') AS pending_at,
+                      SUM(EXTRACT(EPOCH FROM next_changed_at - changed_at))
+                          FILTER (WHERE status = 'pending' AND next_status = 'preparing') AS wait_seconds,
+                      SUM(EXTRACT(EPOCH FROM next_changed_at - changed_at))
+                          FILTER (WHERE status = 'preparing' AND next_status = 'ready') AS prep_seconds
+               FROM transitions
+               GROUP BY order_id
+           )
+           SELECT oi.product_id, p.name AS product_name,
+                  EXTRACT(HOUR FROM s.pending_at)::int AS hour,
+                  COUNT(DISTINCT s.order_id) AS orders,
+                  ROUND(AVG(s.wait_seconds)::numeric, 1) AS avg_wait_seconds,
+                  ROUND(AVG(s.prep_seconds)::numeric, 1) AS avg_prep_seconds,
+                  ROUND(percentile_cont(0.9) WITHIN GROUP (ORDER BY s.prep_seconds)::numeric, 1)
+                      AS p90_prep_seconds
+           FROM stages s
+           JOIN order_items oi ON oi.order_id = s.order_id
+           JOIN products p ON p.id = oi.product_id
+           WHERE s.prep_seconds IS NOT NULL
+           GROUP BY oi.product_id, p.name, hour
+           ORDER BY hour, p.name""",
+        (date_from, date_to)
+    )
+    results = cursor.fetchall()
+
+    return {
+        "date_from": date_from,
+        "date_to": date_to,
+        "data": [dict(row) for row in results]
+    }
+
+@router.post("/close-day")
+def close_business_day(business_date: Optional[date] = None, force: bool = False, conn = Depends(get_db)):
+    """Cerrar el día y congelar su Z-report (por defecto, ayer, como app.eod)"""
+    if not business_date:
+        business_date = date.today() - timedelta(days=1)
+    elif business_date >= date.today() and not force:
+        # El día todavía no terminó: el Z-report quedaría congelado sin las órdenes que faltan
+        raise HTTPException(
+            status_code=400,
+            detail="El día todavía no terminó (use force=true para cerrarlo igual)"
+        )
+
+    try:
+        return close_day(conn, business_date, force)
+    except DayAlreadyClosed:
+        conn.rollback()
+        raise HTTPException(status_code=409, detail="El día ya está cerrado (use force=true para recalcular)")
+
+@router.get("/z/{business_date}")
+def get_z_report(business_date: date, conn = Depends(get_read_db)):
+    """Obtener el Z-report congelado de un día"""
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT report, closed_at FROM z_reports WHERE business_date = %s",
+        (business_date,)
+    )
+    z_report = cursor.fetchone()
+
+    if not z_report:
+        raise HTTPException(status_code=404, detail="El día no está cerrado")
+
+    return dict(z_report['report'], closed_at=z_report['closed_at'])
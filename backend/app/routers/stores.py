@@ -0,0 +1,18 @@
+"""
+Router para locales (multi-tienda)
+"""
+from fastapi import APIRouter, Depends
+
+from ..stores import Store, get_store, stores
+
+router = APIRouter()
+
+@router.get("")
+def get_stores():
+    """Obtener todos los locales configurados"""
+    return [store.info() for store in stores.values()]
+
+@router.get("/current")
+def get_current_store(store: Store = Depends(get_store)):
+    """Local del request (según el header X-Store-Id)"""
+    return store.info()
@@ -0,0 +1,20 @@
+"""
+Router para la sincronización de los tills
+"""
+from fastapi import APIRouter, Depends, Query
+from typing import Optional
+
+from .. import sync
+from ..database import get_read_db
+from ..serialization import PosJSONResponse
+
+router = APIRouter()
+
+@router.get("/changes")
+def get_changes(
+    since: Optional[int] = Query(None, ge=0),
+    conn = Depends(get_read_db)
+):
+    """Cambios desde una versión (sin versión, el estado completo)"""
+    cursor = conn.cursor()
+    return PosJSONResponse(sync.changes_since(cursor, since))
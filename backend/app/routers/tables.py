@@ -5,6 +5,7 @@ import psycopg2
 
 from ..database import get_db
 from ..models import Table, TableCreate
+from ..serialization import rows_response
 
 router = APIRouter()
 
@@ -17,7 +18,7 @@ def get_tables(status: Optional[str] = None, conn = Depends(get_db)):
     else:
         cursor.execute("SELECT * FROM tables ORDER BY table_number")
     tables = cursor.fetchall()
-    return tables
+    return rows_response(Table, tables)
 
 @router.post("", response_model=Table, status_code=status.HTTP_201_CREATED)
 def create_table(table: TableCreate, conn = Depends(get_db)):
@@ -0,0 +1,51 @@
+"""
+Serialización rápida de respuestas con orjson
+"""
+from decimal import Decimal
+from functools import lru_cache
+from typing import Iterable, Mapping, Type
+
+import orjson
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj):
+    """Tipos que orjson no serializa por sí solo"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
+
+
+class PosJSONResponse(ORJSONResponse):
+    """Respuesta JSON con orjson que además acepta Decimal (columnas DECIMAL)"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _model_fields(model: Type[BaseModel]) -> tuple:
+    """Campos públicos del modelo (se calculan una sola vez por modelo)"""
+    return tuple(model.model_fields)
+
+
+def row_response(model: Type[BaseModel], row: Mapping, status_code: int = 200) -> PosJSONResponse:
+    """
+    Serializar una fila de la BD con la forma de `model`, sin validarla.
+
+    Las filas de RealDictCursor ya tienen los tipos correctos, así que solo se
+    proyectan los campos del modelo (igual que haría response_model) y se pasan
+    directo a orjson. El response_model del endpoint se mantiene para OpenAPI.
+    """
+    fields = _model_fields(model)
+    return PosJSONResponse({f: row.get(f) for f in fields}, status_code=status_code)
+
+
+def rows_response(model: Type[BaseModel], rows: Iterable[Mapping], status_code: int = 200) -> PosJSONResponse:
+    """Igual que row_response pero para listas de filas"""
+    fields = _model_fields(model)
+    return PosJSONResponse(
+        [{f: row.get(f) for f in fields} for row in rows],
+        status_code=status_code
+    )
@@ -0,0 +1,119 @@
+"""
+Locales (multi-tienda)
+
+Cada local tiene su propia base de datos, o su propio schema dentro de una
+base compartida, según el mapa de shards de settings.STORES, además de su
+tasa de impuestos, su prefijo de número de orden y su ubicación. Las cajas
+indican su local con el header `X-Store-Id`; sin header se usa el local por
+defecto. Los cachés en memoria (menú, índice de clientes, pronóstico) son
+por local.
+"""
+import re
+from typing import Dict, Optional
+
+import psycopg2
+from fastapi import Header, HTTPException
+from psycopg2.extras import RealDictCursor
+
+from .catalog import Catalog, CatalogListener
+from .config import settings
+from .delivery import CustomerIndex, Point
+from .forecast import ForecastCache
+
+SCHEMA_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class Store:
+    """Un local: dónde están sus datos, su configuración y sus cachés"""
+
+    def __init__(
+        self,
+        store_id: str,
+        name: str,
+        dsn: str,
+        schema: Optional[str] = None,
+        replica_dsn: Optional[str] = None,
+        tax_rate: float = settings.TAX_RATE,
+        order_prefix: str = "ORD",
+        latitude: float = settings.DELIVERY_ORIGIN_LAT,
+        longitude: float = settings.DELIVERY_ORIGIN_LON,
+    ):
+        if schema is not None and not SCHEMA_NAME.match(schema):
+            raise ValueError(f"Schema inválido para el local {store_id}: {schema!r}")
+        self.id = store_id
+        self.name = name
+        self.dsn = dsn
+        self.schema = schema
+        self.replica_dsn = replica_dsn
+        self.tax_rate = tax_rate
+        self.order_prefix = order_prefix
+        self.origin: Point = (latitude, longitude)
+
+        self.catalog = Catalog()
+        self.catalog_listener = CatalogListener(self.catalog, self.connect)
+        self.customer_index = CustomerIndex()
+        self.forecast = ForecastCache()
+
+    def connect_kwargs(self) -> dict:
+        """Argumentos de conexión: RealDictCursor y, si aplica, el schema del local"""
+        kwargs = {"cursor_factory": RealDictCursor}
+        if self.schema:
+            # Sin public: si al schema le falta una tabla, la consulta falla en
+            # vez de leer o escribir la del local por defecto
+            kwargs["options"] = f"-c search_path={self.schema}"
+        return kwargs
+
+    def connect(self, dsn: Optional[str] = None, **kwargs):
+        """Abrir una conexión (por defecto a la primaria del local)"""
+        return psycopg2.connect(dsn or self.dsn, **self.connect_kwargs(), **kwargs)
+
+    def info(self) -> dict:
+        """Datos públicos del local (sin credenciales)"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "tax_rate": self.tax_rate,
+            "order_prefix": self.order_prefix,
+            "latitude": self.origin[0],
+            "longitude": self.origin[1],
+            "is_default": self.id == settings.DEFAULT_STORE_ID,
+        }
+
+
+def _load_stores() -> Dict[str, Store]:
+    configs = {
+        settings.DEFAULT_STORE_ID: {
+            "name": "Local principal",
+            "dsn": settings.DATABASE_URL,
+            "replica_dsn": settings.DATABASE_REPLICA_URL,
+        }
+    }
+    for store_id, config in settings.STORES.items():
+        # Sin dsn propio, el local es un schema dentro de DATABASE_URL: sin
+        # schema compartiría las tablas de public con el local por defecto
+        if store_id != settings.DEFAULT_STORE_ID and not config.get("dsn") and not config.get("schema"):
+            raise ValueError(f"El local {store_id} necesita 'dsn' o 'schema' en STORES")
+        configs[store_id] = {"name": store_id, "dsn": settings.DATABASE_URL, **configs.get(store_id, {}), **config}
+    return {store_id: Store(store_id, **config) for store_id, config in configs.items()}
+
+
+stores: Dict[str, Store] = _load_stores()
+
+
+def default_store() -> Store:
+    return stores[settings.DEFAULT_STORE_ID]
+
+
+def get_store(x_store_id: Optional[str] = Header(None)) -> Store:
+    """
+    Local del request según el header `X-Store-Id` (por defecto, el principal)
+
+    Raises:
+        HTTPException: 404 si el local no existe
+    """
+    if x_store_id is None:
+        return default_store()
+    store = stores.get(x_store_id)
+    if store is None:
+        raise HTTPException(status_code=404, detail="Local no encontrado")
+    return store
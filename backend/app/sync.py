@@ -0,0 +1,156 @@
+"""
+Sincronización de los tills (changefeed)
+
+Los tills guardan una réplica local de productos, modificadores, mesas,
+clientes y las órdenes del día, y solo piden lo que cambió desde su última
+versión. Cada cambio queda anotado por trigger en change_log con el id de la
+transacción que lo hizo (txid).
+
+La versión que se entrega es el xmin del snapshot actual: todas las
+transacciones con txid menor ya terminaron, así que el rango
+[versión anterior, versión nueva) está completo y nunca va a aparecer después
+un cambio dentro de él (con un id secuencial sí podría: los ids se asignan al
+insertar y las transacciones confirman en otro orden). Una transacción larga
+solo retrasa los cambios posteriores, no los pierde.
+
+Depuración nocturna del change_log (desde backend/):
+    python -m app.sync [--days 14] [--store ID]
+"""
+import argparse
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from .config import settings
+from .order_tree import ORDER_ITEMS_JSON
+
+# Fila completa de cada entidad replicada, por lista de ids
+ENTITIES = {
+    "products": "SELECT * FROM products WHERE id = ANY(%(ids)s)",
+    "modifiers": "SELECT * FROM modifiers WHERE id = ANY(%(ids)s)",
+    "tables": "SELECT * FROM tables WHERE id = ANY(%(ids)s)",
+    "customers": "SELECT * FROM customers WHERE id = ANY(%(ids)s)",
+    # Solo las órdenes del día, con sus items y modificadores
+    "orders": f"""SELECT o.*, {ORDER_ITEMS_JSON} AS items
+                  FROM orders o
+                  WHERE o.id = ANY(%(ids)s) AND o.created_at >= %(today)s""",
+}
+
+# Estado completo (primera sincronización o versión ya depurada)
+FULL_STATE = {
+    "products": "SELECT * FROM products ORDER BY id",
+    "modifiers": "SELECT * FROM modifiers ORDER BY id",
+    "tables": "SELECT * FROM tables ORDER BY id",
+    "customers": "SELECT * FROM customers ORDER BY id",
+    "orders": f"""SELECT o.*, {ORDER_ITEMS_JSON} AS items
+                  FROM orders o
+                  WHERE o.created_at >= %(today)s
+                  ORDER BY o.id""",
+}
+
+
+def _today() -> datetime:
+    return datetime.combine(date.today(), time.min)
+
+
+def current_version(cursor) -> int:
+    """Versión hasta la que todos los cambios ya están confirmados"""
+    cursor.execute("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint AS version")
+    return cursor.fetchone()['version']
+
+
+def full_state(cursor) -> dict:
+    """Todo lo que replica un till, con la versión desde la que seguir"""
+    version = current_version(cursor)
+    params = {"today": _today()}
+    entities = {}
+    for entity, query in FULL_STATE.items():
+        cursor.execute(query, params)
+        entities[entity] = {"upserted": cursor.fetchall(), "deleted": []}
+    return {"version": version, "full": True, "changes": entities}
+
+
+def changes_since(cursor, since: Optional[int]) -> dict:
+    """
+    Cambios desde la versión `since` (el estado completo si es None o si
+    change_log ya se depuró más allá de esa versión)
+
+    Por entidad: `upserted` (filas actuales) y `deleted` (ids borrados). Una
+    fila que cambió varias veces llega una sola vez, con su estado actual.
+    """
+    if since is None:
+        return full_state(cursor)
+
+    cursor.execute("SELECT pruned_before::text::bigint AS pruned_before FROM change_log_horizon")
+    horizon = cursor.fetchone()
+    if horizon and since < horizon['pruned_before']:
+        return full_state(cursor)
+
+    version = current_version(cursor)
+    cursor.execute(
+        """SELECT entity, array_agg(DISTINCT entity_id) AS ids
+           FROM change_log
+           WHERE txid >= %s::text::xid8 AND txid < %s::text::xid8
+           GROUP BY entity""",
+        (since, version)
+    )
+    changed = {row['entity']: row['ids'] for row in cursor.fetchall()}
+
+    params = {"today": _today()}
+    entities = {}
+    for entity, ids in changed.items():
+        cursor.execute(ENTITIES[entity], dict(params, ids=ids))
+        rows = cursor.fetchall()
+        found = {row['id'] for row in rows}
+        # Las órdenes no se borran: las que faltan son de días anteriores
+        deleted = [] if entity == "orders" else sorted(set(ids) - found)
+        entities[entity] = {"upserted": rows, "deleted": deleted}
+    return {"version": version, "full": False, "changes": entities}
+
+
+def prune(conn, days: int = settings.SYNC_LOG_RETENTION_DAYS) -> int:
+    """
+    Borrar de change_log lo anterior a `days` días y mover el horizonte
+
+    Returns:
+        int: filas borradas
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT MAX(txid)::text::bigint AS txid FROM change_log WHERE changed_at < %s",
+        (datetime.now() - timedelta(days=days),)
+    )
+    last = cursor.fetchone()['txid']
+    if last is None:
+        return 0
+
+    cursor.execute("DELETE FROM change_log WHERE txid <= %s::text::xid8", (last,))
+    deleted = cursor.rowcount
+    cursor.execute(
+        """INSERT INTO change_log_horizon (id, pruned_before) VALUES (true, %s::text::xid8)
+           ON CONFLICT (id) DO UPDATE SET pruned_before = EXCLUDED.pruned_before""",
+        (last + 1,)
+    )
+    conn.commit()
+    return deleted
+
+
+def main():
+    from .stores import stores
+
+    parser = argparse.ArgumentParser(description="Depurar el change_log de sincronización")
+    parser.add_argument("--days", type=int, default=settings.SYNC_LOG_RETENTION_DAYS,
+                        help="Días de cambios que se conservan")
+    parser.add_argument("--store", choices=sorted(stores), default=None,
+                        help="Local a depurar (por defecto, todos)")
+    args = parser.parse_args()
+
+    for store in ([stores[args.store]] if args.store else stores.values()):
+        conn = store.connect()
+        try:
+            print(store.id, prune(conn, args.days), "cambios depurados")
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# Ticket de cocina: sin precios, cantidades grandes (sintaxis en app/receipts.py)
+@center @big @bold {order_type_label}
+@big #{order_number}
+@if table_number
+@big Table {table_number}
+@end
+@pair {created_at:%H:%M} | {customer_name}
+@if promised_at
+@bold Promised for {promised_at:%H:%M}
+@end
+@if reprint
+@center @bold *** REPRINT ***
+@end
+@rule =
+@each items
+@big @bold {quantity} x {product_name}
+@each modifiers
+   + {quantity}x {modifier_name}
+@end
+@if special_instructions
+@bold    ! {special_instructions}
+@end
+@end
+@rule =
+@if notes
+@bold Notes: {notes}
+@end
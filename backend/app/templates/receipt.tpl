@@ -0,0 +1,44 @@
+# Recibo del cliente (sintaxis en app/receipts.py)
+@center @big @bold {store_name}
+@if reprint
+@center @bold *** REPRINT ***
+@end
+@rule
+@pair Order {order_number} | {created_at:%d/%m/%Y %H:%M}
+@if table_number
+Table {table_number}
+@end
+@if customer_name
+Customer: {customer_name}
+@end
+@rule
+@each items
+@pair {quantity} x {product_name} | {subtotal:.2f}
+@each modifiers
+@pair    + {modifier_name} | {line_total:.2f}
+@end
+@end
+@rule
+@pair Subtotal | {subtotal:.2f}
+@each promotions
+@pair {name} | -{amount:.2f}
+@end
+@if delivery_fee
+@pair Delivery | {delivery_fee:.2f}
+@end
+@pair Tax | {tax:.2f}
+@bold @pair TOTAL | €{total:.2f}
+@if payments
+@rule
+@each payments
+@pair Paid ({method}) | {amount:.2f}
+@end
+@if change
+@pair Change | {change:.2f}
+@end
+@end
+@if balance_due
+@bold @pair Balance due | €{balance_due:.2f}
+@end
+@rule
+@center Thank you!
@@ -0,0 +1,20 @@
+"""
+Worker de gunicorn para producción (ver gunicorn.conf.py)
+"""
+from uvicorn.workers import UvicornWorker
+
+
+class PosUvicornWorker(UvicornWorker):
+    """
+    UvicornWorker con drenaje acotado al recibir SIGTERM
+
+    El worker de uvicorn espera sin límite a los requests en curso, y las
+    conexiones SSE de /api/menu/events no terminan nunca: gunicorn acabaría
+    matando el worker con SIGKILL sin correr el apagado del lifespan (vaciar
+    la cola de órdenes, cerrar el pool). Se corta la espera a la mitad de
+    graceful_timeout y la otra mitad queda para ese apagado.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(1, self.cfg.graceful_timeout // 2)
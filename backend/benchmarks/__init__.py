@@ -0,0 +1,3 @@
+"""
+Benchmarks del backend (se ejecutan con python -m benchmarks.<nombre>)
+"""
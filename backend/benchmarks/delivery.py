@@ -0,0 +1,75 @@
+"""
+Benchmark del motor de reparto con clientes sintéticos alrededor del local:
+carga del índice, tarifa por pedido, búsqueda por cercanía y armado de viajes.
+
+Uso (desde backend/):
+    python -m benchmarks.delivery [--customers 100000] [--orders 200]
+"""
+import argparse
+import random
+import time
+from app.config import settings
+from app.delivery import CustomerIndex, GridIndex, haversine_km, plan_runs, quote
+
+
+def _random_point(rng, radius_km):
+    """Punto aleatorio a menos de radius_km del local"""
+    lat0, lon0 = settings.DELIVERY_ORIGIN_LAT, settings.DELIVERY_ORIGIN_LON
+    while True:
+        lat = lat0 + rng.uniform(-1, 1) * radius_km / 111.32
+        lon = lon0 + rng.uniform(-1, 1) * radius_km / 66.0
+        if haversine_km(lat0, lon0, lat, lon) <= radius_km:
+            return lat, lon
+
+
+def _timed(label, fn, count=1):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    per = f"  ({elapsed / count * 1e6:.1f} us c/u)" if count > 1 else ""
+    print(f"{label:<42}{elapsed * 1000:>10.1f} ms{per}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    max_km = max(km for km, _ in settings.DELIVERY_ZONES)
+    rows = []
+    for i in range(1, args.customers + 1):
+        lat, lon = _random_point(rng, max_km)
+        rows.append({"id": i, "latitude": lat, "longitude": lon, "is_active": True})
+
+    index = CustomerIndex()
+    _timed(f"cargar índice ({args.customers} clientes)", lambda: CustomerIndex._apply(index.grid, rows, ()))
+    grid = index.grid
+
+    ids = [rng.randint(1, args.customers) for _ in range(10_000)]
+    _timed("tarifa de 10k pedidos", lambda: [quote(*grid.points[i]) for i in ids], len(ids))
+
+    centers = [_random_point(rng, max_km) for _ in range(1_000)]
+    _timed("1k búsquedas por cercanía (r=0.5 km)",
+           lambda: [grid.within(lat, lon, 0.5) for lat, lon in centers], len(centers))
+
+    # Referencia: la misma búsqueda recorriendo todos los clientes
+    lat, lon = centers[0]
+    _timed("1 búsqueda sin índice (recorrido completo)",
+           lambda: [k for k, p in grid.points.items() if haversine_km(lat, lon, *p) <= 0.5])
+
+    stops = []
+    for order_id in range(1, args.orders + 1):
+        lat, lon = grid.points[rng.randint(1, args.customers)]
+        stops.append({"order_id": order_id, "latitude": lat, "longitude": lon})
+    runs = _timed(f"armar viajes ({args.orders} pedidos)", lambda: plan_runs(
+        stops, settings.DELIVERY_RUN_MAX_STOPS, settings.DELIVERY_RUN_RADIUS_KM
+    ))
+    print(f"{'viajes generados':<42}{len(runs):>10}")
+
+
+if __name__ == "__main__":
+    main()
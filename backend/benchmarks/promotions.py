@@ -0,0 +1,104 @@
+"""
+Benchmark del motor de promociones con reglas y canastas sintéticas:
+compilación del índice y descuento por canasta usando el índice frente a
+recorrer todas las promociones activas.
+
+Uso (desde backend/):
+    python -m benchmarks.promotions [--rules 500] [--products 600] [--lines 40]
+"""
+import argparse
+import random
+import time
+from datetime import datetime, time as clock, timedelta
+
+from app.promotions import PromotionIndex, evaluate
+
+
+def _timed(label, fn, count=1):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    per = f"  ({elapsed / count * 1e6:.1f} us c/u)" if count > 1 else ""
+    print(f"{label:<42}{elapsed * 1000:>10.1f} ms{per}")
+    return result
+
+
+def _rules(rng, count, product_ids, category_ids):
+    rows = []
+    for key in range(1, count + 1):
+        kind = rng.choices(("percentage", "bogo", "combo"), weights=(5, 3, 2))[0]
+        row = {"id": key, "name": f"promo {key}", "kind": kind, "product_ids": [], "category_ids": []}
+        if kind == "combo":
+            row["product_ids"] = rng.sample(product_ids, rng.randint(2, 4))
+            row["combo_price"] = rng.uniform(5, 15)
+        elif rng.random() < 0.3:
+            row["category_ids"] = [rng.choice(category_ids)]
+        else:
+            row["product_ids"] = rng.sample(product_ids, rng.randint(1, 5))
+        if kind == "percentage":
+            row["percent"] = rng.choice((5, 10, 15, 20, 25, 50))
+        if kind == "bogo":
+            row["buy_quantity"], row["free_quantity"] = rng.choice(((1, 1), (2, 1), (3, 1)))
+        # La mitad con franja horaria (happy hour) y algunos días de la semana
+        if rng.random() < 0.5:
+            start = rng.randint(0, 22)
+            row["start_time"] = clock(start)
+            row["end_time"] = clock((start + rng.randint(1, 4)) % 24)
+            row["days_of_week"] = rng.sample(range(1, 8), rng.randint(1, 7))
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--products", type=int, default=600)
+    parser.add_argument("--categories", type=int, default=30)
+    parser.add_argument("--lines", type=int, default=40, help="líneas por canasta")
+    parser.add_argument("--baskets", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    category_ids = list(range(1, args.categories + 1))
+    products = {
+        key: {"id": key, "category_id": rng.choice(category_ids), "price": round(rng.uniform(1, 15), 2)}
+        for key in range(1, args.products + 1)
+    }
+    product_ids = list(products)
+    rows = _rules(rng, args.rules, product_ids, category_ids)
+
+    index = _timed(f"compilar índice ({args.rules} reglas)", lambda: PromotionIndex(rows, products))
+
+    week = datetime(2024, 1, 1)
+    baskets = []
+    for _ in range(args.baskets):
+        lines = [
+            {"product_id": key, "quantity": rng.randint(1, 4), "unit_price": products[key]["price"]}
+            for key in rng.sample(product_ids, args.lines)
+        ]
+        baskets.append((lines, week + timedelta(minutes=rng.randrange(7 * 24 * 60))))
+
+    def indexed():
+        return [index.apply(lines, at) for lines, at in baskets]
+
+    def full_scan():
+        results = []
+        for lines, at in baskets:
+            basket = {line["product_id"] for line in lines}
+            rules = [rule for rule in index.rules.values() if rule.covers(at) and rule.targets & basket]
+            results.append(evaluate(rules, lines))
+        return results
+
+    fast = _timed(f"{args.baskets} canastas con índice", indexed, args.baskets)
+    slow = _timed(f"{args.baskets} canastas recorriendo todo", full_scan, args.baskets)
+    assert fast == slow, "el índice y el recorrido completo no coinciden"
+
+    candidates = sum(len(index.candidates({line["product_id"] for line in lines}, at)) for lines, at in baskets)
+    discounted = sum(1 for discount, _ in fast if discount)
+    print(f"reglas evaluadas por canasta: {candidates / args.baskets:.1f} de {len(index)}; "
+          f"canastas con descuento: {discounted}")
+
+
+if __name__ == "__main__":
+    main()
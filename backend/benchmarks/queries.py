@@ -0,0 +1,74 @@
+"""
+Benchmark de las consultas del registro (app.queries): ejecución normal
+(parse + plan en cada llamada) contra EXECUTE de la sentencia preparada.
+
+Necesita la base de datos configurada (DATABASE_URL). Solo lee: las
+sentencias con FOR UPDATE se ejecutan dentro de una transacción que se
+deshace.
+
+Uso (desde backend/):
+    python -m benchmarks.queries [--calls 2000]
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+from app import queries
+from app.stores import default_store
+
+
+def _per_call(conn, name, params, calls):
+    """Microsegundos por llamada (con fetch) de una consulta del registro"""
+    cursor = conn.cursor()
+    queries.execute(cursor, name, params)  # la preparada se prepara aquí
+    cursor.fetchall()
+    start = time.perf_counter()
+    for _ in range(calls):
+        queries.execute(cursor, name, params)
+        cursor.fetchall()
+    elapsed = time.perf_counter() - start
+    conn.rollback()
+    return elapsed / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    store = default_store()
+    plain = store.connect()
+    prepared = store.connect(connection_factory=queries.PreparingConnection)
+
+    cursor = plain.cursor()
+    cursor.execute("SELECT MIN(id) AS product_id FROM products")
+    product_id = cursor.fetchone()["product_id"]
+    cursor.execute("SELECT MAX(id) AS order_id FROM orders")
+    order_id = cursor.fetchone()["order_id"]
+    plain.rollback()
+
+    today = date.today()
+    cases = [
+        ("catalog_version", ()),
+        ("stamp_products", ()),
+        ("stamp_orders", ()),
+        ("orders_today_count", ()),
+        ("revenue_by_day", (today - timedelta(days=30), today)),
+    ]
+    if product_id is not None:
+        cases.append(("product_by_id", (product_id,)))
+    if order_id is not None:
+        cases.append(("order_for_update", (order_id,)))
+
+    print(f"{'consulta':<22}{'normal':>12}{'preparada':>12}{'ahorro':>12}")
+    for name, params in cases:
+        normal = _per_call(plain, name, params, args.calls)
+        fast = _per_call(prepared, name, params, args.calls)
+        print(f"{name:<22}{normal:>9.1f} us{fast:>9.1f} us{normal - fast:>9.1f} us")
+
+    plain.close()
+    prepared.close()
+
+
+if __name__ == "__main__":
+    main()
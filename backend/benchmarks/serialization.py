@@ -0,0 +1,90 @@
+"""
+Benchmark de serialización de respuestas: camino de FastAPI (validación con
+response_model + encoder json estándar) vs. proyección de filas + orjson.
+
+Uso (desde backend/):
+    python -m benchmarks.serialization [--rows 100] [--repeat 200]
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app.models import Product, OrderResponse, Customer
+from app.serialization import rows_response
+
+
+def _product_rows(n):
+    now = datetime.now()
+    return [{
+        "id": i, "category_id": i % 4 + 1, "name": f"Producto {i}",
+        "description": "Carne, lechuga, tomate, cebolla", "price": Decimal("8.99"),
+        "image_url": None, "is_available": True,
+        "created_at": now, "updated_at": now,
+    } for i in range(n)]
+
+
+def _order_rows(n):
+    now = datetime.now()
+    return [{
+        "id": i, "table_id": None, "order_number": f"ORD-20240101-{i:04d}",
+        "customer_name": "John Doe", "order_type": "takeout", "status": "pending",
+        "subtotal": Decimal("21.98"), "tax": Decimal("2.20"), "discount": Decimal("0.00"),
+        "total": Decimal("24.18"), "payment_method": "card", "notes": None,
+        "promised_at": now + timedelta(minutes=20), "created_at": now, "completed_at": None,
+    } for i in range(n)]
+
+
+def _customer_rows(n):
+    now = datetime.now()
+    return [{
+        "id": i, "phone": f"087{i:07d}", "name": f"Cliente {i}", "email": None,
+        "address_line1": "123 Main Street", "address_line2": None, "city": "Drogheda",
+        "county": "Louth", "eircode": "A92 X7Y8", "country": "Ireland",
+        "latitude": Decimal("53.71790000"), "longitude": Decimal("-6.35610000"),
+        "notes": None, "is_active": True, "total_orders": 3, "total_spent": Decimal("54.10"),
+        "created_at": now, "updated_at": now,
+    } for i in range(n)]
+
+
+def _fastapi_path(adapter, rows):
+    """Lo que hace FastAPI con response_model: validar, volcar a JSON y json.dumps"""
+    value = adapter.validate_python(rows)
+    content = adapter.dump_python(value, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    cases = [
+        ("/api/products", Product, _product_rows(args.rows)),
+        ("/api/orders", OrderResponse, _order_rows(args.rows)),
+        ("/api/customers", Customer, _customer_rows(args.rows)),
+    ]
+
+    print(f"{'endpoint':<16}{'antes (us)':>12}{'después (us)':>14}{'mejora':>9}")
+    for name, model, rows in cases:
+        adapter = TypeAdapter(List[model])
+        before = _timeit(lambda: _fastapi_path(adapter, rows), args.repeat)
+        after = _timeit(lambda: rows_response(model, rows).body, args.repeat)
+        print(f"{name:<16}{before:>12.1f}{after:>14.1f}{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Costo de arranque de la API: tiempo de `import app.main` en un proceso nuevo,
+los módulos que más pesan (según `python -X importtime`) y lo que hace el
+precalentamiento del lifespan (esquema OpenAPI), comparado con el
+presupuesto. El presupuesto lo hace cumplir tests/test_startup.py.
+
+Uso (desde backend/):
+    python -m benchmarks.startup [--budget-ms 1500] [--runs 3] [--top 15]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Presupuesto del import de app.main (ms), compartido con tests/test_startup.py
+IMPORT_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app.main; "
+    "print(time.perf_counter() - t)"
+)
+
+
+def _python(*args):
+    env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+    return subprocess.run(
+        [sys.executable, *args], capture_output=True, text=True, env=env, cwd=BACKEND_DIR, check=True
+    )
+
+
+def import_seconds(runs: int) -> float:
+    """Mejor tiempo de import de app.main en procesos nuevos (sin caché de módulos)"""
+    return min(float(_python("-c", IMPORT_SNIPPET).stdout) for _ in range(runs))
+
+
+def import_profile():
+    """(módulo, propio_us, acumulado_us) de cada import, según -X importtime"""
+    stderr = _python("-X", "importtime", "-c", "import app.main").stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(own), int(cumulative)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    rows = import_profile()
+    print(f"{'módulo':<48}{'propio ms':>12}{'acum. ms':>12}")
+    for name, own, cumulative in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"{name:<48}{own / 1000:>12.1f}{cumulative / 1000:>12.1f}")
+
+    own_app = sum(own for name, own, _ in rows if name == "app" or name.startswith("app."))
+    print(f"\n{'módulos propios (app.*)':<48}{own_app / 1000:>12.1f} ms")
+
+    elapsed = import_seconds(args.runs) * 1000
+    print(f"{'import app.main (mejor de ' + str(args.runs) + ')':<48}{elapsed:>12.1f} ms")
+
+    from app.main import app
+    start = time.perf_counter()
+    app.openapi()
+    print(f"{'esquema OpenAPI (hecho en el lifespan)':<48}{(time.perf_counter() - start) * 1000:>12.1f} ms")
+
+    if elapsed > args.budget_ms:
+        print(f"\nImport por encima del presupuesto ({elapsed:.0f} > {args.budget_ms:.0f} ms)")
+    else:
+        print(f"\nDentro del presupuesto ({elapsed:.0f} <= {args.budget_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Escalado del perfil de producción: levanta gunicorn (gunicorn.conf.py) con
+1, 2, ... N workers y mide requests por segundo contra un endpoint con
+clientes HTTP keep-alive en procesos separados.
+
+Necesita la base de datos configurada (DATABASE_URL) salvo con --path /health.
+
+Uso (desde backend/):
+    python -m benchmarks.workers [--max-workers N] [--path /api/menu]
+                                 [--clients 32] [--seconds 10]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn no respondió a /health")
+
+
+def _client(args):
+    """Un cliente: requests seguidos por una conexión keep-alive; devuelve (ok, errores)"""
+    port, path, seconds = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    ok = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        try:
+            conn.request("GET", path, headers={"Accept-Encoding": "gzip"})
+            response = conn.getresponse()
+            response.read()
+            if response.status < 400:
+                ok += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    return ok, errors
+
+
+def run(workers: int, path: str, clients: int, seconds: float):
+    port = _free_port()
+    env = dict(os.environ, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "--access-logfile", "/dev/null", "app.main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(port)
+        with multiprocessing.Pool(clients) as pool:
+            results = pool.map(_client, [(port, path, seconds)] * clients)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(60)
+
+    ok = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return ok / seconds, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--path", default="/api/menu")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    counts = sorted({1, *range(2, args.max_workers + 1, 2), args.max_workers})
+    print(f"GET {args.path}, {args.clients} clientes, {args.seconds:.0f} s por corrida\n")
+    print(f"{'workers':>8}{'req/s':>12}{'escalado':>10}{'errores':>10}")
+    base = None
+    for workers in counts:
+        rps, errors = run(workers, args.path, args.clients, args.seconds)
+        base = base or rps
+        print(f"{workers:>8}{rps:>12.0f}{rps / base:>9.2f}x{errors:>10}")
+
+
+if __name__ == "__main__":
+    main()
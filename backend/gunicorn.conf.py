@@ -0,0 +1,50 @@
+"""
+Perfil de producción: varios workers uvicorn detrás de gunicorn
+
+Uso (desde backend/):
+    gunicorn -c gunicorn.conf.py app.main:app
+
+- Workers: WEB_CONCURRENCY o, si no está, uno por núcleo disponible.
+- Conexiones: DB_MAX_CONNECTIONS es el total de cada local para toda la
+  instancia y se reparte entre los workers (cada worker tiene, por local, su
+  pool y su conexión LISTEN). DB_REPLICA_MAX_CONNECTIONS hace lo mismo con
+  los pools de la réplica.
+- SIGTERM: cada worker deja de aceptar requests, termina los que están en
+  curso (commits de órdenes incluidos) y cierra sus conexiones.
+- Reinicio sin cortes: `kill -HUP <pid del master>` levanta workers con el
+  código nuevo y recién entonces retira los viejos.
+"""
+import os
+
+def _cpu_count() -> int:
+    # Respeta los límites de CPU del contenedor (cpuset)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", _cpu_count()))
+worker_class = "app.workers.PosUvicornWorker"
+# Sin preload: cada worker importa la app después del fork, así HUP carga el
+# código nuevo y ningún worker hereda conexiones ni hilos del master
+preload_app = False
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = 60
+keepalive = 5
+accesslog = "-"
+
+# La ingesta diferida de órdenes numera y guarda el journal en memoria de un
+# único proceso: con varios workers se duplicarían números de orden
+if os.getenv("ORDER_WRITE_BEHIND", "").lower() in ("1", "true", "yes", "on") and workers > 1:
+    raise RuntimeError("ORDER_WRITE_BEHIND requiere un solo worker (WEB_CONCURRENCY=1)")
+
+# Repartir las conexiones entre workers; se pasa por entorno porque cada
+# worker lee la configuración al importar la app. Se descuenta la LISTEN.
+_per_worker = max(2, int(os.getenv("DB_MAX_CONNECTIONS", "60")) // workers - 1)
+os.environ["DB_POOL_MAX"] = str(_per_worker)
+os.environ["DB_POOL_MIN"] = str(min(int(os.getenv("DB_POOL_MIN", "2")), _per_worker))
+
+# Lo mismo para el pool de la réplica (sin LISTEN)
+_replica_per_worker = max(1, int(os.getenv("DB_REPLICA_MAX_CONNECTIONS", "60")) // workers)
+os.environ["REPLICA_POOL_MAX"] = str(_replica_per_worker)
+os.environ["REPLICA_POOL_MIN"] = str(min(int(os.getenv("REPLICA_POOL_MIN", "1")), _replica_per_worker))
@@ -33,6 +33,33 @@ CREATE INDEX idx_customers_phone ON customers(phone);
 CREATE INDEX idx_customers_eircode ON customers(eircode);
 CREATE INDEX idx_customers_name ON customers(name);
 
+-- updated_at se mantiene con touch_updated_at() (definida en el init.sql principal)
+CREATE TRIGGER trg_customers_updated_at
+    BEFORE UPDATE ON customers
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- Changefeed de los tills (log_change() también está en el init.sql principal)
+CREATE TRIGGER trg_customers_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON customers
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+
+ALTER TABLE orders
+    ADD CONSTRAINT fk_orders_customer FOREIGN KEY (customer_id) REFERENCES customers(id);
+
+-- Productos favoritos por cliente, acumulados al crear cada orden (evita
+-- recorrer todo el historial en cada consulta)
+CREATE TABLE IF NOT EXISTS customer_favourites (
+    customer_id INTEGER REFERENCES customers(id) ON DELETE CASCADE,
+    product_id INTEGER REFERENCES products(id),
+    times_ordered INTEGER NOT NULL DEFAULT 0,  -- órdenes que incluyeron el producto
+    total_quantity INTEGER NOT NULL DEFAULT 0,
+    last_ordered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (customer_id, product_id)
+);
+
+CREATE INDEX idx_customer_favourites_rank
+    ON customer_favourites (customer_id, times_ordered DESC, total_quantity DESC);
+
 -- Datos de ejemplo
 INSERT INTO customers (phone, name, email, address_line1, city, eircode) VALUES
 ('0871234567', 'John Doe', 'john@example.com', '123 Main Street', 'Drogheda', 'A92 X7Y8'),
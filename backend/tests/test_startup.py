@@ -0,0 +1,15 @@
+"""
+Costo de arranque: el import de app.main no puede superar el presupuesto
+
+Se mide en procesos nuevos con benchmarks/startup.py (STARTUP_BUDGET_MS
+cambia el presupuesto).
+"""
+from benchmarks.startup import IMPORT_BUDGET_MS, import_seconds
+
+
+def test_import_within_budget():
+    elapsed = import_seconds(runs=3) * 1000
+    assert elapsed <= IMPORT_BUDGET_MS, (
+        f"import app.main tarda {elapsed:.0f} ms (presupuesto: {IMPORT_BUDGET_MS:.0f} ms); "
+        "ver python -m benchmarks.startup"
+    )
@@ -41,6 +41,7 @@ CREATE TABLE tables (
 CREATE TABLE orders (
     id SERIAL PRIMARY KEY,
     table_id INTEGER REFERENCES tables(id),
+    customer_id INTEGER, -- FK a customers (tabla creada en backend/init.sql)
     order_number VARCHAR(50) UNIQUE NOT NULL,
     customer_name VARCHAR(200),
     order_type VARCHAR(20) NOT NULL, -- 'dine-in', 'takeout', 'delivery'
@@ -48,10 +49,15 @@ CREATE TABLE orders (
     subtotal DECIMAL(10, 2) NOT NULL,
     tax DECIMAL(10, 2) DEFAULT 0.00,
     discount DECIMAL(10, 2) DEFAULT 0.00,
+    delivery_fee DECIMAL(10, 2) DEFAULT 0.00,
     total DECIMAL(10, 2) NOT NULL,
-    payment_method VARCHAR(50), -- 'cash', 'card', 'transfer'
+    payment_method VARCHAR(50), -- 'cash', 'card', 'transfer' ('split' si se pagó con varias)
+    paid_amount DECIMAL(10, 2) NOT NULL DEFAULT 0.00, -- suma de sus pagos vigentes (tabla payments)
+    payment_status VARCHAR(20) DEFAULT 'unpaid', -- 'unpaid', 'partial', 'paid'
     notes TEXT,
+    promised_at TIMESTAMP, -- hora comprometida al cliente (cola de cocina)
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     completed_at TIMESTAMP
 );
 
@@ -87,11 +93,166 @@ CREATE TABLE users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Inventario: ingredientes con stock y recetas por producto
+CREATE TABLE ingredients (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) UNIQUE NOT NULL,
+    unit VARCHAR(20) NOT NULL DEFAULT 'unit', -- 'unit', 'g', 'ml', ...
+    stock DECIMAL(12, 3) NOT NULL DEFAULT 0 CHECK (stock >= 0),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE recipes (
+    product_id INTEGER REFERENCES products(id) ON DELETE CASCADE,
+    ingredient_id INTEGER REFERENCES ingredients(id),
+    quantity DECIMAL(12, 3) NOT NULL CHECK (quantity > 0), -- por unidad de producto
+    PRIMARY KEY (product_id, ingredient_id)
+);
+
+-- Historial de estados de cada orden (solo se agregan filas): quién y cuándo
+-- la pasó a preparación, lista, cancelada, etc.
+CREATE TABLE order_status_history (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL REFERENCES orders(id),
+    from_status VARCHAR(20),
+    status VARCHAR(20) NOT NULL,
+    changed_by VARCHAR(100),
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Cierres del día (Z-report): snapshot congelado que no cambia con ediciones
+-- tardías de las órdenes
+CREATE TABLE z_reports (
+    business_date DATE PRIMARY KEY,
+    report JSONB NOT NULL,
+    orders_count INTEGER NOT NULL,
+    total_sales DECIMAL(12, 2) NOT NULL,
+    closed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Promociones. Forman parte del catálogo: cada cambio incrementa
+-- catalog_version y la API recompila su índice de reglas en memoria
+CREATE TABLE promotions (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(200) NOT NULL,
+    kind VARCHAR(20) NOT NULL CHECK (kind IN ('percentage', 'bogo', 'combo')),
+    product_ids INTEGER[] NOT NULL DEFAULT '{}', -- combo: sus productos (repetidos = varias unidades)
+    category_ids INTEGER[] NOT NULL DEFAULT '{}',
+    percent DECIMAL(5, 2) CHECK (percent > 0 AND percent <= 100), -- 'percentage'
+    buy_quantity INTEGER CHECK (buy_quantity > 0), -- 'bogo': compre N...
+    free_quantity INTEGER CHECK (free_quantity > 0), -- ...y lleve M gratis
+    combo_price DECIMAL(10, 2) CHECK (combo_price >= 0), -- 'combo'
+    days_of_week SMALLINT[] NOT NULL DEFAULT '{}', -- 1 = lunes ... 7 = domingo; vacío = todos
+    start_time TIME, -- franja horaria (puede cruzar la medianoche); NULL = todo el día
+    end_time TIME,
+    valid_from DATE,
+    valid_until DATE,
+    is_active BOOLEAN DEFAULT true,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Promociones aplicadas a cada orden y su importe
+CREATE TABLE order_promotions (
+    order_id INTEGER REFERENCES orders(id) ON DELETE CASCADE,
+    promotion_id INTEGER REFERENCES promotions(id),
+    amount DECIMAL(10, 2) NOT NULL,
+    PRIMARY KEY (order_id, promotion_id)
+);
+
+-- Pagos de cada orden: varios por orden (cuenta dividida, pagos parciales).
+-- Se anulan marcando voided_at, nunca se borran
+CREATE TABLE payments (
+    id BIGSERIAL PRIMARY KEY,
+    order_id INTEGER NOT NULL REFERENCES orders(id),
+    method VARCHAR(50) NOT NULL, -- 'cash', 'card', 'transfer'
+    amount DECIMAL(10, 2) NOT NULL CHECK (amount > 0),
+    tendered DECIMAL(10, 2), -- efectivo entregado (el vuelto es tendered - amount)
+    reference VARCHAR(100), -- autorización de la tarjeta, nº de transferencia...
+    created_by VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    voided_at TIMESTAMP
+);
+
+-- Totales por día y forma de pago, mantenidos por trigger con cada pago: el
+-- Z-report los lee por clave primaria en vez de recorrer órdenes o pagos
+CREATE TABLE payment_totals (
+    business_date DATE NOT NULL,
+    method VARCHAR(50) NOT NULL,
+    payments_count INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (business_date, method)
+);
+
+-- Acumulados por hora para el pronóstico de demanda: los completa de forma
+-- incremental la tarea nocturna (python -m app.forecast)
+CREATE TABLE orders_hourly (
+    hour TIMESTAMP PRIMARY KEY,
+    orders_count INTEGER NOT NULL,
+    revenue DECIMAL(12, 2) NOT NULL
+);
+
+CREATE TABLE sales_hourly (
+    hour TIMESTAMP NOT NULL,
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    quantity INTEGER NOT NULL,
+    revenue DECIMAL(12, 2) NOT NULL,
+    PRIMARY KEY (hour, product_id)
+);
+
+-- Último modelo de pronóstico ajustado (coeficientes por serie)
+CREATE TABLE forecast_models (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    fitted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    model JSONB NOT NULL
+);
+
+-- Registro de cambios para la sincronización de los tills (changefeed): una
+-- fila por fila insertada, modificada o borrada. La versión que ven los tills
+-- es el id de transacción (txid), que solo crece; ver app/sync.py
+CREATE TABLE change_log (
+    id BIGSERIAL PRIMARY KEY,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    entity VARCHAR(30) NOT NULL, -- 'products', 'modifiers', 'tables', 'customers', 'orders'
+    entity_id INTEGER NOT NULL,
+    operation CHAR(1) NOT NULL, -- 'I', 'U', 'D'
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Hasta qué versión se depuró change_log: un till con una versión anterior
+-- tiene que volver a descargar todo
+CREATE TABLE change_log_horizon (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    pruned_before XID8 NOT NULL
+);
+
 -- Índices para mejor rendimiento
 CREATE INDEX idx_orders_status ON orders(status);
 CREATE INDEX idx_orders_created_at ON orders(created_at);
+
+-- Historial por cliente: paginación por (created_at, id) descendente
+CREATE INDEX idx_orders_customer_recent ON orders (customer_id, created_at DESC, id DESC)
+    WHERE customer_id IS NOT NULL;
 CREATE INDEX idx_products_category ON products(category_id);
 CREATE INDEX idx_order_items_order ON order_items(order_id);
+CREATE INDEX idx_order_item_modifiers_item ON order_item_modifiers(order_item_id);
+CREATE INDEX idx_recipes_ingredient ON recipes(ingredient_id);
+
+-- Historial por orden en orden cronológico: el recorrido que usan las
+-- funciones de ventana (LEAD) del reporte de tiempos de preparación
+CREATE INDEX idx_order_status_history_order ON order_status_history (order_id, changed_at, id);
+CREATE INDEX idx_payments_order ON payments (order_id);
+
+-- Changefeed: rango de versiones desde la última sincronización de un till
+CREATE INDEX idx_change_log_txid ON change_log (txid);
+-- GET condicionales: ¿cambió esta tabla entre dos versiones? (ver conditional.py)
+CREATE INDEX idx_change_log_entity_txid ON change_log (entity, txid);
+
+-- Cola de cocina: índice parcial solo sobre tickets abiertos, así el costo
+-- depende de las órdenes pendientes y no del tamaño total de la tabla
+CREATE INDEX idx_orders_kitchen_queue ON orders ((COALESCE(promised_at, created_at)), id)
+    WHERE status IN ('pending', 'preparing');
 
 -- Datos de ejemplo
 INSERT INTO categories (name, description) VALUES 
@@ -114,4 +275,130 @@ INSERT INTO modifiers (name, price, modifier_type) VALUES
     ('Tocino', 1.50, 'extra'),
     ('Sin cebolla', 0.00, 'remove'),
     ('Sin tomate', 0.00, 'remove'),
-    ('Aguacate', 2.00, 'extra');
\ No newline at end of file
+    ('Aguacate', 2.00, 'extra');
+
+INSERT INTO promotions (name, kind, product_ids, category_ids, percent, buy_quantity, free_quantity, combo_price, days_of_week, start_time, end_time) VALUES
+    ('Combo Clásico', 'combo', '{1,6,4}', '{}', NULL, NULL, NULL, 13.50, '{}', NULL, NULL),
+    ('Happy hour bebidas', 'percentage', '{}', '{2}', 30, NULL, NULL, NULL, '{1,2,3,4,5}', '17:00', '19:00'),
+    ('Martes 2x1 BBQ', 'bogo', '{3}', '{}', NULL, 1, 1, NULL, '{2}', NULL, NULL);
+
+-- El historial de estados es de solo agregar
+CREATE FUNCTION forbid_history_changes() RETURNS trigger AS $$
+BEGIN
+    RAISE EXCEPTION 'order_status_history es de solo agregar';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_order_status_history_append_only
+    BEFORE UPDATE OR DELETE ON order_status_history
+    FOR EACH ROW EXECUTE FUNCTION forbid_history_changes();
+
+-- Acumular cada pago (y descontar cada anulación) en payment_totals
+CREATE FUNCTION accumulate_payment_totals() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO payment_totals (business_date, method, payments_count, amount)
+        VALUES (NEW.created_at::date, NEW.method, 1, NEW.amount)
+        ON CONFLICT (business_date, method) DO UPDATE SET
+            payments_count = payment_totals.payments_count + 1,
+            amount = payment_totals.amount + EXCLUDED.amount;
+    ELSIF OLD.voided_at IS NULL AND NEW.voided_at IS NOT NULL THEN
+        UPDATE payment_totals
+        SET payments_count = payments_count - 1, amount = amount - OLD.amount
+        WHERE business_date = OLD.created_at::date AND method = OLD.method;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_payments_totals
+    AFTER INSERT OR UPDATE OF voided_at ON payments
+    FOR EACH ROW EXECUTE FUNCTION accumulate_payment_totals();
+
+-- Anotar en change_log cada fila que cambia de las tablas que replican los tills
+CREATE FUNCTION log_change() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO change_log (entity, entity_id, operation)
+    VALUES (TG_TABLE_NAME, CASE WHEN TG_OP = 'DELETE' THEN OLD.id ELSE NEW.id END, left(TG_OP, 1));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_products_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON products
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+
+CREATE TRIGGER trg_modifiers_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON modifiers
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+
+CREATE TRIGGER trg_tables_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON tables
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+
+CREATE TRIGGER trg_orders_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON orders
+    FOR EACH ROW EXECUTE FUNCTION log_change();
+
+-- Versión del catálogo (menú): se incrementa en cada cambio de categorías,
+-- productos o modificadores para que /api/menu reconstruya su caché, y se
+-- avisa por NOTIFY catalog_changed a los procesos de la API
+CREATE TABLE catalog_version (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO catalog_version DEFAULT VALUES;
+
+CREATE FUNCTION bump_catalog_version() RETURNS trigger AS $$
+DECLARE
+    new_version BIGINT;
+BEGIN
+    UPDATE catalog_version SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+        RETURNING version INTO new_version;
+    PERFORM pg_notify('catalog_changed', new_version::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_categories_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE ON categories
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER trg_products_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE ON products
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER trg_modifiers_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE ON modifiers
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+CREATE TRIGGER trg_promotions_catalog_version
+    AFTER INSERT OR UPDATE OR DELETE ON promotions
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version();
+
+-- Mantener updated_at en cada UPDATE (dato de la fila: exportaciones y
+-- respuestas). Los ETag de los listados no lo usan: salen de change_log
+CREATE FUNCTION touch_updated_at() RETURNS trigger AS $$
+BEGIN
+    NEW.updated_at = CURRENT_TIMESTAMP;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_products_updated_at
+    BEFORE UPDATE ON products
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+CREATE TRIGGER trg_orders_updated_at
+    BEFORE UPDATE ON orders
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+CREATE TRIGGER trg_ingredients_updated_at
+    BEFORE UPDATE ON ingredients
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+CREATE TRIGGER trg_promotions_updated_at
+    BEFORE UPDATE ON promotions
+    FOR EACH ROW EXECUTE FUNCTION touch_updated_at();